@@ -6,18 +6,22 @@ Provides REST API endpoints for the React frontend
 import asyncio
 import json
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 import traceback
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse
 from pydantic import BaseModel
 import uvicorn
 
+from job_queue import QueueFullError, create_job_queue
+from task_store import TaskStore, create_task_store
+
 # Import our content creation system
 try:
     from enhanced_content_system import (
@@ -41,10 +45,21 @@ except ImportError as e:
             for k, v in kwargs.items():
                 setattr(self, k, v)
 
+# Content creation runs on a fixed worker pool fed by a bounded queue
+job_queue = create_job_queue()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the job workers on startup and stop them on shutdown"""
+    job_queue.start()
+    yield
+    await job_queue.close()
+
 app = FastAPI(
     title="Content Creation API",
     description="AI-Powered Multi-Agent Content Creation System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for React frontend
@@ -56,8 +71,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Task storage for tracking progress
-active_tasks: Dict[str, Dict[str, Any]] = {}
+# Task storage for tracking progress (finished tasks expire; see task_store.py)
+active_tasks: TaskStore = create_task_store()
 
 class ContentCreationRequest(BaseModel):
     topic: str
@@ -65,13 +80,14 @@ class ContentCreationRequest(BaseModel):
 
 class TaskStatus(BaseModel):
     task_id: str
-    status: str  # 'running', 'completed', 'failed'
+    status: str  # 'queued', 'running', 'completed', 'failed', 'cancelled'
     progress: float
     current_step: int
     current_operation: str
     step_results: Optional[Dict[int, Any]] = None
     final_result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based while waiting for a worker
 
 # Conditionally serve React frontend static files (only if build exists)
 import os
@@ -100,47 +116,55 @@ async def serve_frontend():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "jobs": job_queue.stats()}
 
 @app.post("/api/create-content")
-async def create_content(request: ContentCreationRequest, background_tasks: BackgroundTasks):
-    """Start content creation process"""
+async def create_content(request: ContentCreationRequest):
+    """Queue a content creation task (429 with Retry-After when the queue is full)"""
     try:
         # Generate unique task ID
         task_id = str(uuid.uuid4())
         
         # Initialize task tracking
-        active_tasks[task_id] = {
-            "status": "running",
+        active_tasks.create(task_id, {
+            "status": "queued",
             "progress": 0.0,
             "current_step": 0,
-            "current_operation": "Initializing...",
+            "current_operation": "Waiting for a worker...",
             "step_results": {},
-            "final_result": None,
             "error": None,
-            "started_at": datetime.now()
-        }
+            "started_at": datetime.now().isoformat()
+        })
         
-        # Start background task
-        background_tasks.add_task(run_content_creation, task_id, request.topic, request.config)
+        try:
+            position = job_queue.submit(task_id, run_content_creation, task_id, request.topic, request.config)
+        except QueueFullError as e:
+            active_tasks.delete(task_id)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many content requests in progress, please retry later",
+                headers={"Retry-After": str(e.retry_after)}
+            )
         
         return {
             "success": True,
             "task_id": task_id,
-            "message": "Content creation started successfully"
+            "message": "Content creation started successfully",
+            "queue_position": position
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start content creation: {str(e)}")
 
 @app.get("/api/progress/{task_id}")
 async def get_progress(task_id: str):
     """Get progress of content creation task"""
-    if task_id not in active_tasks:
+    task = active_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = active_tasks[task_id]
-    
     return TaskStatus(
         task_id=task_id,
         status=task["status"],
@@ -148,19 +172,27 @@ async def get_progress(task_id: str):
         current_step=task["current_step"],
         current_operation=task["current_operation"],
         step_results=task["step_results"],
-        final_result=task["final_result"],
-        error=task["error"]
+        final_result=active_tasks.get_result(task_id) if task["status"] == "completed" else None,
+        error=task["error"],
+        queue_position=job_queue.position(task_id) if task["status"] == "queued" else None
     )
 
 @app.delete("/api/tasks/{task_id}")
 async def cancel_task(task_id: str):
-    """Cancel a running task"""
-    if task_id not in active_tasks:
+    """Cancel a queued or running task
+    
+    A running workflow is stopped at its current await, so in-flight agent runs
+    and HTTP requests are aborted and the worker slot is freed immediately.
+    """
+    task = active_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    if task["status"] in ("completed", "failed"):
+        raise HTTPException(status_code=409, detail=f"Task already {task['status']}")
     
-    # Mark task as cancelled
-    active_tasks[task_id]["status"] = "cancelled"
-    active_tasks[task_id]["current_operation"] = "Cancelled by user"
+    # Record the cancellation first so the status never reads "completed" afterwards
+    active_tasks.update(task_id, status="cancelled", current_operation="Cancelled by user")
+    job_queue.cancel(task_id)
     
     return {"success": True, "message": "Task cancelled successfully"}
 
@@ -173,7 +205,7 @@ async def list_tasks():
                 "task_id": task_id,
                 "status": task["status"],
                 "progress": task["progress"],
-                "started_at": task["started_at"].isoformat(),
+                "started_at": task["started_at"],
                 "current_operation": task["current_operation"]
             }
             for task_id, task in active_tasks.items()
@@ -183,15 +215,14 @@ async def list_tasks():
 @app.get("/api/download/{task_id}/{file_type}")
 async def download_file(task_id: str, file_type: str):
     """Download generated content files"""
-    if task_id not in active_tasks:
+    task = active_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = active_tasks[task_id]
-    if task["status"] != "completed" or not task["final_result"]:
+    final_result = active_tasks.get_result(task_id) if task["status"] == "completed" else None
+    if not final_result:
         raise HTTPException(status_code=400, detail="Task not completed or no result available")
     
-    final_result = task["final_result"]
-    
     if file_type == "html":
         return FileResponse(
             final_result["html_file_path"],
@@ -210,15 +241,22 @@ async def download_file(task_id: str, file_type: str):
 async def run_content_creation(task_id: str, topic: str, config_dict: dict):
     """Background task to run content creation workflow"""
     try:
+        task = active_tasks.get(task_id)
+        if task is None or task["status"] == "cancelled":
+            return  # cancelled while still queued
+        active_tasks.update(task_id, status="running", current_operation="Initializing...")
+
         # Update task status
         def update_progress(step: int, progress: float, operation: str, step_result: Any = None):
-            if task_id in active_tasks:
-                active_tasks[task_id]["current_step"] = step
-                active_tasks[task_id]["progress"] = progress
-                active_tasks[task_id]["current_operation"] = operation
-                
-                if step_result:
-                    active_tasks[task_id]["step_results"][step] = step_result
+            task = active_tasks.get(task_id)
+            if task is None or task["status"] == "cancelled":
+                # Cancelled through another worker process
+                job_queue.cancel(task_id)
+                raise asyncio.CancelledError()
+            fields = {"current_step": step, "progress": progress, "current_operation": operation}
+            if step_result:
+                fields["step_results"] = {**task["step_results"], str(step): step_result}
+            active_tasks.update(task_id, **fields)
 
         # Create configuration
         config = ContentCreationConfig(
@@ -226,7 +264,8 @@ async def run_content_creation(task_id: str, topic: str, config_dict: dict):
             generate_real_images=config_dict.get("generate_real_images", False),
             max_word_count=config_dict.get("max_word_count", 2000),
             include_toc=config_dict.get("include_toc", True),
-            include_references=config_dict.get("include_references", True)
+            include_references=config_dict.get("include_references", True),
+            publish_mode=config_dict.get("publish_mode", "local")
         )
         
         # Step 1: User Input Processing
@@ -392,23 +431,28 @@ In conclusion, {topic} offers many opportunities for...
                 "markdown_content": f"# The Complete Guide to {topic}\n\nYour article content here..."
             }
         
-        update_progress(4, 100, "Article published successfully", final_result_dict)
+        # The step result is part of every status poll, so it only carries a summary;
+        # the article itself stays in the offloaded result
+        update_progress(4, 100, "Article published successfully", {
+            key: value for key, value in final_result_dict.items()
+            if key not in ("html_content", "markdown_content")
+        })
         
-        # Mark task as completed
-        active_tasks[task_id]["status"] = "completed"
-        active_tasks[task_id]["final_result"] = final_result_dict
-        active_tasks[task_id]["current_operation"] = "Completed successfully"
+        # Mark task as completed (result first, so "completed" always has one)
+        active_tasks.set_result(task_id, final_result_dict)
+        active_tasks.update(task_id, status="completed", current_operation="Completed successfully")
         
+    except asyncio.CancelledError:
+        print(f"🛑 Task {task_id} cancelled")
+        active_tasks.update(task_id, status="cancelled")
+        raise
     except Exception as e:
         # Mark task as failed
         error_msg = f"Content creation failed: {str(e)}"
         print(f"Error in task {task_id}: {error_msg}")
         print(traceback.format_exc())
         
-        if task_id in active_tasks:
-            active_tasks[task_id]["status"] = "failed"
-            active_tasks[task_id]["error"] = error_msg
-            active_tasks[task_id]["current_operation"] = "Failed"
+        active_tasks.update(task_id, status="failed", error=error_msg, current_operation="Failed")
 
 if __name__ == "__main__":
     print("🚀 Starting Content Creation API Server...")
@@ -0,0 +1,554 @@
+"""
+Batch Jobs
+Runs a JSONL file of UserInput records through the content pipeline with bounded
+concurrency. Each finished record is appended to a JSONL output file, which
+doubles as the checkpoint: re-running a job skips records already written there.
+In `openai_batch` mode the pipeline's LLM calls are grouped into OpenAI Batch API
+files, one per pipeline stage. Tokens cost half the price, at the cost of
+latency (batches complete within 24h).
+
+Usage: python batch_jobs.py topics.jsonl results.jsonl --concurrency 4
+       python batch_jobs.py topics.jsonl results.jsonl --mode openai_batch
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BATCH_MODES = ("pipeline", "openai_batch")
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_BATCH_STATES = ("completed", "failed", "expired", "cancelled")
+MAX_BATCH_REQUESTS = 50000  # OpenAI's per-file limit
+# Records in flight per mode; openai_batch records mostly wait on batch results,
+# and the more of them run at once the fewer batch files each stage needs
+DEFAULT_CONCURRENCY = {"pipeline": 4, "openai_batch": 1000}
+
+# A runner may also have an async close(), awaited when its job ends
+RunRecord = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class BatchRecord(NamedTuple):
+    custom_id: str
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None  # set when the line is not a JSON object
+
+
+def read_records(path: str) -> Iterator[BatchRecord]:
+    """Yield one record per non-blank line; `custom_id` defaults to line-<number>"""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield BatchRecord(f"line-{number}", None, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(data, dict):
+                yield BatchRecord(f"line-{number}", None, "Each line must be a JSON object")
+                continue
+            custom_id = str(data.pop("custom_id", None) or f"line-{number}")
+            yield BatchRecord(custom_id, data)
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """custom_ids already written to the output file
+
+    A line torn by a crash mid-write is cut off so appending can resume cleanly.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["custom_id"])
+            except (ValueError, KeyError, TypeError):
+                break
+            valid_bytes += len(line)
+    if valid_bytes != os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def summarize_output(output_path: str) -> Dict[str, int]:
+    """Count written results by status"""
+    counts = {"completed": 0, "error": 0}
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    status = json.loads(line).get("status")
+                except ValueError:
+                    continue
+                counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+class ResultWriter:
+    """Appends result lines durably (flushed and fsynced) as records finish"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, result: Dict[str, Any]):
+        self._file.write(json.dumps(result, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    run_record: RunRecord,
+    concurrency: int = 4,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, int]:
+    """Run every record not yet in the output file through `run_record`
+
+    At most `concurrency` records run at once. Records are read lazily, so large
+    inputs are never loaded in full. Returns counts of completed, failed and
+    skipped (already checkpointed) records.
+    """
+    done = load_checkpoint(output_path)
+    counters = {"completed": 0, "failed": 0, "skipped": 0}
+    records = read_records(input_path)
+    writer = ResultWriter(output_path)
+
+    async def run_one(record: BatchRecord):
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"custom_id": record.custom_id}
+        try:
+            if record.error:
+                raise ValueError(record.error)
+            result.update(status="completed", result=await run_record(record.data))
+            counters["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+            counters["failed"] += 1
+        result["duration_s"] = round(time.perf_counter() - started, 3)
+        writer.write(result)
+        if on_result:
+            on_result(result)
+
+    async def worker():
+        for record in records:
+            if record.custom_id in done:
+                counters["skipped"] += 1
+                continue
+            # Claim the id before awaiting so duplicate ids in the input run once
+            done.add(record.custom_id)
+            await run_one(record)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        writer.close()
+    return counters
+
+
+class BatchRequestError(Exception):
+    """An OpenAI Batch line came back with an error or not at all"""
+
+
+class OpenAIBatchCaller:
+    """Collects chat completion requests into OpenAI Batch API submissions
+
+    Pipelines call `complete(body)` as usual. Requests arriving within
+    `collect_seconds` of each other go into one batch file, split at
+    MAX_BATCH_REQUESTS. When every record waits on the same pipeline stage,
+    each stage becomes a single batch.
+
+    With `state_path`, the id of every submitted batch and the custom_ids of its
+    lines are saved there. custom_ids are derived from the request body, so a
+    caller created again with the same path (a resumed job) polls the saved
+    batches for requests it already sent instead of submitting them again.
+    """
+
+    def __init__(
+        self,
+        client,
+        collect_seconds: float = 0.5,
+        poll_seconds: float = 10.0,
+        completion_window: str = "24h",
+        state_path: Optional[str] = None,
+    ):
+        self.client = client
+        self.collect_seconds = collect_seconds
+        self.poll_seconds = poll_seconds
+        self.completion_window = completion_window
+        self.state_path = Path(state_path) if state_path else None
+        self._pending: Dict[str, tuple] = {}  # custom_id -> (body, future)
+        self._occurrences: Dict[str, int] = {}  # request key -> requests seen with that body
+        self._wakeup = asyncio.Event()
+        self._driver: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()  # submitted batches being polled
+        self._submitted: Dict[str, List[str]] = self._load_state()  # batch id -> custom_ids
+        self._saved: Dict[str, List[Tuple[str, str]]] = {}  # request key -> (batch id, custom_id) not yet reused
+        for batch_id, custom_ids in self._submitted.items():
+            for custom_id in custom_ids:
+                self._saved.setdefault(custom_id.rsplit("-", 1)[0], []).append((batch_id, custom_id))
+        self._polls: Dict[str, asyncio.Task] = {}  # saved batch id -> its result lines
+        self.counters: Dict[str, int] = {
+            "batches": 0, "requests": 0, "failed_requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "reused_requests": 0,
+        }
+
+    async def complete(self, body: Dict[str, Any]) -> str:
+        """Queue one chat completion request body and wait for its batch result"""
+        key = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        if self._saved.get(key):
+            batch_id, custom_id = self._saved[key].pop()
+            line = (await self._saved_lines(batch_id)).get(custom_id)
+            if line is not None:
+                self.counters["reused_requests"] += 1
+                return self._content(line)
+            # The saved batch failed or expired without this line: submit it again
+
+        occurrence = self._occurrences.get(key, 0)
+        self._occurrences[key] = occurrence + 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[f"{key}-{occurrence}"] = (body, future)
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+        else:
+            self._wakeup.set()
+        return await future
+
+    async def close(self):
+        tasks = [task for task in (self._driver, *self._running, *self._polls.values()) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _load_state(self) -> Dict[str, List[str]]:
+        if self.state_path is None:
+            return {}
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self):
+        if self.state_path is None:
+            return
+        temporary = self.state_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self._submitted), encoding="utf-8")
+        os.replace(temporary, self.state_path)
+
+    async def _drive(self):
+        # Runs while requests are pending, so an idle caller holds no task
+        while self._pending:
+            # Wait for a quiet period so concurrent pipelines land in the same batch
+            while len(self._pending) < MAX_BATCH_REQUESTS:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.collect_seconds)
+                except asyncio.TimeoutError:
+                    break
+            custom_ids = list(self._pending)[:MAX_BATCH_REQUESTS]
+            requests = {custom_id: self._pending.pop(custom_id) for custom_id in custom_ids}
+            # Batches are polled side by side, so requests beyond the limit do not wait for the first batch
+            task = asyncio.create_task(self._run(requests))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, requests: Dict[str, tuple]):
+        try:
+            await self._submit(requests)
+        except Exception as e:
+            for _, future in requests.values():
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _submit(self, requests: Dict[str, tuple]):
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body})
+            for custom_id, (body, _) in requests.items()
+        ]
+        upload = await self.client.files.create(
+            file=("batch_input.jsonl", io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window=self.completion_window
+        )
+        self._submitted[batch.id] = list(requests)
+        self._save_state()
+        self.counters["batches"] += 1
+        self.counters["requests"] += len(requests)
+        print(f"📦 Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+
+        batch, results = await self._wait_for(batch.id)
+        for custom_id, (_, future) in requests.items():
+            if future.done():
+                continue
+            line = results.get(custom_id)
+            if line is None:
+                self.counters["failed_requests"] += 1
+                future.set_exception(BatchRequestError(f"No result in batch {batch.id} ({batch.status})"))
+                continue
+            try:
+                future.set_result(self._content(line))
+            except BatchRequestError as e:
+                self.counters["failed_requests"] += 1
+                future.set_exception(e)
+                continue
+            usage = line["response"]["body"].get("usage") or {}
+            self.counters["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self.counters["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    async def _wait_for(self, batch_id: str) -> Tuple[Any, Dict[str, Dict[str, Any]]]:
+        """Poll a batch until it ends; returns it and its output and error lines by custom_id"""
+        batch = await self.client.batches.retrieve(batch_id)
+        while batch.status not in TERMINAL_BATCH_STATES:
+            await asyncio.sleep(self.poll_seconds)
+            batch = await self.client.batches.retrieve(batch_id)
+        results: Dict[str, Dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    parsed = json.loads(line)
+                    results.setdefault(parsed.get("custom_id"), parsed)
+        return batch, results
+
+    async def _saved_lines(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Result lines of a batch submitted before the job was resumed ({} if it cannot be read)"""
+        if batch_id not in self._polls:
+            self._polls[batch_id] = asyncio.create_task(self._wait_for(batch_id))
+        try:
+            # Shielded: one cancelled record must not stop the poll the others wait on
+            _, results = await asyncio.shield(self._polls[batch_id])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Could not read saved OpenAI batch {batch_id}, submitting its requests again: {e}")
+            return {}
+        return results
+
+    @staticmethod
+    def _content(line: Dict[str, Any]) -> str:
+        """Message content of a batch result line; raises BatchRequestError for failed lines"""
+        response = line.get("response") or {}
+        if response.get("status_code") != 200:
+            error = line.get("error") or response.get("body", {}).get("error")
+            raise BatchRequestError(f"Batch request failed: {error}")
+        return response["body"]["choices"][0]["message"]["content"]
+
+
+def try_lock(path: Path):
+    """Open and exclusively lock `path` without blocking; None if another process holds it
+
+    The OS releases the lock if the holder dies, so a crashed job can be taken over.
+    """
+    handle = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class BatchJobManager:
+    """Batch jobs submitted over the API, kept under `root/<batch_id>/`
+
+    Each job directory holds `input.jsonl`, `results.jsonl` (output and
+    checkpoint), `job.json` (manifest) and a `lock` file held by the process
+    running it. `make_runner(mode, directory)` may keep more state there, such
+    as the OpenAI batches a job submitted. `resume()` restarts unfinished jobs
+    nobody holds, e.g. after a crash.
+    """
+
+    def __init__(self, root: str, make_runner: Callable[[str, Path], RunRecord]):
+        self.root = Path(root)
+        self.make_runner = make_runner
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _dir(self, batch_id: str) -> Path:
+        return self.root / batch_id
+
+    def _read_manifest(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self._dir(batch_id) / "job.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        path = self._dir(manifest["batch_id"]) / "job.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(temporary, path)
+
+    def submit(self, jsonl: bytes, mode: str = "pipeline", concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Store the input and start the job; raises ValueError for malformed input"""
+        if mode not in BATCH_MODES:
+            raise ValueError(f"mode must be one of {BATCH_MODES}")
+        concurrency = concurrency or DEFAULT_CONCURRENCY[mode]
+        text = jsonl.decode("utf-8")
+        total = 0
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                if not isinstance(json.loads(line), dict):
+                    raise ValueError
+            except ValueError:
+                raise ValueError(f"Line {number} is not a JSON object")
+            total += 1
+        if not total:
+            raise ValueError("No records in the request body")
+
+        batch_id = uuid.uuid4().hex
+        directory = self._dir(batch_id)
+        directory.mkdir(parents=True)
+        (directory / "input.jsonl").write_text(text, encoding="utf-8")
+        manifest = {
+            "batch_id": batch_id,
+            "mode": mode,
+            "concurrency": concurrency,
+            "total": total,
+            "status": "running",
+            "created_at": datetime.now().isoformat(),
+        }
+        self._write_manifest(manifest)
+        self._start(batch_id)
+        return manifest
+
+    def _start(self, batch_id: str) -> bool:
+        lock = try_lock(self._dir(batch_id) / "lock")
+        if lock is None:
+            return False
+        self._tasks[batch_id] = asyncio.get_running_loop().create_task(self._run(batch_id, lock))
+        return True
+
+    async def _run(self, batch_id: str, lock):
+        manifest = self._read_manifest(batch_id)
+        directory = self._dir(batch_id)
+        runner = None
+        try:
+            runner = self.make_runner(manifest["mode"], directory)
+            counters = await run_batch(
+                str(directory / "input.jsonl"),
+                str(directory / "results.jsonl"),
+                runner,
+                concurrency=manifest["concurrency"],
+            )
+            manifest.update(status="completed", completed_at=datetime.now().isoformat())
+            self._write_manifest(manifest)
+            print(f"📦 Batch {batch_id} finished: {counters}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            manifest.update(status="error", error=str(e))
+            self._write_manifest(manifest)
+            print(f"❌ Batch {batch_id} failed: {e}")
+        finally:
+            if hasattr(runner, "close"):
+                await runner.close()
+            lock.close()
+            self._tasks.pop(batch_id, None)
+
+    def resume(self) -> List[str]:
+        """Restart unfinished jobs that no live process is running"""
+        resumed = []
+        if not self.root.exists():
+            return resumed
+        for directory in sorted(self.root.iterdir()):
+            manifest = self._read_manifest(directory.name)
+            if manifest and manifest["status"] == "running" and directory.name not in self._tasks:
+                if self._start(directory.name):
+                    resumed.append(directory.name)
+        if resumed:
+            print(f"📦 Resumed {len(resumed)} batch job(s) from their checkpoints")
+        return resumed
+
+    def status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        manifest = self._read_manifest(batch_id)
+        if manifest is None:
+            return None
+        counts = summarize_output(str(self._dir(batch_id) / "results.jsonl"))
+        return {**manifest, "completed": counts["completed"], "failed": counts["error"]}
+
+    def results_path(self, batch_id: str) -> Optional[Path]:
+        if self._read_manifest(batch_id) is None:
+            return None
+        return self._dir(batch_id) / "results.jsonl"
+
+    async def close(self):
+        """Stop running jobs and close their runners; they continue from their checkpoint on the next resume()"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of UserInput records (optional custom_id per line)")
+    parser.add_argument("output", help="JSONL results file; re-running resumes from it")
+    parser.add_argument("--mode", choices=BATCH_MODES, default="pipeline")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help=f"records in flight (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--poll-seconds", type=float, default=30.0, help="OpenAI batch status polling interval")
+    args = parser.parse_args()
+    concurrency = args.concurrency or DEFAULT_CONCURRENCY[args.mode]
+
+    import real_api_server
+
+    async def run() -> Dict[str, Any]:
+        caller = None
+        if args.mode == "openai_batch":
+            client = real_api_server.llm_client.get()
+            if client is None:
+                raise SystemExit("❌ openai_batch mode needs an OpenAI API key")
+            # Saved next to the output, so re-running the command polls batches it already submitted
+            caller = OpenAIBatchCaller(
+                client, poll_seconds=args.poll_seconds, state_path=f"{args.output}.openai_batches.json"
+            )
+        try:
+            counters = await run_batch(
+                args.input, args.output, real_api_server.batch_record_runner(caller), concurrency,
+                on_result=lambda result: print(f"{'✅' if result['status'] == 'completed' else '❌'} {result['custom_id']}"),
+            )
+        finally:
+            if caller:
+                await caller.close()
+            await real_api_server.llm_client.close()
+        return {**counters, **({"openai_batch": caller.counters} if caller else {})}
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
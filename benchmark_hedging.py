@@ -0,0 +1,98 @@
+"""
+Benchmark: Hedged vs Plain LLM Calls
+Runs call_openai_gpt against the in-process fake OpenAI server with a heavy-tailed
+(lognormal) latency distribution, once without hedging and once with it, and
+reports p50/p95/p99 call latency, the hedge rate and the extra requests sent.
+
+Usage: python benchmark_hedging.py --calls 600 --concurrency 8 --percentile 0.95 --max-hedge-rate 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+from unittest.mock import patch
+
+import httpx
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from hedging import HedgeRegistry
+from llm_client import LLMClientConfig, SharedLLMClient
+from load_generator import latency_summary
+
+
+async def run_calls(args: argparse.Namespace, hedging: Optional[HedgeRegistry]) -> Dict[str, Any]:
+    import real_api_server
+
+    fake = create_fake_app(FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_distribution="lognormal",
+        latency_jitter_ms=args.jitter_ms,
+        completion_text="Benchmark answer with a few words in it.",
+        seed=args.seed,
+    ))
+    shared = SharedLLMClient(
+        LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+        transport=httpx.ASGITransport(app=fake),
+    )
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await real_api_server.call_openai_gpt(
+                f"Benchmark prompt {index}",
+                on_token=(lambda delta: None) if args.stream else None,
+                use_cache=False,
+            )
+            latencies.append(time.perf_counter() - started)
+
+    with patch.object(real_api_server, "llm_client", shared), \
+            patch.object(real_api_server, "response_cache", None), \
+            patch.object(real_api_server, "rate_limiter", None), \
+            patch.object(real_api_server, "circuit_breakers", None), \
+            patch.object(real_api_server, "hedging", hedging):
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(args.calls)))
+        elapsed = time.perf_counter() - started
+    await shared.close()
+
+    # The first calls only collect latency samples, so they are left out of the percentiles
+    summary = latency_summary(latencies[args.warmup:])
+    report = {
+        "latency": summary,
+        "upstream_requests": fake.state.request_count,
+        "extra_requests_pct": round(100 * (fake.state.request_count / args.calls - 1), 1),
+        "elapsed_s": round(elapsed, 2),
+    }
+    if hedging:
+        report["hedging"] = next(iter(hedging.stats().values()))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="median upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=80.0, help="lognormal spread (sigma = jitter / median)")
+    parser.add_argument("--percentile", type=float, default=0.95, help="hedge after this percentile of recent latency")
+    parser.add_argument("--max-hedge-rate", type=float, default=0.1)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--stream", action="store_true", help="stream responses (hedge on time to first token)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {
+        "plain": asyncio.run(run_calls(args, None)),
+        "hedged": asyncio.run(run_calls(args, HedgeRegistry(
+            percentile=args.percentile, max_hedge_rate=args.max_hedge_rate, min_samples=args.warmup
+        ))),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
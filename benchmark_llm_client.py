@@ -0,0 +1,122 @@
+"""
+Benchmark: Shared Async Client vs Per-Call Thread Pool
+Compares the old call_openai_gpt backend (sync client in a fresh ThreadPoolExecutor
+per call) with the shared pooled AsyncOpenAI client, against the local fake server.
+
+Usage: python benchmark_llm_client.py --calls 500 --concurrency 50 --latency-ms 100
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import socket
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List
+
+import openai
+import uvicorn
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+
+MESSAGES = [{"role": "user", "content": "Write a short paragraph about connection pooling."}]
+
+
+def start_fake_server(latency_ms: float) -> str:
+    """Run the fake server in a background thread and return its base URL"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(
+        create_fake_app(FakeServerConfig(latency_ms=latency_ms)),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def summarize(name: str, latencies: List[float], elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "backend": name,
+        "calls": len(ordered),
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def run_calls(call: Callable, calls: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+async def bench_thread_pool(base_url: str, calls: int, concurrency: int) -> Dict[str, float]:
+    """The previous backend: sync client, new ThreadPoolExecutor for every call"""
+    client = openai.OpenAI(api_key="sk-bench", base_url=base_url, timeout=30.0, max_retries=0)
+
+    async def call():
+        loop = asyncio.get_event_loop()
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            await loop.run_in_executor(
+                executor,
+                lambda: client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES),
+            )
+
+    start = time.perf_counter()
+    latencies = await run_calls(call, calls, concurrency)
+    result = summarize("thread_pool_per_call", latencies, time.perf_counter() - start)
+    client.close()
+    return result
+
+
+async def bench_shared_async(base_url: str, calls: int, concurrency: int) -> Dict[str, float]:
+    """The new backend: one pooled AsyncOpenAI client shared by every call"""
+    shared = SharedLLMClient(LLMClientConfig(api_key="sk-bench", base_url=base_url, max_retries=0))
+    client = shared.start()
+
+    async def call():
+        await client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+
+    start = time.perf_counter()
+    latencies = await run_calls(call, calls, concurrency)
+    result = summarize("shared_async_client", latencies, time.perf_counter() - start)
+    await shared.close()
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    base_url = start_fake_server(args.latency_ms)
+    results = [
+        await bench_thread_pool(base_url, args.calls, args.concurrency),
+        await bench_shared_async(base_url, args.calls, args.concurrency),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
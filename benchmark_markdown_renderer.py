@@ -0,0 +1,130 @@
+"""
+Benchmark: Incremental vs End-of-Stream Markdown Rendering
+Feeds a synthetic article to markdown_renderer in token-sized chunks, as the
+article step streams it, and compares:
+  - incremental: IncrementalMarkdownRenderer.feed() per chunk, finish() at the end
+  - render_at_end: one render_markdown() call after the last chunk
+  - rerender_preview / incremental_preview: a live preview refreshed every
+    --preview-every chunks, by re-rendering the whole text vs preview()
+`final_html_ms` is the delay between the last token and the finished HTML.
+
+Usage: python benchmark_markdown_renderer.py --sections 40 --chunk-chars 4
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from markdown_renderer import IncrementalMarkdownRenderer, render_markdown
+
+try:
+    import markdown as python_markdown
+except ImportError:  # only used as a reference point
+    python_markdown = None
+
+
+def build_article(sections: int) -> str:
+    parts = ["# Benchmark Article\n\nAn introduction with **bold** text, `inline code` and a [link](https://example.com).\n"]
+    for index in range(sections):
+        parts.append(f"""
+## Section {index}
+
+This paragraph explains point {index} in some detail, with *emphasis* and a second
+sentence that wraps onto another line so paragraphs span several source lines.
+
+- First takeaway for section {index}
+- Second takeaway with **strong** words
+  - A nested detail
+1. Ordered step one
+2. Ordered step two
+
+> A quotation that supports section {index}.
+
+```python
+def section_{index}(value):
+    return value * {index}
+```
+
+| Metric | Value |
+|--------|------:|
+| items  | {index} |
+""")
+    return "".join(parts)
+
+
+def chunked(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def timed(run: Callable[[], Dict[str, float]], repeat: int) -> Dict[str, float]:
+    samples = [run() for _ in range(repeat)]
+    return {key: round(statistics.median(sample[key] for sample in samples), 3) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--chunk-chars", type=int, default=4, help="about one token per chunk")
+    parser.add_argument("--preview-every", type=int, default=25, help="chunks between live preview refreshes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    article = build_article(args.sections)
+    chunks = chunked(article, args.chunk_chars)
+    expected = render_markdown(article)
+
+    def incremental(preview: bool = False) -> Dict[str, float]:
+        renderer = IncrementalMarkdownRenderer()
+        started = time.perf_counter()
+        first_fragment_chunk = None
+        for index, chunk in enumerate(chunks):
+            if renderer.feed(chunk) and first_fragment_chunk is None:
+                first_fragment_chunk = index
+            if preview and index % args.preview_every == 0:
+                renderer.preview()
+        streamed = time.perf_counter()
+        renderer.finish()
+        done = time.perf_counter()
+        assert renderer.html == expected
+        return {
+            "total_ms": (done - started) * 1000,
+            "final_html_ms": (done - streamed) * 1000,
+            "first_html_after_chunks": first_fragment_chunk,
+        }
+
+    def render_at_end(preview: bool = False) -> Dict[str, float]:
+        started = time.perf_counter()
+        text = ""
+        for index, chunk in enumerate(chunks):
+            text += chunk
+            if preview and index % args.preview_every == 0:
+                render_markdown(text)
+        streamed = time.perf_counter()
+        html = render_markdown(text)
+        done = time.perf_counter()
+        assert html == expected
+        return {
+            "total_ms": (done - started) * 1000,
+            "final_html_ms": (done - streamed) * 1000,
+            "first_html_after_chunks": len(chunks),
+        }
+
+    results = {
+        "article_chars": len(article),
+        "chunks": len(chunks),
+        "incremental": timed(incremental, args.repeat),
+        "render_at_end": timed(render_at_end, args.repeat),
+        "incremental_preview": timed(lambda: incremental(preview=True), args.repeat),
+        "rerender_preview": timed(lambda: render_at_end(preview=True), args.repeat),
+    }
+    if python_markdown is not None:
+        started = time.perf_counter()
+        python_markdown.markdown(article, extensions=["tables", "fenced_code"])
+        results["python_markdown_at_end_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
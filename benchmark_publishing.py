@@ -0,0 +1,126 @@
+"""
+Benchmark: Local Publishing vs the Publisher Agent
+Publishes a synthetic article with publish_article_locally() and compares it
+with what the publisher agent path of enhanced_content_system costs per
+article. The agent cost is a lower bound built from token counts: one
+request that calls the tools (the article goes back out as the
+create_enhanced_html_template arguments) and one that reads the rendered
+HTML back and returns the PublishedArticle. Agent latency is estimated from
+--round-trip-ms per request and --output-tokens-per-second.
+
+Usage: python benchmark_publishing.py --sections 8 --words-per-section 250
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from context_packer import count_tokens
+from enhanced_content_system import (
+    ContentCreationConfig,
+    ImageDescription,
+    MarkdownContent,
+    PublishedArticle,
+    build_publish_prompt,
+    calculate_read_time,
+    create_enhanced_html_template,
+    create_url_slug,
+    publish_article_locally,
+    publisher_agent,
+)
+
+
+def build_article(sections: int, words_per_section: int) -> MarkdownContent:
+    headings = [f"Section {index}: Practical Details" for index in range(sections)]
+    sentence = "Home solar panels convert sunlight into electricity for everyday use. "
+    body = "# Solar Energy at Home\n\n" + "".join(
+        f"## {heading}\n\n" + sentence * (words_per_section // 10) + "\n\n- One takeaway\n- Another takeaway\n\n"
+        for heading in headings
+    )
+    return MarkdownContent(
+        title="Solar Energy at Home",
+        subtitle="A practical guide to panels, costs and installation",
+        summary="How home solar works and what it costs",
+        table_of_contents=headings,
+        markdown_content=body,
+        sections=headings,
+        keywords=["solar", "energy", "panels", "installation"],
+        meta_description="Learn how solar energy panels power a home, what they cost and how to install them.",
+        estimated_read_time=calculate_read_time(body),
+    )
+
+
+def agent_tokens(markdown_data: MarkdownContent, image_data: ImageDescription, image_urls, config) -> dict:
+    """Input and output tokens of the two requests the agent path needs at minimum"""
+    tools = [
+        {"name": tool.name, "description": tool.description, "parameters": tool.params_json_schema}
+        for tool in publisher_agent.tools
+    ]
+    fixed = count_tokens(publisher_agent.instructions) + count_tokens(json.dumps(tools)) + \
+        count_tokens(json.dumps(PublishedArticle.model_json_schema()))
+    prompt = count_tokens(build_publish_prompt(markdown_data, image_data, image_urls, "output/article.md", config))
+
+    template_args = {
+        "title": markdown_data.title, "subtitle": markdown_data.subtitle, "content": markdown_data.markdown_content,
+        "toc": markdown_data.table_of_contents, "meta_description": markdown_data.meta_description,
+        "read_time": markdown_data.estimated_read_time, "image_urls": image_urls,
+    }
+    # The prompt already carries the reading time, so only the template and slug tools are counted
+    tool_calls = count_tokens(json.dumps(template_args)) + count_tokens(json.dumps({"title": markdown_data.title}))
+    html = create_enhanced_html_template(**template_args)
+    tool_results = count_tokens(html) + count_tokens(create_url_slug(markdown_data.title))
+    final_output = count_tokens(json.dumps({field: "x" * 20 for field in PublishedArticle.model_fields}))
+
+    first_input = fixed + prompt
+    return {
+        "requests": 2,
+        "input_tokens": first_input + (first_input + tool_calls + tool_results),
+        "output_tokens": tool_calls + final_output,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--words-per-section", type=int, default=250)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--round-trip-ms", type=float, default=800, help="fixed latency per LLM request")
+    parser.add_argument("--output-tokens-per-second", type=float, default=60)
+    args = parser.parse_args()
+
+    markdown_data = build_article(args.sections, args.words_per_section)
+    image_urls = [f"https://example.com/image-{index}.png" for index in range(args.images)]
+    image_data = ImageDescription(
+        hero_image={"prompt": "Sunlit roof with panels", "alt_text": "Solar roof"},
+        section_images=[{"prompt": f"Section {index}", "alt_text": f"Section {index}"} for index in range(args.images - 1)],
+        image_style="Clean photography", color_scheme="Warm", aspect_ratios={"hero": "16:9"},
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = ContentCreationConfig(output_directory=directory)
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            publish_article_locally(markdown_data, image_urls, f"{directory}/article.md", config)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    agent = agent_tokens(markdown_data, image_data, image_urls, config)
+    agent["estimated_seconds"] = round(
+        agent["requests"] * args.round_trip_ms / 1000 + agent["output_tokens"] / args.output_tokens_per_second, 1
+    )
+    print(json.dumps({
+        "article_words": len(markdown_data.markdown_content.split()),
+        "local": {"median_ms": round(statistics.median(samples), 2), "llm_requests": 0, "tokens": 0},
+        "agent_lower_bound": agent,
+        "saved_per_article": {
+            "seconds": agent["estimated_seconds"],
+            "tokens": agent["input_tokens"] + agent["output_tokens"],
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
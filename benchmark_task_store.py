@@ -0,0 +1,65 @@
+"""
+Soak Test: Task Store Memory Use
+Pushes many tasks (with realistic result sizes) through each TaskStore and
+reports traced Python memory at checkpoints. Memory should stay flat once the
+store reaches its eviction cap.
+
+Usage: python benchmark_task_store.py --tasks 100000
+"""
+
+import argparse
+import json
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from task_store import InMemoryTaskStore, SQLiteTaskStore
+
+# Roughly the size of one real final_result (research, outline, article, HTML, SEO)
+RESULT = {
+    "research_data": "r" * 3000,
+    "structure_outline": "s" * 2000,
+    "markdown_content": "m" * 8000,
+    "html_content": "h" * 9000,
+    "seo_optimization": "o" * 2000,
+}
+
+
+def soak(store, tasks: int, checkpoints: int = 10):
+    samples = []
+    tracemalloc.start()
+    for i in range(tasks):
+        task_id = f"task-{i}"
+        store.create(task_id, {"task_id": task_id, "status": "processing", "current_step": 1})
+        for step in range(2, 6):
+            store.update(task_id, current_step=step)
+        store.set_result(task_id, RESULT)
+        store.update(task_id, status="completed")
+        if (i + 1) % (tasks // checkpoints) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append({"tasks": i + 1, "traced_mb": round(current / 1e6, 2), "stored": len(store)})
+    tracemalloc.stop()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--max-tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stores = {
+            "memory_lru_ttl": InMemoryTaskStore(max_tasks=args.max_tasks, result_dir=str(Path(workdir) / "results")),
+            # TTL of zero: every finished task is purgeable at the next sweep
+            "sqlite_wal": SQLiteTaskStore(str(Path(workdir) / "tasks.db"), ttl_seconds=0),
+        }
+        report = {}
+        for name, store in stores.items():
+            report[name] = soak(store, args.tasks)
+            store.close()
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
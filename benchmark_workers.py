@@ -0,0 +1,129 @@
+"""
+Benchmark: Throughput vs uvicorn Worker Processes
+Runs real_api_server under `uvicorn --workers N` for several N, sharing one SQLite
+(WAL) task store, with OpenAI calls answered by the local fake server. Each
+client creates a task and polls its status until it completes; a poll can land
+on any worker, so a 404 would mean task state is not shared.
+
+Usage: python benchmark_workers.py --workers 1,2,4 --duration 10 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from load_generator import free_port, start_process, wait_until_up
+
+
+async def drive_load(base_url: str, duration: float, concurrency: int, poll_interval: float) -> Dict[str, float]:
+    task_latencies: List[float] = []
+    counts = {"requests": 0, "not_found": 0, "rejected": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client: httpx.AsyncClient):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            payload = {"topic": f"Scaling test {uuid.uuid4().hex[:8]}", "length": "Short"}
+            response = await client.post("/api/content/create", json=payload)
+            counts["requests"] += 1
+            if response.status_code == 429:
+                counts["rejected"] += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                continue
+            task_id = response.json()["task_id"]
+            while time.perf_counter() < deadline + 30:
+                await asyncio.sleep(poll_interval)
+                status = await client.get(f"/api/content/status/{task_id}")
+                counts["requests"] += 1
+                if status.status_code == 404:
+                    counts["not_found"] += 1
+                    continue
+                if status.json()["status"] in ("completed", "error"):
+                    task_latencies.append(time.perf_counter() - started)
+                    break
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ordered = sorted(task_latencies) or [0.0]
+    return {
+        "tasks_completed": len(task_latencies),
+        "tasks_per_second": round(len(task_latencies) / elapsed, 2),
+        "requests_per_second": round(counts["requests"] / elapsed, 1),
+        "task_p50_s": round(statistics.median(ordered), 3),
+        "task_p99_s": round(ordered[max(0, int(len(ordered) * 0.99) - 1)], 3),
+        "status_404s": counts["not_found"],
+        "rejected_429s": counts["rejected"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4) if n <= (os.cpu_count() or 1)) or "1")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = start_process(
+        ["fake_openai_server.py", "--port", str(fake_port), "--latency-ms", str(args.latency_ms)], {}
+    )
+    results = []
+    try:
+        wait_until_up(f"http://127.0.0.1:{fake_port}/docs")
+        with tempfile.TemporaryDirectory() as workdir:
+            for workers in [int(n) for n in args.workers.split(",")]:
+                port = free_port()
+                server = start_process(
+                    ["-m", "uvicorn", "real_api_server:app", "--port", str(port),
+                     "--workers", str(workers), "--log-level", "warning"],
+                    {
+                        "TASK_STORE": "sqlite",
+                        "TASK_STORE_PATH": str(Path(workdir) / f"tasks-{workers}.db"),
+                        "TASK_RESULT_DIR": str(Path(workdir) / f"task_results-{workers}"),
+                        "CHECKPOINT_PATH": str(Path(workdir) / f"checkpoints-{workers}.db"),
+                        "BATCH_DIR": str(Path(workdir) / f"batches-{workers}"),
+                        "OPENAI_API_KEY": "sk-bench",
+                        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+                        "LLM_CACHE_ENABLED": "0",
+                        "LLM_RATE_LIMIT_RPM": "0",
+                        # Enough job workers that CPU, not job slots, limits each process
+                        "JOB_WORKERS": str(args.concurrency),
+                        "JOB_QUEUE_SIZE": "10000",
+                    },
+                )
+                try:
+                    wait_until_up(f"http://127.0.0.1:{port}/api/health")
+                    result = asyncio.run(drive_load(
+                        f"http://127.0.0.1:{port}", args.duration, args.concurrency, args.poll_interval
+                    ))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+                results.append({"workers": workers, **result})
+    finally:
+        fake.terminate()
+        fake.wait(timeout=30)
+
+    baseline = results[0]["tasks_per_second"] or 1.0
+    for result in results:
+        result["speedup_vs_first"] = round(result["tasks_per_second"] / baseline, 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
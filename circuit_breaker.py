@@ -0,0 +1,293 @@
+"""
+LLM Circuit Breakers and Retry Budget
+Per-model circuit breakers that open when recent calls fail or run slow, so
+callers fail fast instead of waiting out timeouts, and a process-wide retry
+budget that caps retries to a fraction of recent traffic with jittered
+exponential backoff between attempts.
+"""
+
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised by `CircuitBreaker.acquire` while the breaker rejects calls"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CallPermit:
+    """One admitted call; report its outcome with `success`, `failure` or `release`"""
+
+    def __init__(self, breaker: "CircuitBreaker", probe: bool):
+        self._breaker = breaker
+        self.probe = probe
+        self._done = False
+
+    def success(self, duration: float):
+        self._finish(False, duration)
+
+    def failure(self, duration: float):
+        self._finish(True, duration)
+
+    def release(self):
+        """Give the permit back without an outcome (cancelled or client-side error)"""
+        if not self._done:
+            self._done = True
+            self._breaker._release(self)
+
+    def _finish(self, failed: bool, duration: float):
+        if not self._done:
+            self._done = True
+            self._breaker._record(self, failed, duration)
+
+
+class CircuitBreaker:
+    """Closed -> open -> half-open breaker over a sliding window of call outcomes
+
+    The breaker opens once the window holds at least `minimum_calls` and either
+    the failure rate reaches `failure_rate_threshold` or the share of calls
+    slower than `slow_call_seconds` reaches `slow_call_rate_threshold`. After
+    `open_seconds` it lets `half_open_probes` calls through; if they all
+    succeed it closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate_threshold: float = 0.8,
+        minimum_calls: int = 5,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (finished at, failed, slow)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.counters: Dict[str, int] = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def acquire(self) -> CallPermit:
+        """Admit a call or raise CircuitOpenError"""
+        now = self._clock()
+        if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if self.state == CLOSED:
+            return CallPermit(self, probe=False)
+        if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return CallPermit(self, probe=True)
+        self.counters["rejected"] += 1
+        retry_after = max(0.0, self._opened_at + self.open_seconds - now) if self.state == OPEN else 0.0
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _release(self, permit: CallPermit):
+        if permit.probe and self.state == HALF_OPEN:
+            self._probes_in_flight -= 1
+
+    def _record(self, permit: CallPermit, failed: bool, duration: float):
+        now = self._clock()
+        slow = duration >= self.slow_call_seconds
+        self.counters["calls"] += 1
+        self.counters["failures"] += failed
+        self.counters["slow_calls"] += slow
+
+        if permit.probe:
+            if self.state != HALF_OPEN:
+                return
+            self._probes_in_flight -= 1
+            if failed or slow:
+                self._open(now)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+            return
+
+        self._calls.append((now, failed, slow))
+        self._prune(now)
+        if self.state == CLOSED and self._should_open():
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.counters["opened"] += 1
+        print(f"⚡ Circuit for {self.name} opened for {self.open_seconds:.0f}s")
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._calls:
+            return 0.0, 0.0
+        total = len(self._calls)
+        return sum(call[1] for call in self._calls) / total, sum(call[2] for call in self._calls) / total
+
+    def _should_open(self) -> bool:
+        if len(self._calls) < self.minimum_calls:
+            return False
+        failure_rate, slow_rate = self._rates()
+        return failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        self._prune(now)
+        failure_rate, slow_rate = self._rates()
+        open_for = max(0.0, self._opened_at + self.open_seconds - now) if self.state == OPEN else 0.0
+        return {
+            **self.counters,
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "open_seconds_remaining": round(open_for, 1),
+        }
+
+
+class CircuitBreakerRegistry:
+    """One breaker per model, created on first use with shared settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model, **self.settings)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model: breaker.stats() for model, breaker in self._breakers.items()}
+
+
+class RetryBudget:
+    """Caps retries across all callers to a share of recent requests
+
+    Within `window_seconds`, retries may not exceed `ratio` times the number of
+    requests plus `min_retries_per_second` times the window, so an outage does
+    not multiply upstream load. `backoff(attempt)` is a full-jitter exponential
+    delay.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries_per_second: float = 0.1,
+        window_seconds: float = 10.0,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.counters: Dict[str, int] = {"requests": 0, "retries": 0, "denied": 0}
+
+    def _prune(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window_seconds:
+                events.popleft()
+
+    def _allowance(self) -> float:
+        return self.ratio * len(self._requests) + self.min_retries_per_second * self.window_seconds
+
+    def record_request(self):
+        """Count a first attempt; each one earns `ratio` retries"""
+        now = self._clock()
+        self._prune(now)
+        self._requests.append(now)
+        self.counters["requests"] += 1
+
+    def can_retry(self, attempt: int) -> bool:
+        """Withdraw one retry for a call that has already failed `attempt` times"""
+        now = self._clock()
+        self._prune(now)
+        if attempt > self.max_retries or len(self._retries) >= self._allowance():
+            self.counters["denied"] += 1
+            return False
+        self._retries.append(now)
+        self.counters["retries"] += 1
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune(self._clock())
+        return {
+            **self.counters,
+            "window_requests": len(self._requests),
+            "window_retries": len(self._retries),
+            "available": max(0, int(self._allowance()) - len(self._retries)),
+        }
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def create_circuit_breakers() -> Optional[CircuitBreakerRegistry]:
+    """Build per-model breakers from LLM_BREAKER_* environment variables (None when disabled)"""
+    failure_rate = _env_float("LLM_BREAKER_FAILURE_RATE", 0.5)
+    if failure_rate <= 0:
+        return None
+    return CircuitBreakerRegistry(
+        failure_rate_threshold=failure_rate,
+        slow_call_seconds=_env_float("LLM_BREAKER_SLOW_SECONDS", 20.0),
+        slow_call_rate_threshold=_env_float("LLM_BREAKER_SLOW_RATE", 0.8),
+        minimum_calls=int(_env_float("LLM_BREAKER_MIN_CALLS", 5)),
+        window_seconds=_env_float("LLM_BREAKER_WINDOW_SECONDS", 60.0),
+        open_seconds=_env_float("LLM_BREAKER_OPEN_SECONDS", 30.0),
+        half_open_probes=int(_env_float("LLM_BREAKER_PROBES", 1)),
+    )
+
+
+def create_retry_budget() -> RetryBudget:
+    """Build the retry budget from LLM_RETRY_* environment variables"""
+    return RetryBudget(
+        ratio=_env_float("LLM_RETRY_BUDGET_RATIO", 0.2),
+        max_retries=int(_env_float("LLM_RETRY_MAX", 2)),
+        base_delay=_env_float("LLM_RETRY_BASE_DELAY", 0.5),
+        max_delay=_env_float("LLM_RETRY_MAX_DELAY", 8.0),
+    )
@@ -0,0 +1,21 @@
+"""
+Test Configuration
+Points the files that the servers create at import time at a temporary
+directory, so test runs leave nothing behind in the repo's output folder
+"""
+
+import os
+import shutil
+import tempfile
+
+_test_output = tempfile.mkdtemp(prefix="content-tests-")
+
+
+def pytest_configure(config):
+    # Set before any test module imports api_server or real_api_server
+    os.environ["TASK_RESULT_DIR"] = os.path.join(_test_output, "task_results")
+    os.environ["CHECKPOINT_PATH"] = os.path.join(_test_output, "checkpoints.db")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_test_output, ignore_errors=True)
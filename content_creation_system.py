@@ -23,6 +23,8 @@ from typing import List, Dict, Any
 from agents import Agent, Runner, function_tool, trace
 from pydantic import BaseModel, Field
 
+from topic_normalizer import create_topic_normalizer, process_user_input
+
 
 # ========================= DATA MODELS =========================
 
@@ -473,6 +475,16 @@ publisher_agent = Agent[None](
 
 # ========================= MAIN WORKFLOW =========================
 
+topic_normalizer = create_topic_normalizer()  # None when TOPIC_FAST_PATH=0
+
+
+async def ask_user_input_agent(topic: str) -> UserInput:
+    """Have the user input agent interpret a topic"""
+    user_input_result = await Runner.run(
+        user_input_agent, f"Process this topic for content creation: {topic}"
+    )
+    return user_input_result.final_output
+
 
 async def create_content_workflow(user_topic: str) -> PublishedArticle:
     """
@@ -485,10 +497,9 @@ async def create_content_workflow(user_topic: str) -> PublishedArticle:
 
         # Step 1: Process User Input
         print("📝 Step 1: Processing user input...")
-        user_input_result = await Runner.run(
-            user_input_agent, f"Process this topic for content creation: {user_topic}"
+        user_input_data = await process_user_input(
+            topic_normalizer, user_topic, UserInput, ask_user_input_agent
         )
-        user_input_data = user_input_result.final_output
         print(f"✅ Topic validated: {user_input_data.topic}")
 
         # Step 2: Research the Topic
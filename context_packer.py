@@ -0,0 +1,221 @@
+"""
+Context Packer
+Token-aware selection of the context passed from one pipeline step to the next.
+Text is split into headings, list items and sentences, each unit is scored for
+relevance to a query, and the best units are kept in their original order up to
+a token budget. Tokens are counted with tiktoken; they are only estimated when
+its encoding files cannot be loaded (they are downloaded on first use).
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import tiktoken
+
+FALLBACK_ENCODING = "o200k_base"
+HEADING = re.compile(r"^\s{0,3}(#{1,6}\s+.+|\*\*[^*]+\*\*:?|[A-Z][^.!?]{0,80}:)\s*$")
+LIST_ITEM = re.compile(r"^\s*([-*+]|\d{1,3}[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in into is it its of on or that the their this "
+    "to was were what when which who why will with you your".split()
+)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """tiktoken encoding for `model`, or None when its encoding files cannot be loaded"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:  # unknown model
+        pass
+    except Exception as e:
+        print(f"⚠️ No tiktoken encoding for {model}, estimating token counts: {e}")
+        return None
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:  # the encoding files are downloaded on first use
+        print(f"⚠️ No tiktoken encoding for {model}, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Token count of `text` for `model` (estimated when its encoding cannot be loaded)"""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Words and punctuation are roughly one token each, long words are split further
+    pieces = re.findall(r"\w+|[^\w\s]", text)
+    return sum(max(1, math.ceil(len(piece) / 6)) for piece in pieces)
+
+
+def heading_level(text: str) -> int:
+    """Markdown heading depth; bold or colon-terminated headings rank below all of them"""
+    hashes = len(text) - len(text.lstrip("#"))
+    return hashes or 7
+
+
+def keywords(text: str) -> List[str]:
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 2]
+
+
+class Unit(NamedTuple):
+    """One heading, list item or sentence, with where it came from"""
+    index: int
+    block: int  # units from the same paragraph or list share a block
+    kind: str  # heading, item or sentence
+    text: str
+
+
+def split_units(text: str) -> List[Unit]:
+    """Split text into headings, list items and sentences in document order"""
+    units: List[Unit] = []
+    block = 0
+    paragraph: List[str] = []
+
+    def flush():
+        nonlocal block
+        if paragraph:
+            for sentence in SENTENCE_END.split(" ".join(paragraph)):
+                if sentence.strip():
+                    units.append(Unit(len(units), block, "sentence", sentence.strip()))
+            paragraph.clear()
+            block += 1
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            flush()
+        elif HEADING.match(line):
+            flush()
+            units.append(Unit(len(units), block, "heading", stripped))
+            block += 1
+        elif LIST_ITEM.match(line):
+            flush()
+            units.append(Unit(len(units), block, "item", stripped))
+        else:
+            if units and units[-1].kind == "item" and units[-1].block == block and line[:1] in (" ", "\t"):
+                # Continuation line of a list item
+                units[-1] = units[-1]._replace(text=f"{units[-1].text} {stripped}")
+            else:
+                paragraph.append(stripped)
+    flush()
+    return units
+
+
+def heading_ancestors(units: List[Unit]) -> Dict[int, List[int]]:
+    """Indexes of the headings enclosing each unit, outermost first"""
+    ancestors: Dict[int, List[int]] = {}
+    stack: List[Tuple[int, int]] = []  # (level, index) of open headings
+    for unit in units:
+        if unit.kind == "heading":
+            level = heading_level(unit.text)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            ancestors[unit.index] = [index for _, index in stack]
+            stack.append((level, unit.index))
+        else:
+            ancestors[unit.index] = [index for _, index in stack]
+    return ancestors
+
+
+def overlap(text: str, query_terms: set) -> float:
+    terms = keywords(text)
+    return len(query_terms.intersection(terms)) / math.sqrt(len(terms)) if terms else 0.0
+
+
+def score_unit(unit: Unit, query_terms: set, total: int, headings: str = "") -> float:
+    """Relevance to the query (and of the enclosing headings) plus position and kind priors"""
+    prior = {"heading": 0.4, "item": 0.3, "sentence": 0.2}[unit.kind]
+    # Earlier text (introductions, summaries) matters a little more
+    position = 0.3 * (1 - unit.index / max(1, total))
+    return overlap(unit.text, query_terms) + 0.5 * overlap(headings, query_terms) + prior + position
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    source_tokens: int
+    units_kept: int
+    units_total: int
+
+
+def pack_context(text: str, budget_tokens: int, query: str = "", model: str = "gpt-4o-mini") -> PackedContext:
+    """Keep the most relevant units of `text` that fit in `budget_tokens`, in original order
+
+    Text that already fits is returned unchanged. Units never get cut mid-sentence.
+    """
+    source_tokens = count_tokens(text, model)
+    units = split_units(text)
+    if source_tokens <= budget_tokens:
+        return PackedContext(text, source_tokens, source_tokens, len(units), len(units))
+
+    query_terms = set(keywords(query))
+    ancestors = heading_ancestors(units)
+    # Headings are only kept as the context of a kept unit under them; a heading with
+    # nothing under it (an outline entry) competes on its own
+    has_children = {index for chain in ancestors.values() for index in chain}
+    candidates = [unit for unit in units if unit.index not in has_children]
+    ranked = sorted(candidates, key=lambda unit: (
+        -score_unit(unit, query_terms, len(units), " ".join(units[i].text for i in ancestors[unit.index])),
+        unit.index,
+    ))
+    # One extra token per unit for the separator joining it to its neighbour
+    costs = {unit.index: count_tokens(unit.text, model) + 1 for unit in units}
+    kept = set()
+    used = 0
+    for unit in ranked:
+        needed = [index for index in ancestors[unit.index] if index not in kept] + [unit.index]
+        cost = sum(costs[index] for index in needed)
+        if used + cost <= budget_tokens:
+            kept.update(needed)
+            used += cost
+
+    selected = [units[index] for index in sorted(kept)]
+    lines: List[str] = []
+    previous: Optional[Unit] = None
+    for unit in selected:
+        if previous is not None and unit.kind == "sentence" and previous.block == unit.block:
+            lines[-1] += " " + unit.text
+        else:
+            lines.append(unit.text)
+        previous = unit
+    packed = "\n".join(lines)
+    return PackedContext(packed, count_tokens(packed, model), source_tokens, len(selected), len(units))
+
+
+class ContextPacker:
+    """Per-task packer that memoizes results and totals the tokens saved
+
+    Steps that read the same upstream output with the same budget and query
+    (image concepts and SEO both read the article) share one packing.
+    """
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.model = model
+        self._memo: Dict[Tuple[str, int, str], PackedContext] = {}
+        self.counters: Dict[str, int] = {"calls": 0, "memo_hits": 0, "source_tokens": 0, "packed_tokens": 0}
+
+    def pack(self, text: str, budget_tokens: int, query: str = "") -> str:
+        key = (text, budget_tokens, query)
+        packed = self._memo.get(key)
+        self.counters["calls"] += 1
+        if packed is None:
+            packed = self._memo[key] = pack_context(text, budget_tokens, query, self.model)
+        else:
+            self.counters["memo_hits"] += 1
+        self.counters["source_tokens"] += packed.source_tokens
+        self.counters["packed_tokens"] += packed.tokens
+        return packed.text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "tokens_saved": self.counters["source_tokens"] - self.counters["packed_tokens"],
+            "tokenizer": "tiktoken" if get_encoding(self.model) is not None else "estimate",
+        }
@@ -0,0 +1,126 @@
+"""
+Download Cache
+Pre-encoded download bodies (identity, gzip, brotli) with strong ETags, plus
+the HTTP content negotiation helpers used to serve them
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, Optional, Union
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Preferred order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ["br", "gzip", "identity"]
+CHUNK_SIZE = 64 * 1024
+
+
+class PreparedDownload:
+    """One downloadable document, encoded once in every supported content-coding"""
+
+    def __init__(
+        self,
+        content: Union[str, bytes],
+        media_type: str,
+        filename: str,
+        compress: bool = True,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.media_type = media_type
+        self.filename = filename
+        identity = content.encode("utf-8") if isinstance(content, str) else content
+        digest = hashlib.sha256(identity).hexdigest()[:32]
+
+        self.bodies: Dict[str, bytes] = {"identity": identity}
+        compressed: Dict[str, bytes] = {}
+        if compress:
+            compressed["gzip"] = gzip.compress(identity, compresslevel=gzip_level, mtime=0)
+            if brotli is not None:
+                compressed["br"] = brotli.compress(identity, quality=brotli_quality)
+        for encoding, body in compressed.items():
+            # Only keep encodings that actually save bytes
+            if len(body) < len(identity):
+                self.bodies[encoding] = body
+
+        # Strong validators must differ between content-codings of the same document
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available) -> str:
+    """Pick the best available content-coding for an Accept-Encoding header"""
+    if not accept_encoding:
+        return "identity"
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        pieces = [piece.strip() for piece in part.split(";")]
+        coding = pieces[0].lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+
+    def weight(encoding: str) -> float:
+        if encoding in weights:
+            return weights[encoding]
+        if "*" in weights:
+            return weights["*"]
+        # identity is acceptable unless explicitly refused, but only as a last resort
+        return 0.001 if encoding == "identity" else 0.0
+
+    candidates = [e for e in ENCODING_PREFERENCE if e in available and weight(e) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=lambda e: (weight(e), -ENCODING_PREFERENCE.index(e)))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def iter_chunks(body: bytes, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+class DownloadCache:
+    """Bounded LRU of prepared downloads"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, PreparedDownload]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[PreparedDownload]:
+        prepared = self._entries.get(key)
+        if prepared is not None:
+            self._entries.move_to_end(key)
+        return prepared
+
+    def put(self, key: Hashable, prepared: PreparedDownload):
+        self._entries[key] = prepared
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
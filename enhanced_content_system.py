@@ -9,13 +9,18 @@ import asyncio
 import os
 import json
 import hashlib
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 
 from agents import Agent, Runner, function_tool, trace
 from pydantic import BaseModel, Field
 
+from context_packer import pack_context
+from markdown_renderer import render_markdown
+from topic_normalizer import create_topic_normalizer, process_user_input
+
 
 # ========================= ENHANCED DATA MODELS =========================
 
@@ -26,6 +31,7 @@ class ContentCreationConfig(BaseModel):
     max_word_count: int = 2000
     include_toc: bool = True
     include_references: bool = True
+    publish_mode: Literal["local", "agent"] = "local"  # "local": assemble the article in Python; "agent": ask publisher_agent
 
 
 class UserInput(BaseModel):
@@ -88,8 +94,8 @@ class PublishedArticle(BaseModel):
 
 
 # ========================= ENHANCED UTILITY FUNCTIONS =========================
+# Plain functions, so the workflow can call them directly; publisher_agent gets them as tools
 
-@function_tool
 def create_url_slug(title: str) -> str:
     """Create a URL-friendly slug from a title"""
     import re
@@ -100,7 +106,6 @@ def create_url_slug(title: str) -> str:
     return slug
 
 
-@function_tool
 def calculate_read_time(content: str) -> str:
     """Calculate estimated reading time based on word count"""
     word_count = len(content.split())
@@ -109,7 +114,6 @@ def calculate_read_time(content: str) -> str:
     return f"{minutes} min read"
 
 
-@function_tool
 def save_markdown_file(content: str, title: str, directory: str = "output") -> str:
     """Save markdown content to file"""
     output_dir = Path(directory)
@@ -125,7 +129,6 @@ def save_markdown_file(content: str, title: str, directory: str = "output") -> s
     return str(file_path.absolute())
 
 
-@function_tool
 def create_enhanced_html_template(
     title: str, 
     subtitle: str,
@@ -135,11 +138,18 @@ def create_enhanced_html_template(
     read_time: str = "5 min read",
     image_urls: List[str] = None
 ) -> str:
-    """Create an enhanced interactive HTML template"""
+    """Create an enhanced interactive HTML template
+
+    Args:
+        content: Article body as markdown; it is rendered to HTML here, so pass it unchanged.
+            Content that already starts with an HTML tag is used as is.
+    """
     if image_urls is None:
         image_urls = []
     if toc is None:
         toc = []
+    if not content.lstrip().startswith("<"):
+        content = render_markdown(content)
     
     # Generate TOC HTML
     toc_html = ""
@@ -870,13 +880,128 @@ publisher_agent = Agent[None](
 
     Deliver a polished, professional publication that showcases the content effectively.
     """,
-    tools=[save_markdown_file, create_enhanced_html_template, create_url_slug, calculate_read_time],
+    tools=[function_tool(tool) for tool in (
+        save_markdown_file, create_enhanced_html_template, create_url_slug, calculate_read_time
+    )],
     output_type=PublishedArticle,
 )
 
 
+# ========================= LOCAL PUBLISHING =========================
+
+def estimate_seo_score(markdown_data: MarkdownContent) -> int:
+    """Rate the article's SEO metadata 1-10 with fixed checks, in place of the publisher agent's rating"""
+    title = markdown_data.title.lower()
+    description = markdown_data.meta_description.lower()
+    keywords = [keyword.lower() for keyword in markdown_data.keywords]
+    checks = [
+        10 <= len(markdown_data.title) <= 60,
+        50 <= len(markdown_data.meta_description) <= 160,
+        bool(markdown_data.subtitle),
+        len(keywords) >= 3,
+        any(keyword in title for keyword in keywords),
+        any(keyword in description for keyword in keywords),
+        len(markdown_data.table_of_contents) >= 3,
+        "\n## " in "\n" + markdown_data.markdown_content,
+        len(markdown_data.markdown_content.split()) >= 300,
+    ]
+    return 1 + sum(checks)
+
+
+def build_publish_prompt(
+    markdown_data: MarkdownContent,
+    image_data: ImageDescription,
+    image_urls: List[str],
+    markdown_path: str,
+    config: ContentCreationConfig
+) -> str:
+    """Instructions for publisher_agent (the "agent" publish mode)"""
+    return f"""
+    Create and publish a professional, interactive HTML article with these specifications:
+
+    CONTENT:
+    Title: {markdown_data.title}
+    Subtitle: {markdown_data.subtitle}
+    Meta Description: {markdown_data.meta_description}
+    Table of Contents: {markdown_data.table_of_contents}
+    Content: {markdown_data.markdown_content}
+    Reading Time: {markdown_data.estimated_read_time}
+
+    VISUALS:
+    Image URLs: {image_urls}
+    Hero Image: {image_data.hero_image}
+    Section Images: {image_data.section_images}
+    Visual Style: {image_data.image_style}
+
+    REQUIREMENTS:
+    - Create responsive, accessible HTML
+    - Pass the markdown content unchanged to create_enhanced_html_template (it renders it)
+    - Include proper SEO metadata
+    - Generate URL-friendly slug
+    - Save in directory: {config.output_directory}
+    - Ensure professional presentation
+    - Rate the final SEO optimization (1-10)
+
+    Markdown file saved at: {markdown_path}
+    """
+
+
+def publish_article_locally(
+    markdown_data: MarkdownContent,
+    image_urls: List[str],
+    markdown_path: str,
+    config: ContentCreationConfig
+) -> PublishedArticle:
+    """Build and save the HTML article with the publisher's tools called directly, without an LLM"""
+    slug = create_url_slug(markdown_data.title)
+    read_time = calculate_read_time(markdown_data.markdown_content)
+    html = create_enhanced_html_template(
+        markdown_data.title,
+        markdown_data.subtitle,
+        markdown_data.markdown_content,
+        toc=markdown_data.table_of_contents if config.include_toc else [],
+        meta_description=markdown_data.meta_description,
+        read_time=read_time,
+        image_urls=image_urls
+    )
+    html_path = Path(config.output_directory) / f"{slug}.html"
+    html_path.parent.mkdir(exist_ok=True)
+    html_path.write_text(html, encoding="utf-8")
+    
+    return PublishedArticle(
+        html_file_path=str(html_path.absolute()),
+        markdown_file_path=markdown_path,
+        article_title=markdown_data.title,
+        article_url_slug=slug,
+        word_count=len(markdown_data.markdown_content.split()),
+        sections_count=len(markdown_data.sections),
+        images_included=len(image_urls),
+        publish_date=datetime.now().strftime("%Y-%m-%d"),
+        estimated_read_time=read_time,
+        seo_score=estimate_seo_score(markdown_data)
+    )
+
+
 # ========================= ENHANCED WORKFLOW =========================
 
+# Local topic cleanup in front of user_input_agent (None when TOPIC_FAST_PATH=0)
+topic_normalizer = create_topic_normalizer()
+
+
+async def ask_user_input_agent(topic: str) -> UserInput:
+    """Have the user input agent interpret and enhance a topic"""
+    user_input_result = await Runner.run(
+        user_input_agent,
+        f"""Analyze and enhance this topic for content creation: "{topic}"
+        
+        Ensure the topic is specific, appropriate, and suitable for creating quality content.
+        Recommend appropriate settings for target audience, content type, and tone.
+        If the topic needs improvement, suggest enhancements while maintaining the user's intent.
+        """
+    )
+    return user_input_result.final_output
+
+
 async def create_enhanced_content_workflow(
     user_topic: str, 
     config: ContentCreationConfig = ContentCreationConfig()
@@ -896,16 +1021,9 @@ async def create_enhanced_content_workflow(
         try:
             # Step 1: Process and Enhance User Input
             print("📝 Step 1: Processing and enhancing user input...")
-            user_input_result = await Runner.run(
-                user_input_agent,
-                f"""Analyze and enhance this topic for content creation: "{user_topic}"
-                
-                Ensure the topic is specific, appropriate, and suitable for creating quality content.
-                Recommend appropriate settings for target audience, content type, and tone.
-                If the topic needs improvement, suggest enhancements while maintaining the user's intent.
-                """
+            user_input_data = await process_user_input(
+                topic_normalizer, user_topic, UserInput, ask_user_input_agent
             )
-            user_input_data = user_input_result.final_output
             print(f"✅ Topic processed: {user_input_data.topic}")
             print(f"   Audience: {user_input_data.target_audience} | Type: {user_input_data.content_type}")
             
@@ -986,7 +1104,7 @@ async def create_enhanced_content_workflow(
                 Target Audience: {user_input_data.target_audience}
 
                 CONTENT PREVIEW:
-                {markdown_data.markdown_content[:800]}...
+                {pack_context(markdown_data.markdown_content, 200, " ".join(markdown_data.keywords)).text}
 
                 Create detailed image specifications including:
                 - Hero image with specific prompt and alt text
@@ -1027,36 +1145,19 @@ async def create_enhanced_content_workflow(
                 config.output_directory
             )
             
-            publish_input = f"""
-            Create and publish a professional, interactive HTML article with these specifications:
-
-            CONTENT:
-            Title: {markdown_data.title}
-            Subtitle: {markdown_data.subtitle}
-            Meta Description: {markdown_data.meta_description}
-            Table of Contents: {markdown_data.table_of_contents}
-            Content: {markdown_data.markdown_content}
-            Reading Time: {markdown_data.estimated_read_time}
-
-            VISUALS:
-            Image URLs: {image_urls}
-            Hero Image: {image_data.hero_image}
-            Section Images: {image_data.section_images}
-            Visual Style: {image_data.image_style}
-
-            REQUIREMENTS:
-            - Create responsive, accessible HTML
-            - Include proper SEO metadata
-            - Generate URL-friendly slug
-            - Save in directory: {config.output_directory}
-            - Ensure professional presentation
-            - Rate the final SEO optimization (1-10)
-
-            Markdown file saved at: {markdown_path}
-            """
-            
-            publish_result = await Runner.run(publisher_agent, publish_input)
-            final_article = publish_result.final_output
+            started = time.perf_counter()
+            if config.publish_mode == "agent":
+                publish_input = build_publish_prompt(
+                    markdown_data, image_data, image_urls, markdown_path, config
+                )
+                publish_result = await Runner.run(publisher_agent, publish_input)
+                final_article = publish_result.final_output
+                usage = publish_result.context_wrapper.usage
+                print(f"   Publisher agent: {time.perf_counter() - started:.1f}s, {usage.requests} LLM calls, "
+                      f"{usage.input_tokens} input + {usage.output_tokens} output tokens")
+            else:
+                final_article = publish_article_locally(markdown_data, image_urls, markdown_path, config)
+                print(f"   Published locally in {(time.perf_counter() - started) * 1000:.0f} ms")
             
             print(f"✅ Article published successfully!")
             print(f"   HTML: {final_article.html_file_path}")
@@ -1090,13 +1191,15 @@ async def main():
     print("\n⚙️  Configuration Options:")
     generate_images = input("🖼️  Generate real images? (y/N): ").lower().startswith('y')
     output_dir = input("📁 Output directory (default: output): ").strip() or "output"
+    use_publisher_agent = input("🤖 Publish with the LLM publisher agent? (y/N): ").lower().startswith('y')
     
     config = ContentCreationConfig(
         output_directory=output_dir,
         generate_real_images=generate_images,
         max_word_count=2000,
         include_toc=True,
-        include_references=True
+        include_references=True,
+        publish_mode="agent" if use_publisher_agent else "local"
     )
     
     print(f"\n🚀 Starting content creation for: '{topic}'")
@@ -0,0 +1,505 @@
+"""
+Fake OpenAI-Compatible Completions Server
+Local stand-in for the chat completions, responses, files and batches APIs, used
+for benchmarks and offline tests. Latency, token throughput and injected failures
+(429s, 500s, hung requests) are configurable so load tests can exercise the error
+paths.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+import uvicorn
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+class FakeServerConfig(BaseModel):
+    """Behaviour of the fake server"""
+    latency_ms: float = 200.0
+    # fixed: always latency_ms; uniform: latency_ms +/- jitter; normal: mean latency_ms,
+    # stddev jitter; lognormal: median latency_ms with a long tail set by jitter
+    latency_distribution: str = "fixed"
+    latency_jitter_ms: float = 0.0
+    token_delay_ms: float = 0.0  # pause between streamed chunks
+    tokens_per_second: float = 0.0  # generation speed, 0 = instant (overrides token_delay_ms)
+    completion_text: str = "# Fake Article\n\nThis is a canned completion from the local fake server."
+    rate_limited_requests: int = 0  # answer the first N requests with 429
+    retry_after_seconds: float = 0.05
+    rate_limit_rate: float = 0.0  # fraction of requests answered with 429
+    server_error_rate: float = 0.0  # fraction of requests answered with 500
+    timeout_rate: float = 0.0  # fraction of requests that hang for timeout_seconds
+    timeout_seconds: float = 120.0
+    batch_latency_ms: float = 100.0  # time a submitted batch takes to complete
+    seed: Optional[int] = None
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: Optional[str] = None
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str
+    messages: List[ChatMessage]
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    stream: bool = False
+    stream_options: Optional[Dict[str, Any]] = None
+
+
+def _count_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def sample_latency(config: FakeServerConfig, rng: random.Random) -> float:
+    """Draw one response latency in seconds from the configured distribution"""
+    mean, jitter = config.latency_ms, config.latency_jitter_ms
+    if config.latency_distribution == "uniform":
+        value = rng.uniform(mean - jitter, mean + jitter)
+    elif config.latency_distribution == "normal":
+        value = rng.gauss(mean, jitter)
+    elif config.latency_distribution == "lognormal":
+        value = rng.lognormvariate(math.log(mean), jitter / mean) if mean > 0 else 0.0
+    else:
+        value = mean
+    return max(0.0, value) / 1000.0
+
+
+def sample_from_schema(schema: Dict[str, Any], root: Optional[Dict[str, Any]] = None) -> Any:
+    """Build a minimal instance that validates against a JSON schema
+
+    Used to answer structured-output requests (agents with an `output_type`)
+    with something the caller can parse.
+    """
+    root = root or schema
+    if "$ref" in schema:
+        target: Any = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            target = target[part]
+        return sample_from_schema(target, root)
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if schema.get(key):
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return sample_from_schema(options[0], root)
+
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        if not properties and isinstance(schema.get("additionalProperties"), dict):
+            return {"key": sample_from_schema(schema["additionalProperties"], root)}
+        return {name: sample_from_schema(prop, root) for name, prop in properties.items()}
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), root)]
+    if kind == "string":
+        return "fake " + str(schema.get("title", "text")).lower()
+    if kind == "integer":
+        return int(schema.get("minimum", 1))
+    if kind == "number":
+        return float(schema.get("minimum", 1.0))
+    if kind == "boolean":
+        return True
+    return None
+
+
+def _response_input_text(body: Dict[str, Any]) -> str:
+    """Flatten a responses API `input` (string or list of items) for token counting"""
+    parts = [body.get("instructions") or ""]
+    items = body.get("input") or ""
+    if isinstance(items, str):
+        parts.append(items)
+    else:
+        for item in items:
+            content = item.get("content") if isinstance(item, dict) else None
+            if isinstance(content, str):
+                parts.append(content)
+            elif isinstance(content, list):
+                parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+def create_fake_app(config: Optional[FakeServerConfig] = None) -> FastAPI:
+    """Build a FastAPI app that answers like the OpenAI chat completions, responses and batch APIs"""
+    config = config or FakeServerConfig()
+    if config.latency_distribution not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}")
+    app = FastAPI(title="Fake OpenAI Server")
+    app.state.config = config
+    app.state.request_count = 0
+    app.state.models: Dict[str, int] = {}  # chat completion requests per requested model
+    app.state.injected = {"rate_limit": 0, "server_error": 0, "timeout": 0}
+    app.state.files: Dict[str, bytes] = {}
+    app.state.batches: Dict[str, Dict[str, Any]] = {}
+    rng = random.Random(config.seed)
+    batch_tasks: set = set()  # running batches, referenced so they are not garbage collected
+
+    def usage(request: ChatCompletionRequest) -> Dict[str, int]:
+        prompt_tokens = sum(_count_tokens(m.content or "") for m in request.messages)
+        completion_tokens = _count_tokens(config.completion_text)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def chunk_delay(text: str) -> float:
+        """Seconds to wait before emitting `text` when streaming"""
+        if config.tokens_per_second:
+            return _count_tokens(text) / config.tokens_per_second
+        return config.token_delay_ms / 1000.0
+
+    async def simulate_request() -> Optional[JSONResponse]:
+        """Apply injected failures and latency; returns an error response or None"""
+        app.state.request_count += 1
+        if app.state.request_count <= config.rate_limited_requests or rng.random() < config.rate_limit_rate:
+            app.state.injected["rate_limit"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(int(config.retry_after_seconds * 1000))},
+                content={"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+            )
+        if rng.random() < config.server_error_rate:
+            app.state.injected["server_error"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected server error", "type": "server_error"}},
+            )
+        if rng.random() < config.timeout_rate:
+            # Hang long enough for the client's own timeout to fire first
+            app.state.injected["timeout"] += 1
+            await asyncio.sleep(config.timeout_seconds)
+        await asyncio.sleep(sample_latency(config, rng))
+        return None
+
+    async def stream_chunks(request: ChatCompletionRequest, completion_id: str):
+        """Yield the completion word by word as chat.completion.chunk events"""
+        words = config.completion_text.split(" ")
+        for index, word in enumerate(words):
+            delay = chunk_delay(word)
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": word if index == 0 else " " + word},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        if request.stream_options and request.stream_options.get("include_usage"):
+            usage_chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.model,
+                "choices": [],
+                "usage": usage(request),
+            }
+            yield f"data: {json.dumps(usage_chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: ChatCompletionRequest):
+        app.state.models[request.model] = app.state.models.get(request.model, 0) + 1
+        error = await simulate_request()
+        if error is not None:
+            return error
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if request.stream:
+            return StreamingResponse(stream_chunks(request, completion_id), media_type="text/event-stream")
+
+        if config.tokens_per_second:
+            await asyncio.sleep(chunk_delay(config.completion_text))
+        return completion_object(request, completion_id)
+
+    def completion_object(request: ChatCompletionRequest, completion_id: str) -> Dict[str, Any]:
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": config.completion_text},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage(request),
+        }
+
+    def response_text(body: Dict[str, Any]) -> str:
+        """Canned text, or a schema-shaped JSON document for structured output requests"""
+        text_format = (body.get("text") or {}).get("format") or {}
+        if text_format.get("type") == "json_schema" and text_format.get("schema"):
+            return json.dumps(sample_from_schema(text_format["schema"]))
+        return config.completion_text
+
+    def response_object(body: Dict[str, Any], response_id: str, message_id: str, text: Optional[str]) -> Dict[str, Any]:
+        """Responses API `response` object; `text=None` gives the in-progress shell"""
+        output, usage_block = [], None
+        if text is not None:
+            output = [{
+                "type": "message",
+                "id": message_id,
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }]
+            input_tokens = _count_tokens(_response_input_text(body))
+            output_tokens = _count_tokens(text)
+            usage_block = {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            }
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed" if text is not None else "in_progress",
+            "model": body.get("model", "gpt-4o"),
+            "instructions": body.get("instructions"),
+            "output": output,
+            "parallel_tool_calls": True,
+            "tool_choice": body.get("tool_choice") or "auto",
+            "tools": body.get("tools") or [],
+            "text": body.get("text") or {"format": {"type": "text"}},
+            "error": None,
+            "incomplete_details": None,
+            "metadata": {},
+            "usage": usage_block,
+        }
+
+    async def stream_response_events(body: Dict[str, Any], response_id: str, message_id: str):
+        """Yield the responses API streaming event sequence with text deltas"""
+        text = response_text(body)
+        sequence = 0
+
+        def event(payload: Dict[str, Any]) -> str:
+            nonlocal sequence
+            payload["sequence_number"] = sequence
+            sequence += 1
+            return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+        position = {"output_index": 0, "item_id": message_id, "content_index": 0}
+        message = {"type": "message", "id": message_id, "status": "in_progress", "role": "assistant", "content": []}
+        yield event({"type": "response.created", "response": response_object(body, response_id, message_id, None)})
+        yield event({"type": "response.output_item.added", "output_index": 0, "item": message})
+        yield event({
+            "type": "response.content_part.added", **position,
+            "part": {"type": "output_text", "text": "", "annotations": []},
+        })
+        words = text.split(" ")
+        for index, word in enumerate(words):
+            delta = word if index == 0 else " " + word
+            delay = chunk_delay(delta)
+            if delay:
+                await asyncio.sleep(delay)
+            yield event({"type": "response.output_text.delta", **position, "delta": delta, "logprobs": []})
+        yield event({"type": "response.output_text.done", **position, "text": text, "logprobs": []})
+        part = {"type": "output_text", "text": text, "annotations": []}
+        yield event({"type": "response.content_part.done", **position, "part": part})
+        completed = response_object(body, response_id, message_id, text)
+        yield event({"type": "response.output_item.done", "output_index": 0, "item": completed["output"][0]})
+        yield event({"type": "response.completed", "response": completed})
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        error = await simulate_request()
+        if error is not None:
+            return error
+
+        response_id = f"resp_{uuid.uuid4().hex}"
+        message_id = f"msg_{uuid.uuid4().hex}"
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_response_events(body, response_id, message_id), media_type="text/event-stream"
+            )
+
+        text = response_text(body)
+        if config.tokens_per_second:
+            await asyncio.sleep(chunk_delay(text))
+        return response_object(body, response_id, message_id, text)
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        form = await request.form()
+        upload = form["file"]
+        data = await upload.read()
+        file_id = f"file-{uuid.uuid4().hex}"
+        app.state.files[file_id] = data
+        return file_object(file_id, upload.filename, form.get("purpose", "batch"))
+
+    def file_object(file_id: str, filename: str, purpose: str) -> Dict[str, Any]:
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(app.state.files[file_id]),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in app.state.files:
+            raise HTTPException(status_code=404, detail="No such file")
+        return Response(app.state.files[file_id], media_type="application/jsonl")
+
+    def batch_line_result(line: str, endpoint: str) -> Dict[str, Any]:
+        """One output (or error) line of a batch, answered like a chat completion"""
+        item = json.loads(line)
+        result: Dict[str, Any] = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": item.get("custom_id")}
+        if item.get("url") != endpoint or item.get("method") != "POST":
+            result["error"] = {"code": "invalid_request", "message": f"Line must POST to {endpoint}"}
+            return result
+        if rng.random() < config.server_error_rate:
+            app.state.injected["server_error"] += 1
+            result["response"] = {"status_code": 500, "body": {"error": {"message": "Injected server error"}}}
+            return result
+        request = ChatCompletionRequest(**item["body"])
+        body = completion_object(request, f"chatcmpl-{uuid.uuid4().hex}")
+        result["response"] = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": body}
+        result["error"] = None
+        return result
+
+    async def process_batch(batch: Dict[str, Any]):
+        batch["status"] = "in_progress"
+        await asyncio.sleep(config.batch_latency_ms / 1000.0)
+        lines = [line for line in app.state.files[batch["input_file_id"]].decode("utf-8").splitlines() if line.strip()]
+        outputs, errors = [], []
+        for line in lines:
+            result = batch_line_result(line, batch["endpoint"])
+            ok = result.get("response", {}).get("status_code") == 200
+            (outputs if ok else errors).append(json.dumps(result))
+        for kind, rows in (("output_file_id", outputs), ("error_file_id", errors)):
+            if rows:
+                file_id = f"file-{uuid.uuid4().hex}"
+                app.state.files[file_id] = ("\n".join(rows) + "\n").encode("utf-8")
+                batch[kind] = file_id
+        batch["request_counts"] = {"total": len(lines), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in app.state.files:
+            raise HTTPException(status_code=400, detail="Unknown input_file_id")
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata"),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        app.state.batches[batch["id"]] = batch
+        task = asyncio.ensure_future(process_batch(batch))
+        batch_tasks.add(task)
+        task.add_done_callback(batch_tasks.discard)
+        return batch
+
+    @app.get("/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        if batch_id not in app.state.batches:
+            raise HTTPException(status_code=404, detail="No such batch")
+        return app.state.batches[batch_id]
+
+    @app.get("/v1/stats")
+    async def stats():
+        """Request and injected-failure counts, for load test reports"""
+        return {
+            "requests": app.state.request_count,
+            "models": app.state.models,
+            "injected": app.state.injected,
+            "batches": len(app.state.batches),
+        }
+
+    return app
+
+
+def config_from_args(args: argparse.Namespace) -> FakeServerConfig:
+    return FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        batch_latency_ms=args.batch_latency_ms,
+        seed=args.seed,
+    )
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Fake server behaviour flags, shared with the load generator"""
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0)
+    parser.add_argument("--batch-latency-ms", type=float, default=100.0, help="time a batch takes to complete")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🧪 Fake OpenAI server on http://{args.host}:{args.port}/v1")
+    uvicorn.run(
+        create_fake_app(config_from_args(args)),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
@@ -49,6 +49,13 @@ import remarkGfm from 'remark-gfm';
 import rehypeRaw from 'rehype-raw';
 import './App.css';
 
+// The CRA dev server (port 3000) does not proxy WebSockets, so talk to the API directly there
+const WS_BASE_URL = process.env.REACT_APP_WS_URL || (
+  window.location.port === '3000'
+    ? `ws://${window.location.hostname}:8000`
+    : `${window.location.protocol === 'https:' ? 'wss:' : 'ws:'}//${window.location.host}`
+);
+
 const steps = [
   {
     label: 'User Input Processing',
@@ -99,6 +106,7 @@ function App() {
   const [stepResults, setStepResults] = useState({});
   const [finalResult, setFinalResult] = useState(null);
   const [error, setError] = useState(null);
+  const [cancelled, setCancelled] = useState(false);
   const [progress, setProgress] = useState(0);
   const [currentOperation, setCurrentOperation] = useState('');
   
@@ -128,6 +136,7 @@ function App() {
 
     setIsProcessing(true);
     setError(null);
+    setCancelled(false);
     setActiveStep(0);
     setStepResults({});
     setFinalResult(null);
@@ -144,8 +153,8 @@ function App() {
       });
 
       if (response.data.task_id) {
-        // Start polling for progress
-        startProgressPolling(response.data.task_id);
+        // Follow progress over the WebSocket (falls back to polling)
+        startProgressSocket(response.data.task_id);
       } else {
         throw new Error('Failed to start content creation');
       }
@@ -156,35 +165,84 @@ function App() {
     }
   };
 
+  // Apply a task status (full or partial) to the UI; returns true once the task has finished
+  const applyStatus = (data) => {
+    // Calculate progress based on current step (5 steps total)
+    const calculatedProgress = data.current_step ? (data.current_step / 5) * 100 : 0;
+    setProgress(calculatedProgress);
+    setCurrentOperation(data.current_operation || '');
+    setActiveStep(data.current_step - 1); // Convert to 0-based index for stepper
+    
+    // Update step results
+    if (data.step_results) {
+      setStepResults(prev => ({
+        ...prev,
+        ...data.step_results
+      }));
+    }
+    
+    // Check if completed
+    if (data.status === 'completed') {
+      setFinalResult(data.final_result);
+      setIsProcessing(false);
+      setProgress(100);
+      return true;
+    } else if (data.status === 'failed' || data.status === 'error') {
+      setError(data.error || 'Content creation failed');
+      setIsProcessing(false);
+      return true;
+    } else if (data.status === 'cancelled') {
+      setCancelled(true);
+      setIsProcessing(false);
+      setActiveStep(-1);
+      return true;
+    }
+    return false;
+  };
+
+  const startProgressSocket = (taskId) => {
+    if (!window.WebSocket) {
+      startProgressPolling(taskId);
+      return;
+    }
+    
+    // The server sends a snapshot, then only the fields that changed
+    const status = {};
+    let finished = false;
+    const ws = new WebSocket(`${WS_BASE_URL}/api/content/ws/${taskId}`);
+    wsRef.current = ws;
+    
+    ws.onmessage = (event) => {
+      Object.assign(status, JSON.parse(event.data).fields);
+      finished = applyStatus(status) || finished;
+    };
+    ws.onclose = () => {
+      wsRef.current = null;
+      if (!finished) {
+        // Socket refused or dropped before the task finished: keep going by polling
+        startProgressPolling(taskId);
+      }
+    };
+  };
+
   const startProgressPolling = (taskId) => {
+    // After the first poll only fields changed since the last seen version are sent,
+    // and the last ETag turns an unchanged status into an empty 304
+    const status = {};
+    let etag = null;
     progressInterval.current = setInterval(async () => {
       try {
-        const response = await axios.get(`/api/content/status/${taskId}`);
-        const data = response.data;
-        
-        // Calculate progress based on current step (5 steps total)
-        const calculatedProgress = data.current_step ? (data.current_step / 5) * 100 : 0;
-        setProgress(calculatedProgress);
-        setCurrentOperation(data.current_operation || '');
-        setActiveStep(data.current_step - 1); // Convert to 0-based index for stepper
-        
-        // Update step results
-        if (data.step_results) {
-          setStepResults(prev => ({
-            ...prev,
-            ...data.step_results
-          }));
+        const response = await axios.get(`/api/content/status/${taskId}`, {
+          params: status.version === undefined ? {} : { since: status.version },
+          headers: etag ? { 'If-None-Match': etag } : {},
+          validateStatus: (code) => code === 200 || code === 304
+        });
+        if (response.status === 304) {
+          return;
         }
-        
-        // Check if completed
-        if (data.status === 'completed') {
-          setFinalResult(data.final_result);
-          setIsProcessing(false);
-          setProgress(100);
-          clearInterval(progressInterval.current);
-        } else if (data.status === 'failed') {
-          setError(data.error || 'Content creation failed');
-          setIsProcessing(false);
+        etag = response.headers.etag || null;
+        Object.assign(status, response.data);
+        if (applyStatus(status)) {
           clearInterval(progressInterval.current);
         }
       } catch (err) {
@@ -196,6 +254,11 @@ function App() {
   const handleStopProcess = () => {
     setIsProcessing(false);
     setActiveStep(-1);
+    if (wsRef.current) {
+      wsRef.current.onclose = null;
+      wsRef.current.close();
+      wsRef.current = null;
+    }
     if (progressInterval.current) {
       clearInterval(progressInterval.current);
     }
@@ -643,6 +706,15 @@ function App() {
           </Fade>
         )}
 
+        {/* Cancelled Notice */}
+        {cancelled && (
+          <Fade in={cancelled}>
+            <Alert severity="info" sx={{ mb: 3 }} onClose={() => setCancelled(false)}>
+              <Typography variant="body1">Content creation was cancelled</Typography>
+            </Alert>
+          </Fade>
+        )}
+
         {/* Progress Indicator */}
         {isProcessing && (
           <Card sx={{ mb: 4, bgcolor: '#e3f2fd' }}>
@@ -0,0 +1,168 @@
+"""
+Hedged LLM Requests
+Cuts tail latency by sending a duplicate of a call that has not answered within
+a percentile of recent latencies. Whichever attempt answers first wins and the
+other is cancelled. A hedge-rate cap bounds the extra cost.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# An attempt calls `claim()` before it produces output; only the first caller may proceed
+Claim = Callable[[], bool]
+
+
+class HedgePolicy:
+    """Hedges calls that run past the `percentile` of recent latencies
+
+    Latency is measured to an attempt's first `claim()` (first streamed token)
+    or to its result. Until `min_samples` latencies are known no call is
+    hedged. Hedges never exceed `max_hedge_rate` of the calls in the last
+    `window_seconds`.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedge_rate: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        samples: int = 500,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._latencies: Deque[float] = deque(maxlen=samples)
+        self._calls: Deque[float] = deque()
+        self._hedges: Deque[float] = deque()
+        self.counters: Dict[str, int] = {"calls": 0, "hedged": 0, "hedge_wins": 0, "capped": 0}
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None while there are too few samples"""
+        if not self._latencies or len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile * len(ordered)) - 1))
+        return max(self.min_delay, ordered[index])
+
+    def _prune(self, now: float):
+        for events in (self._calls, self._hedges):
+            while events and now - events[0] > self.window_seconds:
+                events.popleft()
+
+    def _allow_hedge(self) -> bool:
+        now = self._clock()
+        self._prune(now)
+        if len(self._hedges) + 1 > self.max_hedge_rate * len(self._calls):
+            self.counters["capped"] += 1
+            return False
+        self._hedges.append(now)
+        self.counters["hedged"] += 1
+        return True
+
+    async def run(self, call: Callable[[Claim], Awaitable[T]]) -> T:
+        """Run `call(claim)`, hedging it with a second `call(claim)` when it is slow
+
+        Returns the first successful result; an error is only raised once every
+        attempt has failed.
+        """
+        self.counters["calls"] += 1
+        self._calls.append(self._clock())
+        tasks: List[asyncio.Task] = []
+        started: List[float] = []
+        winner: List[int] = []
+
+        def claimer(index: int) -> Claim:
+            def claim() -> bool:
+                if not winner:
+                    winner.append(index)
+                    self._latencies.append(time.perf_counter() - started[index])
+                    for other, task in enumerate(tasks):
+                        if other != index:
+                            task.cancel()
+                return winner[0] == index
+            return claim
+
+        def start(index: int):
+            started.append(time.perf_counter())
+            tasks.append(asyncio.ensure_future(call(claimer(index))))
+
+        start(0)
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not tasks[0].done() and not winner and self._allow_hedge():
+                    start(1)
+
+            pending = set(tasks)
+            errors: List[BaseException] = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    index = tasks.index(task)
+                    if not winner:
+                        winner.append(index)
+                        self._latencies.append(time.perf_counter() - started[index])
+                    if index > 0:
+                        self.counters["hedge_wins"] += 1
+                    return task.result()
+            raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            **self.counters,
+            "hedge_rate": round(self.counters["hedged"] / self.counters["calls"], 4) if self.counters["calls"] else 0.0,
+            "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+            "samples": len(self._latencies),
+        }
+
+
+class HedgeRegistry:
+    """One policy per call kind (model and streaming mode), since their latencies differ"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._policies: Dict[str, HedgePolicy] = {}
+
+    def get(self, key: str) -> HedgePolicy:
+        policy = self._policies.get(key)
+        if policy is None:
+            policy = self._policies[key] = HedgePolicy(**self.settings)
+        return policy
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {key: policy.stats() for key, policy in self._policies.items()}
+
+
+def create_hedging() -> Optional[HedgeRegistry]:
+    """Build hedge policies from LLM_HEDGE_* environment variables (None unless enabled)"""
+    percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0") or 0)
+    if not 0 < percentile < 1:
+        return None
+    return HedgeRegistry(
+        percentile=percentile,
+        max_hedge_rate=float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05")),
+        min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+    )
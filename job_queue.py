@@ -0,0 +1,162 @@
+"""
+Background Job Queue
+Fixed pool of asyncio workers fed from a bounded FIFO queue. Submitting to a full
+queue fails fast with a Retry-After estimate instead of starting unbounded work.
+Queued jobs can be dropped and running jobs cancelled by id.
+"""
+
+import asyncio
+import math
+import os
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised by `JobQueue.submit` when no queue slot is free"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Bounded queue drained by `workers` concurrent asyncio workers
+
+    Workers are started on the running event loop the first time they are
+    needed, so the queue can be created at import time.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue_size: int = 100,
+        expected_job_seconds: float = 60.0,
+        on_job_start: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+        self._signal: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Called with (job_id, seconds spent queued) when a worker picks a job up
+        self.on_job_start = on_job_start
+        # Moving average of job run time, used for Retry-After estimates
+        self._average_seconds = expected_job_seconds
+        self.counters: Dict[str, int] = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def start(self):
+        """Start the workers on the running loop (no-op when already running there)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker_tasks:
+            return
+        self._loop = loop
+        self._signal = asyncio.Queue()
+        # Jobs left over from a previous loop are handed to the new workers
+        for _ in self._pending:
+            self._signal.put_nowait(None)
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop the workers and running jobs; queued jobs that never started are dropped"""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        tasks += list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+        self._running.clear()
+        self._loop = None
+
+    def submit(self, job_id: str, run: Callable[..., Awaitable[Any]], *args) -> int:
+        """Queue `run(*args)` and return its 1-based queue position"""
+        if len(self._pending) >= self.max_queue_size:
+            self.counters["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        self.start()
+        self._pending[job_id] = (run, args, time.monotonic())
+        self._signal.put_nowait(None)
+        self.counters["submitted"] += 1
+        return len(self._pending)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position among jobs waiting for a worker, None once started"""
+        for index, pending_id in enumerate(self._pending):
+            if pending_id == job_id:
+                return index + 1
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a queued job or cancel a running one; False if the job is unknown or finished
+
+        A running job gets CancelledError at its current await, which aborts
+        in-flight HTTP requests and frees the worker immediately.
+        """
+        if self._pending.pop(job_id, None) is not None:
+            self.counters["cancelled"] += 1
+            return True
+        task = self._running.get(job_id)
+        if task is None or task.done():
+            return False
+        self._cancel_requested.add(job_id)
+        task.cancel()
+        return True
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up"""
+        return max(1, math.ceil(self._average_seconds / max(1, self.workers)))
+
+    async def _worker(self):
+        while True:
+            await self._signal.get()
+            if not self._pending:
+                continue
+            job_id, (run, args, enqueued_at) = self._pending.popitem(last=False)
+            started = time.monotonic()
+            if self.on_job_start:
+                self.on_job_start(job_id, started - enqueued_at)
+            # Each job runs in its own task so it can be cancelled without stopping the worker
+            task = self._running[job_id] = asyncio.ensure_future(run(*args))
+            task.add_done_callback(lambda task, job_id=job_id: self._job_done(job_id, started, task))
+            await asyncio.wait((task,))
+
+    def _job_done(self, job_id: str, started: float, task: asyncio.Task):
+        self._running.pop(job_id, None)
+        if task.cancelled():
+            if job_id in self._cancel_requested:
+                self._cancel_requested.discard(job_id)
+                self.counters["cancelled"] += 1
+            return
+        error = task.exception()
+        if error is not None:
+            self.counters["failed"] += 1
+            traceback.print_exception(type(error), error, error.__traceback__)
+            return
+        self.counters["completed"] += 1
+        elapsed = time.monotonic() - started
+        self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "workers": self.workers,
+            "running": len(self._running),
+            "queued": len(self._pending),
+            "max_queue_size": self.max_queue_size,
+            "average_job_seconds": round(self._average_seconds, 2),
+        }
+
+
+def create_job_queue(on_job_start: Optional[Callable[[str, float], None]] = None) -> JobQueue:
+    """Build the queue from JOB_WORKERS / JOB_QUEUE_SIZE environment variables"""
+    return JobQueue(
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_queue_size=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+        expected_job_seconds=float(os.getenv("JOB_EXPECTED_SECONDS", "60")),
+        on_job_start=on_job_start,
+    )
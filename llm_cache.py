@@ -0,0 +1,155 @@
+"""
+LLM Response Cache
+Content-addressed cache for prompt completions: an in-process LRU tier in front
+of an on-disk SQLite tier with a TTL and a size cap
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def cache_key(model: str, system_prompt: Optional[str], prompt: str, temperature: float, max_tokens: int) -> str:
+    """Hash of everything that determines a completion"""
+    payload = json.dumps([model, system_prompt or "", prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of completion text keyed by `cache_key`
+
+    Entries older than `ttl_seconds` are treated as misses. When the disk tier
+    grows past `max_disk_bytes`, the least recently used tenth is dropped.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 1000,
+        ttl_seconds: float = 86400.0,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "bypassed": 0}
+
+        self._conn = None
+        self._disk_bytes = 0
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+            """)
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[0], row[1])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.counters["writes"] += 1
+            if self._conn is None:
+                return
+            size = len(value.encode("utf-8"))
+            previous = self._conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._disk_bytes += size - (previous[0] if previous else 0)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._shrink_disk(now)
+
+    def _shrink_disk(self, now: float):
+        """Drop expired rows, then the least recently used tenth, until under the cap"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        while self._disk_bytes > self.max_disk_bytes:
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (max(1, count // 10),),
+            )
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def record_bypass(self):
+        """Count a lookup skipped because the caller asked for fresh content"""
+        self.counters["bypassed"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the cache from LLM_CACHE_* environment variables (None when disabled)"""
+    if os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    return ResponseCache(
+        path=os.getenv("LLM_CACHE_PATH", "output/llm_cache.db") or None,
+        max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+        max_disk_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+    )
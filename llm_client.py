@@ -0,0 +1,115 @@
+"""
+Shared Async OpenAI Client
+Process-wide AsyncOpenAI client with a pooled, keep-alive HTTP transport
+"""
+
+import os
+from typing import Optional
+
+import httpx
+import openai
+from pydantic import BaseModel
+
+
+def http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional `h2` package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class LLMClientConfig(BaseModel):
+    """Connection pool and timeout settings for the shared client"""
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    timeout: float = 30.0
+    connect_timeout: float = 5.0
+    max_retries: int = 2
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None) -> "LLMClientConfig":
+        """Build a config from OPENAI_* environment variables"""
+        return cls(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=_env_float("OPENAI_TIMEOUT", 30.0),
+            connect_timeout=_env_float("OPENAI_CONNECT_TIMEOUT", 5.0),
+            max_retries=_env_int("OPENAI_MAX_RETRIES", 2),
+            max_connections=_env_int("OPENAI_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=_env_float("OPENAI_KEEPALIVE_EXPIRY", 30.0),
+            http2=os.getenv("OPENAI_HTTP2", "1").lower() not in ("0", "false", "no"),
+        )
+
+
+def create_http_client(config: LLMClientConfig, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Create the pooled httpx client that backs the AsyncOpenAI client"""
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    timeout = httpx.Timeout(config.timeout, connect=config.connect_timeout)
+    if transport is not None:
+        return httpx.AsyncClient(transport=transport, limits=limits, timeout=timeout)
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=config.http2 and http2_available(),
+    )
+
+
+class SharedLLMClient:
+    """Owns one AsyncOpenAI client for the whole process
+
+    The client is opened at app startup and closed on shutdown. `get()` opens it
+    lazily as well, so code paths that run without the app lifespan still work.
+    """
+
+    def __init__(self, config: LLMClientConfig, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.config = config
+        self._transport = transport
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether an API key is configured"""
+        return bool(self.config.api_key)
+
+    def start(self) -> Optional[openai.AsyncOpenAI]:
+        """Create the client if a key is configured and it is not open yet"""
+        if self._client is None and self.available:
+            self._client = openai.AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.base_url,
+                timeout=self.config.timeout,
+                max_retries=self.config.max_retries,
+                http_client=create_http_client(self.config, self._transport),
+            )
+        return self._client
+
+    def get(self) -> Optional[openai.AsyncOpenAI]:
+        """Return the shared client, opening it on first use"""
+        return self._client or self.start()
+
+    async def close(self):
+        """Close the client and its connection pool"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.close()
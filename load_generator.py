@@ -0,0 +1,306 @@
+"""
+Load Generator for the Content API
+Open-loop load test: starts content tasks via POST /api/content/create at a
+target rate, polls each task's status until it finishes, and prints a JSON
+report (throughput, p50/p95/p99 latencies, error rates) for regression tracking.
+With --spawn it starts fake_openai_server.py and real_api_server itself, so no
+real tokens are spent.
+
+Usage: python load_generator.py --spawn --rps 5 --duration 30 --output report.json
+       python load_generator.py --base-url http://localhost:8000 --rps 2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from fake_openai_server import add_config_arguments
+
+HERE = Path(__file__).resolve().parent
+
+FALLBACK_METRIC = "content_llm_fallbacks_total"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args], cwd=HERE, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    """Count plus nearest-rank p50/p95/p99, mean and max in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def rank(q: float) -> float:
+        index = max(0, math.ceil(q * len(ordered)) - 1)
+        return round(ordered[index] * 1000, 1)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+async def scrape_fallbacks(client: httpx.AsyncClient) -> Optional[Dict[str, float]]:
+    """Fallback counts by error type from /metrics, or None when not exposed"""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    counts: Dict[str, float] = {}
+    for line in response.text.splitlines():
+        if line.startswith(FALLBACK_METRIC + "{"):
+            labels, value = line.rsplit(" ", 1)
+            error_type = labels.split('error_type="', 1)[1].split('"', 1)[0]
+            counts[error_type] = float(value)
+    return counts
+
+
+def default_payload(index: int) -> Dict[str, str]:
+    # Unique topics so identical requests are not coalesced into one task
+    return {"topic": f"Load test {index} {uuid.uuid4().hex[:8]}", "length": "Short"}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration: float,
+    poll_interval: float = 0.5,
+    task_timeout: float = 300.0,
+    payload_factory: Callable[[int], Dict[str, Any]] = default_payload,
+    status_mode: str = "full",
+) -> Dict[str, Any]:
+    """Drive the API with `client` and return the report dictionary
+
+    Arrivals are scheduled on a fixed timetable (open loop), so a slow server
+    builds up in-flight tasks instead of silently lowering the offered load.
+    With `status_mode="delta"` polls pass `since=<last version>` and the last
+    ETag and merge the changed fields, as the frontend does; the report counts
+    bytes per poll.
+    """
+    create_latencies: List[float] = []
+    status_latencies: List[float] = []
+    task_latencies: List[float] = []
+    status_bytes: List[int] = []
+    status_codes: Counter = Counter()
+    errors: Counter = Counter()
+    outcomes: Counter = Counter()
+    fallbacks_before = await scrape_fallbacks(client)
+
+    async def session(index: int):
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/content/create", json=payload_factory(index))
+        except httpx.HTTPError as e:
+            errors[f"create_{type(e).__name__}"] += 1
+            outcomes["not_started"] += 1
+            return
+        create_latencies.append(time.perf_counter() - started)
+        status_codes[str(response.status_code)] += 1
+        if response.status_code != 200:
+            errors[f"create_{response.status_code}"] += 1
+            outcomes["rejected" if response.status_code == 429 else "not_started"] += 1
+            return
+
+        task_id = response.json()["task_id"]
+        deadline = started + task_timeout
+        known: Dict[str, Any] = {}
+        etag = None
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(poll_interval)
+            polled = time.perf_counter()
+            params, headers = None, None
+            if status_mode == "delta" and "version" in known:
+                params, headers = {"since": known["version"]}, {"If-None-Match": etag}
+            try:
+                status = await client.get(f"/api/content/status/{task_id}", params=params, headers=headers)
+            except httpx.HTTPError as e:
+                errors[f"status_{type(e).__name__}"] += 1
+                continue
+            status_latencies.append(time.perf_counter() - polled)
+            status_bytes.append(len(status.content))
+            status_codes[str(status.status_code)] += 1
+            if status.status_code == 304:
+                continue
+            if status.status_code != 200:
+                errors[f"status_{status.status_code}"] += 1
+                continue
+            known.update(status.json())
+            etag = status.headers.get("etag")
+            state = known.get("status")
+            if state == "completed":
+                task_latencies.append(time.perf_counter() - started)
+                outcomes["completed"] += 1
+                return
+            if state in ("error", "failed", "cancelled"):
+                outcomes["failed"] += 1
+                return
+        outcomes["timed_out"] += 1
+
+    total = max(1, int(rps * duration))
+    start = time.perf_counter()
+    sessions = []
+    for index in range(total):
+        delay = start + index / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sessions.append(asyncio.ensure_future(session(index)))
+    send_window = time.perf_counter() - start
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - start
+    fallbacks_after = await scrape_fallbacks(client)
+
+    requests = len(create_latencies) + len(status_latencies)
+    report: Dict[str, Any] = {
+        "config": {"target_rps": rps, "duration_s": duration, "poll_interval_s": poll_interval,
+                   "status_mode": status_mode},
+        "elapsed_s": round(elapsed, 2),
+        "throughput": {
+            "offered_rps": round((total - 1) / send_window, 2) if total > 1 and send_window else rps,
+            "tasks_per_second": round(outcomes["completed"] / elapsed, 2),
+            "requests_per_second": round(requests / elapsed, 2),
+        },
+        "tasks": {"started": total, **{key: outcomes[key] for key in
+                  ("completed", "failed", "timed_out", "rejected", "not_started")}},
+        "latency": {
+            "create": latency_summary(create_latencies),
+            "status": latency_summary(status_latencies),
+            "task_end_to_end": latency_summary(task_latencies),
+        },
+        "error_rates": {
+            "create": round(sum(v for k, v in errors.items() if k.startswith("create_")) / total, 4),
+            "status": round(sum(v for k, v in errors.items() if k.startswith("status_"))
+                            / max(1, len(status_latencies)), 4),
+            "task_failed": round((outcomes["failed"] + outcomes["timed_out"]) / total, 4),
+        },
+        "status_bytes": {
+            "polls": len(status_bytes),
+            "total": sum(status_bytes),
+            "mean_per_poll": round(sum(status_bytes) / len(status_bytes), 1) if status_bytes else 0.0,
+        },
+        "errors": dict(errors),
+        "status_codes": dict(status_codes),
+    }
+    if fallbacks_before is not None and fallbacks_after is not None:
+        # Tasks "complete" even when steps fell back to canned content, so count those too
+        report["llm_fallbacks"] = {
+            error_type: int(count - fallbacks_before.get(error_type, 0))
+            for error_type, count in fallbacks_after.items()
+            if count > fallbacks_before.get(error_type, 0)
+        }
+    return report
+
+
+def fake_server_args(args: argparse.Namespace, port: int) -> List[str]:
+    argv = ["fake_openai_server.py", "--port", str(port)]
+    for name in ("latency_ms", "latency_distribution", "latency_jitter_ms", "tokens_per_second", "rate_limit_rate",
+                 "server_error_rate", "timeout_rate", "timeout_seconds", "batch_latency_ms", "seed"):
+        value = getattr(args, name)
+        if value is not None:
+            argv += ["--" + name.replace("_", "-"), str(value)]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="API to load (default: spawn one with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="start the fake OpenAI server and real_api_server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--rps", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--task-timeout", type=float, default=300.0)
+    parser.add_argument("--status-mode", choices=["full", "delta"], default="full",
+                        help="poll full statuses or only the fields changed since the last version")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    add_config_arguments(parser.add_argument_group("fake OpenAI server (with --spawn)"))
+    args = parser.parse_args()
+    if not args.base_url and not args.spawn:
+        parser.error("pass --base-url or --spawn")
+
+    async def drive(base_url: str) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+            return await run_load(client, args.rps, args.duration, args.poll_interval, args.task_timeout,
+                                  status_mode=args.status_mode)
+
+    processes: List[subprocess.Popen] = []
+    workdir = tempfile.TemporaryDirectory()
+    try:
+        if args.spawn:
+            fake_port, api_port = free_port(), free_port()
+            processes.append(start_process(fake_server_args(args, fake_port), {}))
+            wait_until_up(f"http://127.0.0.1:{fake_port}/v1/stats")
+            processes.append(start_process(
+                ["-m", "uvicorn", "real_api_server:app", "--port", str(api_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                {
+                    "TASK_STORE": "sqlite" if args.workers > 1 else "memory",
+                    # Everything the server persists stays in the temporary workdir
+                    "TASK_STORE_PATH": str(Path(workdir.name) / "tasks.db"),
+                    "TASK_RESULT_DIR": str(Path(workdir.name) / "task_results"),
+                    "CHECKPOINT_PATH": str(Path(workdir.name) / "checkpoints.db"),
+                    "BATCH_DIR": str(Path(workdir.name) / "batches"),
+                    "OPENAI_API_KEY": "sk-loadtest",
+                    "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+                    "LLM_CACHE_ENABLED": "0",
+                },
+            ))
+            args.base_url = f"http://127.0.0.1:{api_port}"
+            wait_until_up(f"{args.base_url}/api/health")
+        report = asyncio.run(drive(args.base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=30)
+        workdir.cleanup()
+
+    report["target"] = args.base_url if not args.spawn else "spawned real_api_server + fake OpenAI server"
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Markdown Renderer
+Incremental markdown-to-HTML rendering for streamed LLM output. Chunks are fed
+as tokens arrive and each block (heading, paragraph, list, code fence, quote,
+table, rule) is rendered exactly once, as soon as the line that closes it has
+been seen. Raw HTML in the source is escaped and only http(s), mailto and
+relative link targets are kept. Setext headings (a paragraph underlined with
+=== or ---) and link targets with balanced parentheses follow CommonMark.
+"""
+
+import html
+import re
+from typing import List, Optional, Tuple
+
+HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+SETEXT_UNDERLINE = re.compile(r"^\s{0,3}(=+|-+)\s*$")
+FENCE = re.compile(r"^\s{0,3}(`{3,}|~{3,})\s*([\w+#.-]*)")
+RULE = re.compile(r"^\s{0,3}([-*_])(?:\s*\1){2,}\s*$")
+LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$")
+QUOTE = re.compile(r"^\s{0,3}>\s?")
+TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+# Link target: no spaces, parentheses only in balanced pairs ("wiki/Python_(language)")
+LINK_TARGET = r"(?:[^()\s]|\([^()\s]*\))+"
+INLINE = re.compile(
+    r"(?P<tick>`+)(?P<code>.+?)(?P=tick)"
+    rf"|!\[(?P<alt>[^\]]*)\]\((?P<src>{LINK_TARGET})(?:\s+\"[^\"]*\")?\)"
+    rf"|\[(?P<label>[^\]]+)\]\((?P<href>{LINK_TARGET})(?:\s+\"[^\"]*\")?\)"
+    r"|(?P<strong_mark>\*\*|__)(?P<strong>\S(?:.*?\S)?)(?P=strong_mark)"
+    r"|\*(?P<em>[^\s*](?:.*?[^\s*])?)\*"
+    r"|(?<!\w)_(?P<em_underscore>[^\s_](?:.*?[^\s_])?)_(?!\w)"
+)
+SAFE_SCHEMES = ("http", "https", "mailto")
+
+
+def slugify(text: str) -> str:
+    """Heading anchor, matching create_url_slug in enhanced_content_system"""
+    slug = re.sub(r"[^a-z0-9\s-]", "", text.lower())
+    return re.sub(r"\s+", "-", slug).strip("-")
+
+
+def _safe_url(url: str) -> str:
+    scheme, colon, _ = url.partition(":")
+    if colon and "/" not in scheme and scheme.lower() not in SAFE_SCHEMES:
+        return "#"
+    return html.escape(url)
+
+
+def render_inline(text: str) -> str:
+    """Render code spans, images, links, bold and italics; escape everything else"""
+    out: List[str] = []
+    position = 0
+    for match in INLINE.finditer(text):
+        out.append(html.escape(text[position:match.start()], quote=False))
+        position = match.end()
+        if match.group("tick"):
+            out.append(f"<code>{html.escape(match.group('code').strip(), quote=False)}</code>")
+        elif match.group("src") is not None:
+            out.append(f'<img src="{_safe_url(match.group("src"))}" alt="{html.escape(match.group("alt"))}">')
+        elif match.group("href") is not None:
+            out.append(f'<a href="{_safe_url(match.group("href"))}">{render_inline(match.group("label"))}</a>')
+        elif match.group("strong") is not None:
+            out.append(f"<strong>{render_inline(match.group('strong'))}</strong>")
+        else:
+            emphasis = match.group("em") if match.group("em") is not None else match.group("em_underscore")
+            out.append(f"<em>{render_inline(emphasis)}</em>")
+    out.append(html.escape(text[position:], quote=False))
+    return "".join(out)
+
+
+def _split_row(line: str) -> List[str]:
+    cells = re.split(r"(?<!\\)\|", line.strip().strip("|"))
+    return [cell.strip().replace("\\|", "|") for cell in cells]
+
+
+def _render_table(lines: List[str]) -> Optional[str]:
+    if len(lines) < 2 or not TABLE_SEPARATOR.match(lines[1]):
+        return None
+    header = _split_row(lines[0])
+    aligns = []
+    for cell in _split_row(lines[1]):
+        if cell.startswith(":") and cell.endswith(":"):
+            aligns.append(' style="text-align: center"')
+        elif cell.endswith(":"):
+            aligns.append(' style="text-align: right"')
+        elif cell.startswith(":"):
+            aligns.append(' style="text-align: left"')
+        else:
+            aligns.append("")
+
+    def row(cells: List[str], tag: str) -> str:
+        padded = (cells + [""] * len(header))[:len(header)]
+        inner = "".join(
+            f"<{tag}{aligns[i] if i < len(aligns) else ''}>{render_inline(cell)}</{tag}>"
+            for i, cell in enumerate(padded)
+        )
+        return f"<tr>{inner}</tr>"
+
+    body = "".join(row(_split_row(line), "td") for line in lines[2:])
+    return f"<table>\n<thead>{row(header, 'th')}</thead>\n<tbody>{body}</tbody>\n</table>\n"
+
+
+def _render_list(lines: List[str]) -> str:
+    # (indent, ordered, marker, text) per item; continuation lines join the previous item
+    items: List[Tuple[int, bool, str, str]] = []
+    for line in lines:
+        match = LIST_ITEM.match(line)
+        if match:
+            marker = match.group(2)
+            items.append((len(match.group(1).expandtabs(4)), marker[-1] in ".)", marker, match.group(3)))
+        elif items:
+            indent, ordered, marker, text = items[-1]
+            items[-1] = (indent, ordered, marker, f"{text}\n{line.strip()}")
+
+    def build(index: int) -> Tuple[str, int]:
+        indent, ordered, marker, _ = items[index]
+        tag = "ol" if ordered else "ul"
+        start = int(marker[:-1]) if ordered else 1
+        parts = [f'<{tag} start="{start}">' if start != 1 else f"<{tag}>"]
+        while index < len(items):
+            item_indent, item_ordered, _, text = items[index]
+            if item_indent < indent or (item_indent == indent and item_ordered != ordered):
+                break
+            if item_indent > indent:
+                nested, index = build(index)
+                parts[-1] = parts[-1][:-len("</li>")] + nested + "</li>"
+                continue
+            parts.append(f"<li>{render_inline(text)}</li>")
+            index += 1
+        parts.append(f"</{tag}>")
+        return "".join(parts), index
+
+    out, index = [], 0
+    while index < len(items):
+        rendered, index = build(index)
+        out.append(rendered + "\n")
+    return "".join(out)
+
+
+class IncrementalMarkdownRenderer:
+    """Feed markdown chunks, get back HTML for the blocks each chunk completed
+
+    `html` is everything rendered so far; `preview()` adds the still-open block
+    for live views without committing it.
+    """
+
+    def __init__(self):
+        self._source: List[str] = []
+        self._partial = ""  # text after the last newline
+        self._parts: List[str] = []  # rendered HTML fragments, in order
+        self._block: Optional[str] = None  # paragraph, list, quote, table or code
+        self._lines: List[str] = []  # content lines of the open block
+        self._raw: List[str] = []  # source lines of the open block, for preview()
+        self._fence = ""
+        self._language = ""
+
+    @property
+    def source(self) -> str:
+        """All markdown fed so far"""
+        return "".join(self._source)
+
+    @property
+    def html(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of markdown and return HTML for any blocks it completed"""
+        if not chunk:
+            return ""
+        self._source.append(chunk)
+        rendered = len(self._parts)
+        *lines, self._partial = (self._partial + chunk).split("\n")
+        for line in lines:
+            self._line(line.rstrip("\r"))
+        return "".join(self._parts[rendered:])
+
+    def finish(self) -> str:
+        """Close the open block at end of input and return its HTML"""
+        rendered = len(self._parts)
+        if self._partial:
+            self._line(self._partial.rstrip("\r"))
+            self._partial = ""
+        self._close()
+        return "".join(self._parts[rendered:])
+
+    def preview(self) -> str:
+        """Rendered HTML plus a provisional rendering of the open block"""
+        pending = self._raw + ([self._partial] if self._partial else [])
+        if not pending:
+            return self.html
+        return self.html + render_markdown("\n".join(pending))
+
+    def _open(self, block: str, line: str):
+        self._close()
+        self._block = block
+        self._raw.append(line)
+
+    def _emit(self, fragment: str):
+        self._parts.append(fragment)
+
+    def _heading(self, level: int, text: str):
+        self._emit(f'<h{level} id="{slugify(text)}">{render_inline(text)}</h{level}>\n')
+
+    def _line(self, line: str):
+        if self._block == "code":
+            self._raw.append(line)
+            stripped = line.strip()
+            if stripped.startswith(self._fence) and not stripped.strip(self._fence[0]):
+                self._close()
+            else:
+                self._lines.append(line)
+            return
+
+        if not line.strip():
+            self._close()
+            return
+
+        # "Title" followed by "===" or "---" turns the open paragraph into a heading
+        if self._block == "paragraph" and SETEXT_UNDERLINE.match(line):
+            text = " ".join(self._lines)
+            self._block, self._lines, self._raw = None, [], []
+            self._heading(1 if line.strip()[0] == "=" else 2, text)
+            return
+
+        fence = FENCE.match(line)
+        if fence:
+            self._open("code", line)
+            self._fence, self._language = fence.group(1), fence.group(2)
+            return
+
+        heading = HEADING.match(line)
+        if heading:
+            self._close()
+            self._heading(len(heading.group(1)), heading.group(2))
+            return
+
+        # Checked before list items so "* * *" and "- - -" are rules
+        if RULE.match(line):
+            self._close()
+            self._emit("<hr>\n")
+            return
+
+        if LIST_ITEM.match(line):
+            if self._block != "list":
+                self._open("list", line)
+            else:
+                self._raw.append(line)
+            self._lines.append(line)
+            return
+
+        if QUOTE.match(line):
+            if self._block != "quote":
+                self._open("quote", line)
+            else:
+                self._raw.append(line)
+            self._lines.append(QUOTE.sub("", line, count=1))
+            return
+
+        if line.lstrip().startswith("|"):
+            if self._block != "table":
+                self._open("table", line)
+            else:
+                self._raw.append(line)
+            self._lines.append(line)
+            return
+
+        if self._block == "list" and line[:1] in (" ", "\t"):
+            self._raw.append(line)
+            self._lines.append(line)
+            return
+
+        if self._block != "paragraph":
+            self._open("paragraph", line)
+        else:
+            self._raw.append(line)
+        self._lines.append(line.strip())
+
+    def _close(self):
+        block, lines = self._block, self._lines
+        self._block, self._lines, self._raw = None, [], []
+        if block is None:
+            return
+        if block == "code":
+            language = f' class="language-{html.escape(self._language)}"' if self._language else ""
+            code = html.escape("\n".join(lines) + "\n" if lines else "", quote=False)
+            self._emit(f"<pre><code{language}>{code}</code></pre>\n")
+        elif block == "list":
+            self._emit(_render_list(lines))
+        elif block == "quote":
+            self._emit(f"<blockquote>\n{render_markdown(chr(10).join(lines))}</blockquote>\n")
+        elif block == "table":
+            table = _render_table(lines)
+            self._emit(table if table is not None else f"<p>{render_inline(chr(10).join(lines))}</p>\n")
+        else:
+            self._emit(f"<p>{render_inline(chr(10).join(lines))}</p>\n")
+
+
+def render_markdown(text: str) -> str:
+    """Render a whole markdown document in one pass"""
+    renderer = IncrementalMarkdownRenderer()
+    renderer.feed(text)
+    renderer.finish()
+    return renderer.html
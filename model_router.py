@@ -0,0 +1,158 @@
+"""
+Per-Step Model Routing
+Routing table that picks the model, token budget and timeout for each pipeline
+step, with an ordered fallback list of models. A step whose rolling p95
+latency exceeds its SLO is demoted to the next (faster) model in its list and
+promoted back after a recovery period.
+"""
+
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class StepRoute(BaseModel):
+    """Completion settings for one step; `models` is ordered from preferred to fastest"""
+    models: List[str] = Field(min_length=1)
+    max_tokens: int = 2000
+    temperature: float = 0.7
+    timeout: float = 25.0  # per request; the whole call gets 5s more
+    slo_p95_seconds: Optional[float] = None  # demote when the rolling p95 exceeds this
+
+
+class _StepState:
+    def __init__(self, samples: int):
+        self.level = 0  # index into the route's models
+        self.changed_at = 0.0
+        self.demotions = 0
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.samples = samples
+
+    def window(self, model: str) -> Deque[float]:
+        if model not in self.latencies:
+            self.latencies[model] = deque(maxlen=self.samples)
+        return self.latencies[model]
+
+
+def p95(latencies) -> Optional[float]:
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class ModelRouter:
+    """Routes steps to models and tracks per-step, per-model call latency
+
+    `candidates(step)` lists the models to try in order: the active one, then
+    the remaining fallbacks. Successful calls report their latency with
+    `record`. Once the active model has `min_samples` latencies and their p95
+    is over the step's SLO, the step moves one model down its list. After
+    `recovery_seconds` it moves one model back up with a fresh window.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, StepRoute],
+        default: StepRoute,
+        samples: int = 50,
+        min_samples: int = 10,
+        recovery_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.routes = routes
+        self.default = default
+        self.samples = samples
+        self.min_samples = min_samples
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._states: Dict[str, _StepState] = {}
+
+    def route(self, step: str) -> StepRoute:
+        return self.routes.get(step, self.default)
+
+    def _state(self, step: str) -> _StepState:
+        if step not in self._states:
+            self._states[step] = _StepState(self.samples)
+        return self._states[step]
+
+    def candidates(self, step: str) -> List[str]:
+        """Models to try for `step`, active model first"""
+        models = self.route(step).models
+        state = self._state(step)
+        now = self._clock()
+        if state.level > 0 and now - state.changed_at >= self.recovery_seconds:
+            state.level -= 1
+            state.changed_at = now
+            state.window(models[state.level]).clear()  # judge the promoted model on new calls only
+            print(f"⬆️  Step {step} promoted back to {models[state.level]}")
+        return models[state.level:]
+
+    def record(self, step: str, model: str, seconds: float):
+        """Record a successful call's latency; may demote the step"""
+        route = self.route(step)
+        state = self._state(step)
+        window = state.window(model)
+        window.append(seconds)
+        if route.slo_p95_seconds is None or model != route.models[state.level]:
+            return
+        if state.level + 1 < len(route.models) and len(window) >= self.min_samples:
+            latency = p95(window)
+            if latency > route.slo_p95_seconds:
+                state.level += 1
+                state.changed_at = self._clock()
+                state.demotions += 1
+                print(f"🐢 Step {step} p95 {latency:.1f}s > SLO {route.slo_p95_seconds:.1f}s on {model}, "
+                      f"demoted to {route.models[state.level]}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for step, state in self._states.items():
+            route = self.route(step)
+            active = route.models[state.level]
+            latency = p95(state.latencies.get(active))
+            report[step] = {
+                "models": route.models,
+                "active_model": active,
+                "p95_seconds": round(latency, 3) if latency is not None else None,
+                "slo_p95_seconds": route.slo_p95_seconds,
+                "samples": len(state.latencies.get(active, ())),
+                "demotions": state.demotions,
+            }
+        return report
+
+
+def load_routes(spec: str) -> Dict[str, Dict[str, Any]]:
+    """Parse MODEL_ROUTES: inline JSON or the path of a JSON file"""
+    spec = spec.strip()
+    if not spec.startswith("{"):
+        with open(spec, "r", encoding="utf-8") as f:
+            spec = f.read()
+    return json.loads(spec)
+
+
+def create_model_router(routes: Dict[str, StepRoute], default: StepRoute) -> ModelRouter:
+    """Build the router from the built-in table overridden by MODEL_ROUTES
+
+    MODEL_ROUTES maps step names (or "default") to StepRoute fields, e.g.
+    `{"article": {"models": ["gpt-4o", "gpt-4o-mini"], "slo_p95_seconds": 40}}`.
+    Fields that are not given keep their built-in values.
+    """
+    routes = dict(routes)
+    spec = os.getenv("MODEL_ROUTES")
+    overrides = load_routes(spec) if spec else {}
+    if "default" in overrides:
+        default = StepRoute(**{**default.model_dump(), **overrides.pop("default")})
+    for step, fields in overrides.items():
+        routes[step] = StepRoute(**{**routes.get(step, default).model_dump(), **fields})
+    return ModelRouter(
+        routes,
+        default,
+        min_samples=int(os.getenv("MODEL_ROUTE_MIN_SAMPLES", "10")),
+        recovery_seconds=float(os.getenv("MODEL_ROUTE_RECOVERY_SECONDS", "300")),
+    )
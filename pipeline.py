@@ -0,0 +1,107 @@
+"""
+Dependency-Graph Step Executor
+Runs a small DAG of named async steps, starting each step as soon as its inputs are ready
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+StepCallback = Callable[["PipelineStep"], None]
+
+
+class PipelineError(Exception):
+    """Raised when a step graph is invalid"""
+
+
+class PipelineStep:
+    """A named step whose coroutine receives its declared inputs as keyword arguments"""
+
+    def __init__(self, name: str, run: Callable[..., Awaitable[Any]], inputs: Iterable[str] = ()):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+
+    def __repr__(self) -> str:
+        return f"PipelineStep({self.name!r}, inputs={list(self.inputs)})"
+
+
+def validate_steps(steps: List[PipelineStep]):
+    """Check for duplicate names, unknown inputs and cycles"""
+    by_name: Dict[str, PipelineStep] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise PipelineError(f"Duplicate step name: {step.name}")
+        by_name[step.name] = step
+
+    for step in steps:
+        for dependency in step.inputs:
+            if dependency not in by_name:
+                raise PipelineError(f"Step '{step.name}' depends on unknown step '{dependency}'")
+
+    visiting, done = set(), set()
+
+    def visit(name: str):
+        if name in done:
+            return
+        if name in visiting:
+            raise PipelineError(f"Dependency cycle through step '{name}'")
+        visiting.add(name)
+        for dependency in by_name[name].inputs:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+
+    for step in steps:
+        visit(step.name)
+
+
+async def run_pipeline(
+    steps: List[PipelineStep],
+    on_step_start: Optional[StepCallback] = None,
+    on_step_end: Optional[StepCallback] = None,
+    timings: Optional[Dict[str, float]] = None,
+    completed: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run every step once its inputs have finished and return results by step name
+
+    Per-step wall-clock durations (seconds) are written into `timings` as each
+    step finishes. If a step fails, the steps still running are cancelled and
+    the error is re-raised. Steps named in `completed` are not run (and get no
+    callbacks); their given results feed the steps that depend on them.
+    """
+    validate_steps(steps)
+    timings = timings if timings is not None else {}
+    results: Dict[str, Any] = dict(completed or {})
+    pending = [step for step in steps if step.name not in results]
+    running: Dict[asyncio.Task, PipelineStep] = {}
+    started_at: Dict[str, float] = {}
+
+    def start_ready_steps():
+        for step in list(pending):
+            if all(dependency in results for dependency in step.inputs):
+                pending.remove(step)
+                if on_step_start:
+                    on_step_start(step)
+                started_at[step.name] = time.perf_counter()
+                inputs = {dependency: results[dependency] for dependency in step.inputs}
+                running[asyncio.ensure_future(step.run(**inputs))] = step
+
+    try:
+        start_ready_steps()
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                step = running.pop(task)
+                results[step.name] = task.result()
+                timings[step.name] = round(time.perf_counter() - started_at[step.name], 3)
+                if on_step_end:
+                    on_step_end(step)
+            start_ready_steps()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    return results
@@ -0,0 +1,250 @@
+"""
+LLM Rate Limiter
+Process-wide requests-per-minute and tokens-per-minute budgets for OpenAI calls.
+Callers wait in a priority queue for capacity instead of failing; token
+reservations are estimated up front and corrected from the reported usage.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Upper estimate of the tokens a chat completion will use (prompt + completion)"""
+    prompt_tokens = sum(len(m.get("content") or "") // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE for m in messages)
+    return prompt_tokens + max_tokens
+
+
+def parse_retry_after(headers, default: float) -> float:
+    """Seconds to wait from a Retry-After / retry-after-ms response header"""
+    if headers is not None:
+        for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            value = headers.get(name)
+            if value is None:
+                continue
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                continue
+    return default
+
+
+class TokenBucket:
+    """Continuously refilling bucket; the level may go negative to record debt"""
+
+    def __init__(self, capacity: float, clock: Callable[[], float]):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self._clock = clock
+        self.level = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def has(self, amount: float) -> bool:
+        self._refill()
+        return self.level >= amount
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def seconds_until(self, amount: float) -> float:
+        self._refill()
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class Reservation:
+    """Capacity granted to one call; `settle` corrects the token estimate"""
+
+    def __init__(self, limiter: "RateLimiter", tokens: int, waited: float):
+        self._limiter = limiter
+        self.tokens = tokens
+        self.waited = waited
+        self._settled = False
+
+    def settle(self, actual_tokens: Optional[int] = None):
+        """Replace the estimate with the real usage (keep it when usage is unknown)"""
+        if self._settled:
+            return
+        self._settled = True
+        if actual_tokens is not None:
+            self._limiter._correct(self.tokens, actual_tokens)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "future", "enqueued_at")
+
+    def __init__(self, tokens: int, future: asyncio.Future, enqueued_at: float):
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class RateLimiter:
+    """Priority-ordered admission against RPM and TPM token buckets
+
+    Waiters are admitted strictly in (priority, arrival) order, so a large
+    request at the head of the queue is not starved by smaller ones behind it.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        clock: Callable[[], float] = time.monotonic,
+        wait_samples: int = 1000,
+    ):
+        self._clock = clock
+        self._requests = TokenBucket(requests_per_minute, clock)
+        self._tokens = TokenBucket(tokens_per_minute, clock)
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+        self._waits = deque(maxlen=wait_samples)
+        self.counters: Dict[str, float] = {
+            "admitted": 0,
+            "queued": 0,
+            "rate_limit_errors": 0,
+            "tokens_estimated": 0,
+            "tokens_used": 0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._queue if not waiter.future.done())
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> Reservation:
+        """Wait until one request and `tokens` tokens fit in the budgets"""
+        # A request larger than the whole bucket would never be admitted
+        tokens = int(min(tokens, self._tokens.capacity))
+        enqueued_at = self._clock()
+        if not self._queue and self._can_admit(tokens):
+            self._admit(tokens)
+            return self._granted(tokens, 0.0)
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(tokens, loop.create_future(), enqueued_at)
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        self.counters["queued"] += 1
+        self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.queue_depth)
+        self._schedule(loop)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just before the cancel landed: return the capacity
+                self._requests.give_back(1)
+                self._tokens.give_back(tokens)
+            self._schedule(loop)
+            raise
+        return self._granted(tokens, self._clock() - enqueued_at)
+
+    def pause(self, seconds: float):
+        """Hold all admissions after the upstream API reported a rate limit"""
+        self.counters["rate_limit_errors"] += 1
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._reschedule()
+
+    def _can_admit(self, tokens: int) -> bool:
+        return self._clock() >= self._paused_until and self._requests.has(1) and self._tokens.has(tokens)
+
+    def _admit(self, tokens: int):
+        self._requests.take(1)
+        self._tokens.take(tokens)
+
+    def _granted(self, tokens: int, waited: float) -> Reservation:
+        self.counters["admitted"] += 1
+        self.counters["tokens_estimated"] += tokens
+        self._waits.append(waited)
+        return Reservation(self, tokens, waited)
+
+    def _correct(self, estimated: int, actual: int):
+        self.counters["tokens_used"] += actual
+        if actual < estimated:
+            self._tokens.give_back(estimated - actual)
+        else:
+            self._tokens.take(actual - estimated)
+        self._reschedule()
+
+    def _reschedule(self):
+        if self._queue:
+            try:
+                self._schedule(asyncio.get_running_loop())
+            except RuntimeError:
+                pass
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        """Admit whatever fits now and arm a timer for the next head of the queue"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue:
+            _, _, waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_admit(waiter.tokens):
+                break
+            heapq.heappop(self._queue)
+            self._admit(waiter.tokens)
+            waiter.future.set_result(None)
+
+        if self._queue:
+            _, _, waiter = self._queue[0]
+            delay = max(
+                self._paused_until - self._clock(),
+                self._requests.seconds_until(1),
+                self._tokens.seconds_until(waiter.tokens),
+            )
+            self._timer = loop.call_later(max(delay, 0.001), self._schedule, loop)
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 3)
+
+        return {
+            **self.counters,
+            "queue_depth": self.queue_depth,
+            "requests_per_minute": self._requests.capacity,
+            "tokens_per_minute": self._tokens.capacity,
+            "available_tokens": round(max(0.0, self._tokens.level)),
+            "wait_seconds_mean": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_seconds_p95": percentile(0.95),
+            "wait_seconds_max": round(waits[-1], 3) if waits else 0.0,
+        }
+
+
+def create_rate_limiter() -> Optional[RateLimiter]:
+    """Build the limiter from LLM_RATE_LIMIT_* environment variables (None when disabled)"""
+    requests_per_minute = int(os.getenv("LLM_RATE_LIMIT_RPM", "500"))
+    tokens_per_minute = int(os.getenv("LLM_RATE_LIMIT_TPM", "200000"))
+    if requests_per_minute <= 0 or tokens_per_minute <= 0:
+        return None
+    return RateLimiter(requests_per_minute, tokens_per_minute)
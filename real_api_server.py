@@ -4,40 +4,62 @@ Uses actual OpenAI API for content generation
 """
 
 import asyncio
-import concurrent.futures
+import html
 import json
 import re
-import tempfile
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 import traceback
 import os
+import time
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import openai
 
+from batch_jobs import BATCH_MODES, BatchJobManager, OpenAIBatchCaller
+from circuit_breaker import CircuitOpenError, create_circuit_breakers, create_retry_budget
+from hedging import Claim, create_hedging
+from context_packer import ContextPacker
+from download_cache import DownloadCache, PreparedDownload, etag_matches, iter_chunks, negotiate_encoding
+from job_queue import QueueFullError, create_job_queue
+from llm_cache import cache_key, create_response_cache
+from llm_client import LLMClientConfig, SharedLLMClient
+from markdown_renderer import IncrementalMarkdownRenderer, render_markdown
+from metrics import CONTENT_TYPE_LATEST, MetricsRegistry
+from model_router import StepRoute, create_model_router
+from pipeline import PipelineStep, run_pipeline
+from rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE, create_rate_limiter, estimate_tokens, parse_retry_after
+from static_assets import create_static_assets
+from task_checkpoints import TaskCheckpoints, create_task_checkpoints
+from task_events import TaskEventHub, format_sse
+from task_store import TaskStore, create_task_store, field_version
+
 # Data models
 class UserInput(BaseModel):
     topic: str
     audience: str = "General"
     style: str = "Professional"
     length: str = "Medium"
+    bypass_cache: bool = False  # True to skip cached LLM responses and generate fresh content
 
 class ProcessingStatus(BaseModel):
     task_id: str
-    status: str  # "processing", "completed", "error"
+    status: str  # "queued", "processing", "completed", "error", "cancelled"
     current_step: int
     current_operation: str
     step_results: Optional[Dict[int, Any]] = None
     final_result: Optional[Dict[str, Any]] = None
+    step_timings: Optional[Dict[str, float]] = None  # seconds per pipeline step
+    queue_position: Optional[int] = None  # 1-based while waiting for a worker
     error: Optional[str] = None
+    version: int = 0  # grows with every stored update of the task
 
 # Load OpenAI API key
 def load_openai_key():
@@ -58,26 +80,111 @@ def load_openai_key():
         print(f"⚠️  Error loading API key: {e}")
         return None
 
-# Initialize OpenAI client
+# Initialize the shared async OpenAI client (pooled connections, opened at startup)
 api_key = load_openai_key()
-if api_key:
-    openai.api_key = api_key
-    # Create client with timeout settings
-    client = openai.OpenAI(
-        api_key=api_key,
-        timeout=30.0,  # 30 second timeout
-        max_retries=2   # Retry twice on failure
-    )
+# Retries are governed by the retry budget below rather than by the SDK
+llm_client = SharedLLMClient(LLMClientConfig.from_env(api_key=api_key).model_copy(update={"max_retries": 0}))
+if llm_client.available:
     print("✅ OpenAI API key loaded successfully")
 else:
-    client = None
     print("❌ OpenAI API key not available - using mock responses")
 
+# Completion settings for calls without a step route
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_MAX_TOKENS = 2000
+DEFAULT_TEMPERATURE = 0.7
+
+# Model, token budget and timeout per pipeline step; MODEL_ROUTES overrides any of them
+STEP_ROUTES = {
+    "research": StepRoute(models=[DEFAULT_MODEL], max_tokens=1200),
+    "structure": StepRoute(models=[DEFAULT_MODEL], max_tokens=800),
+    "article": StepRoute(models=[DEFAULT_MODEL], max_tokens=DEFAULT_MAX_TOKENS, timeout=45.0),
+    "image_concepts": StepRoute(models=[DEFAULT_MODEL], max_tokens=800),
+    "seo": StepRoute(models=[DEFAULT_MODEL], max_tokens=800),
+}
+model_router = create_model_router(
+    STEP_ROUTES, StepRoute(models=[DEFAULT_MODEL], max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE)
+)
+
+# Cache of LLM responses keyed on (model, prompts, sampling settings); None when disabled
+response_cache = create_response_cache()
+
+# Process-wide RPM/TPM budgets; calls queue by priority instead of failing on 429
+rate_limiter = create_rate_limiter()
+RATE_LIMIT_RETRIES = 3
+
+# Per-model circuit breakers (None when disabled) and the process-wide retry budget
+circuit_breakers = create_circuit_breakers()
+retry_budget = create_retry_budget()
+# Duplicate requests for calls slower than recent latencies (None unless LLM_HEDGE_PERCENTILE is set)
+hedging = create_hedging()
+# Upstream failures that count against a breaker and may be retried
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError)
+
+# Prometheus metrics served on /metrics
+metrics_registry = MetricsRegistry()
+LLM_LATENCY = metrics_registry.histogram(
+    "content_llm_request_seconds", "OpenAI call latency per pipeline step", ["step"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+RATE_LIMIT_WAIT = metrics_registry.histogram(
+    "content_llm_rate_limit_wait_seconds", "Time OpenAI calls wait for rate limiter capacity", ["step"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+)
+QUEUE_WAIT = metrics_registry.histogram(
+    "content_job_queue_wait_seconds", "Time tasks wait in the job queue before a worker starts them",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+TASK_DURATION = metrics_registry.histogram(
+    "content_task_duration_seconds", "End-to-end task duration from submission to completion", ["status"],
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+LLM_TOKENS = metrics_registry.counter(
+    "content_llm_tokens_total", "Tokens reported by the OpenAI API per pipeline step", ["step", "kind"]
+)
+FALLBACKS = metrics_registry.counter(
+    "content_llm_fallbacks_total", "Fallback content served instead of an LLM response", ["error_type"]
+)
+CACHE_LOOKUPS = metrics_registry.counter(
+    "content_llm_cache_lookups_total", "LLM response cache lookups by result (hit, miss, bypass)", ["result"]
+)
+CONTEXT_TOKENS = metrics_registry.counter(
+    "content_context_tokens_total", "Tokens of step output passed on as context, before (source) and after (packed) packing", ["kind"]
+)
+TASKS_IN_FLIGHT = metrics_registry.gauge("content_tasks_in_flight", "Tasks currently being processed by a worker")
+JOB_QUEUE_DEPTH = metrics_registry.gauge("content_job_queue_depth", "Tasks waiting in the job queue")
+JOB_QUEUE_DEPTH.set_function(lambda: job_queue.stats()["queued"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared OpenAI client and job workers on startup; close them on shutdown
+    
+    Checkpointed tasks left unfinished by a crashed or stopped process are
+    resumed on startup and whenever their owner's lease runs out.
+    """
+    llm_client.start()
+    job_queue.start()
+    batch_jobs.resume()
+    keeper = asyncio.ensure_future(keep_checkpoints(checkpoints)) if checkpoints else None
+    yield
+    if keeper:
+        keeper.cancel()
+    # Also closes each job's OpenAIBatchCaller before the shared client goes away
+    await batch_jobs.close()
+    await job_queue.close()
+    if checkpoints:
+        # Interrupted and still-queued tasks resume in the next process without waiting out the lease
+        checkpoints.release()
+    await llm_client.close()
+    if response_cache:
+        response_cache.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="AI Content Creation System",
     description="Real AI-powered content creation with OpenAI GPT",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for React frontend
@@ -87,28 +194,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # the frontend's delta polling sends it back in If-None-Match
 )
 
-# In-memory storage for task status
-task_storage: Dict[str, ProcessingStatus] = {}
+# Task status storage (in-memory LRU+TTL by default, SQLite with TASK_STORE=sqlite)
+task_storage: TaskStore = create_task_store()
+
+# Content pipelines run on a fixed worker pool fed by a bounded queue
+job_queue = create_job_queue(on_job_start=lambda job_id, waited: QUEUE_WAIT.observe(waited))
+
+# Durable step outputs of unfinished tasks, for resuming after a crash (None when disabled)
+checkpoints = create_task_checkpoints()
+CHECKPOINT_MAX_RESUMES = int(os.getenv("CHECKPOINT_MAX_RESUMES", "3"))
+
+# Single-flight: normalized input -> task_id of the running task that serves it
+inflight_tasks: Dict[str, str] = {}
+coalesce_stats = {"coalesced_requests": 0}
+
+# Encoded download bodies, precomputed when a task completes
+download_cache = DownloadCache()
+
+# Page title and article renderer of tasks running in this process, for live previews
+live_renderers: Dict[str, Tuple[str, IncrementalMarkdownRenderer]] = {}
 
-# Conditionally serve React frontend static files
-if os.path.exists("frontend/build/static"):
-    app.mount("/static", StaticFiles(directory="frontend/build/static"), name="static")
+# Live step/token events for SSE subscribers
+event_hub = TaskEventHub()
+SSE_KEEPALIVE_SECONDS = 15.0
+SSE_POLL_SECONDS = 1.0  # store polling interval for tasks owned by another worker process
+WS_REFRESH_SECONDS = 5.0  # WebSocket re-read interval when no step event arrives
+
+# React frontend build, held in memory with precompressed variants (None when not built)
+frontend_assets = create_static_assets()
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_static(path: str, request: Request):
+    """Serve a frontend build asset from memory
+    
+    Content-hashed files are cached as immutable; `Accept-Encoding` selects
+    the precomputed gzip or brotli body.
+    """
+    asset = frontend_assets.get(f"static/{path}") if frontend_assets else None
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return serve_prepared(asset, request, attachment=False, cache_control=asset.cache_control)
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the React frontend"""
-    try:
-        with open("frontend/build/index.html", "r", encoding="utf-8") as f:
-            return HTMLResponse(f.read())
-    except FileNotFoundError:
+    index = frontend_assets.get("index.html") if frontend_assets else None
+    if index is not None:
+        return serve_prepared(index, request, attachment=False, cache_control=index.cache_control)
+    else:
         return HTMLResponse(f"""
         <html>
             <body>
                 <h1>🤖 AI Content Creation System</h1>
                 <p><strong>Status:</strong> Real AI system is running!</p>
-                <p><strong>OpenAI API:</strong> {"✅ Connected" if client else "❌ Not available"}</p>
+                <p><strong>OpenAI API:</strong> {"✅ Connected" if llm_client.available else "❌ Not available"}</p>
                 <p><strong>For development:</strong> React app at http://localhost:3000</p>
                 <p>API Documentation: <a href="/docs">http://localhost:8000/docs</a></p>
                 <h2>Test API:</h2>
@@ -139,63 +281,251 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "message": "AI Content Creation API is running",
-        "openai_available": client is not None,
-        "mode": "production" if client else "development"
+        "openai_available": llm_client.available,
+        "mode": "production" if llm_client.available else "development",
+        "cache": response_cache.stats() if response_cache else None,
+        "rate_limiter": rate_limiter.stats() if rate_limiter else None,
+        "circuit_breakers": circuit_breakers.stats() if circuit_breakers else None,
+        "retry_budget": retry_budget.stats(),
+        "hedging": hedging.stats() if hedging else None,
+        "model_routes": model_router.stats(),
+        "checkpoints": checkpoints.stats() if checkpoints else None,
+        "jobs": job_queue.stats(),
+        "inflight_tasks": len(inflight_tasks),
+        "coalesced_requests": coalesce_stats["coalesced_requests"]
     }
 
-async def call_openai_gpt(prompt: str, system_prompt: str = None) -> str:
-    """Call OpenAI GPT with error handling"""
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+def chat_messages(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+async def call_openai_gpt(
+    prompt: str,
+    system_prompt: str = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    use_cache: bool = True,
+    priority: int = PRIORITY_INTERACTIVE,
+    step: str = "other",
+    served_by: Optional[Dict[str, str]] = None
+) -> str:
+    """Call OpenAI GPT with error handling
+    
+    `model_router` supplies the step's model, max_tokens and timeout. If a
+    model's circuit is open or its retries run out before anything streamed,
+    the next model in the step's fallback list is tried. `served_by[step]` is
+    set to the model that answered, "cache" or "fallback".
+    
+    When `on_token` is given the streaming API is used and each content delta is
+    passed to it as it arrives. Successful responses are cached; `use_cache=False`
+    skips the lookup (the fresh response still refreshes the cache).
+    
+    Calls wait for `rate_limiter` capacity (lower `priority` first). A 429 from the
+    API pauses the limiter for the advertised Retry-After and re-queues the call;
+    fallback content is only returned once RATE_LIMIT_RETRIES are exhausted.
+    
+    Timeouts, connection errors and 5xx responses are retried with jittered
+    exponential backoff while `retry_budget` allows. The model's circuit breaker
+    counts them; while it is open, calls return cached content (even when
+    `use_cache=False`) or fallback content at once instead of waiting on the API.
+    
+    With `hedging` enabled, a request still unanswered (no first token when
+    streaming) at the recent latency percentile is duplicated; the first to
+    answer wins and the other is cancelled. Only the winner's tokens reach
+    `on_token`.
+    
+    Latency and token usage are recorded in the metrics under `step`.
+    """
+    served_by = served_by if served_by is not None else {}
+    served_by[step] = "fallback"
+    client = llm_client.get()
     if not client:
         return generate_fallback_content(prompt, "no_client")
+    route = model_router.route(step)
+    model = route.models[0]
+    first_token_at: Optional[float] = None  # set once tokens were streamed; retrying would repeat them
+    request_started: Optional[float] = None  # when the current attempt's first request was sent
+    
+    # Keyed on the step's preferred model, so a hit does not depend on which fallback is active
+    key = cache_key(route.models[0], system_prompt, prompt, route.temperature, route.max_tokens)
+    if response_cache and not use_cache:
+        response_cache.record_bypass()
+        CACHE_LOOKUPS.inc(result="bypass")
+    elif response_cache:
+        cached = response_cache.get(key)
+        CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            served_by[step] = "cache"
+            if on_token:
+                on_token(cached)
+            return cached
+    
+    messages = chat_messages(prompt, system_prompt)
+    
+    async def _stream_completion(usage: Dict[str, int], claim: Optional[Claim] = None) -> str:
+        nonlocal first_token_at
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=route.max_tokens,
+            temperature=route.temperature,
+            timeout=route.timeout,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts = []
+        # Closing the stream on exit aborts the HTTP response when the task is cancelled
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage.update(chunk.usage.model_dump(include={"prompt_tokens", "completion_tokens", "total_tokens"}))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    if claim is not None and not claim():
+                        break  # a hedged duplicate answered first; this attempt is being cancelled
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(delta)
+                    on_token(delta)
+        return "".join(parts)
     
-    def _make_openai_call():
-        """Synchronous OpenAI call to run in thread pool"""
+    async def _complete(usage: Dict[str, int]) -> str:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=route.max_tokens,
+            temperature=route.temperature,
+            timeout=route.timeout  # Additional timeout at request level
+        )
+        if response.usage:
+            usage.update(response.usage.model_dump(include={"prompt_tokens", "completion_tokens", "total_tokens"}))
+        return response.choices[0].message.content
+    
+    async def _send(claim: Optional[Claim] = None) -> str:
+        """One request: rate-limiter capacity, the API call and its accounting"""
+        nonlocal request_started
+        # Time spent queued for capacity does not count against the request timeout
+        reservation = None
+        if rate_limiter:
+            reservation = await rate_limiter.acquire(estimate_tokens(messages, route.max_tokens), priority)
+            RATE_LIMIT_WAIT.observe(reservation.waited, step=step)
+        usage: Dict[str, int] = {}
+        started = time.perf_counter()
+        request_started = request_started or started
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Using the latest efficient model
-                messages=messages,
-                max_tokens=2000,
-                temperature=0.7,
-                timeout=25  # Additional timeout at request level
+            return await asyncio.wait_for(
+                _stream_completion(usage, claim) if on_token else _complete(usage),
+                timeout=route.timeout + 5.0  # Overall timeout for the entire operation
             )
-            
-            content = response.choices[0].message.content
-            if content and content.strip():
-                return content
-            else:
-                return generate_fallback_content(prompt, "empty_response")
-                
-        except openai.Timeout as e:
-            print(f"OpenAI API Timeout: {e}")
-            return generate_fallback_content(prompt, "timeout")
-        except openai.RateLimitError as e:
-            print(f"OpenAI Rate Limit: {e}")
-            return generate_fallback_content(prompt, "rate_limit")
-        except Exception as e:
-            print(f"OpenAI API Error: {e}")
-            return generate_fallback_content(prompt, "error", str(e))
+        except asyncio.CancelledError:
+            # The prompt was sent, but the unused completion budget goes back to the limiter
+            usage.setdefault("total_tokens", estimate_tokens(messages, 0))
+            raise
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - started, step=step)
+            for kind in ("prompt", "completion"):
+                if usage.get(f"{kind}_tokens"):
+                    LLM_TOKENS.inc(usage[f"{kind}_tokens"], step=step, kind=kind)
+            if reservation:
+                reservation.settle(usage.get("total_tokens"))
     
-    # Run the synchronous OpenAI call in a thread pool
-    import concurrent.futures
-    loop = asyncio.get_event_loop()
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    async def _attempt() -> str:
+        nonlocal request_started
+        breaker = circuit_breakers.get(model) if circuit_breakers else None
+        hedge = hedging.get(f"{model}/{'stream' if on_token else 'complete'}") if hedging else None
+        # An open breaker fails before waiting for rate-limit capacity
+        permit = breaker.acquire() if breaker else None
+        request_started = None
         try:
-            result = await asyncio.wait_for(
-                loop.run_in_executor(executor, _make_openai_call),
-                timeout=30.0  # Overall timeout for the entire operation
-            )
-            return result
-        except asyncio.TimeoutError:
-            print("OpenAI call timed out after 30 seconds")
-            return generate_fallback_content(prompt, "timeout")
+            # A duplicate would only queue behind the limiter when capacity is the bottleneck
+            if hedge and not (rate_limiter and rate_limiter.queue_depth):
+                content = await hedge.run(_send)
+            else:
+                content = await _send()
+            if permit:
+                # Streams are judged on time to first token, not on how long the answer is
+                permit.success((first_token_at or time.perf_counter()) - request_started)
+            model_router.record(step, model, time.perf_counter() - request_started)
+            return content
+        except TRANSIENT_ERRORS:
+            if permit:
+                permit.failure(time.perf_counter() - (request_started or time.perf_counter()))
+            raise
+        finally:
+            if permit:
+                permit.release()  # no-op once an outcome was recorded
+    
+    async def _call_model() -> str:
+        """The current model with rate-limit re-queues and budgeted retries"""
+        rate_limit_hits = failures = 0
+        while True:
+            try:
+                return await _attempt()
+            except openai.RateLimitError as e:
+                if not rate_limiter or rate_limit_hits == RATE_LIMIT_RETRIES:
+                    raise
+                delay = parse_retry_after(getattr(e.response, "headers", None), default=2.0 ** rate_limit_hits)
+                rate_limit_hits += 1
+                print(f"⏳ OpenAI rate limit hit, re-queueing in {delay:.2f}s")
+                rate_limiter.pause(delay)
+            except TRANSIENT_ERRORS as e:
+                failures += 1
+                if first_token_at is not None or not retry_budget.can_retry(failures):
+                    raise
+                delay = retry_budget.backoff(failures)
+                print(f"🔁 OpenAI call failed ({type(e).__name__}), retry {failures} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+    
+    try:
+        retry_budget.record_request()
+        candidates = model_router.candidates(step)
+        for index, model in enumerate(candidates):
+            try:
+                content = await _call_model()
+                break
+            except (CircuitOpenError,) + TRANSIENT_ERRORS as e:
+                if index + 1 == len(candidates) or first_token_at is not None:
+                    raise
+                print(f"↪️  {step} falling back from {model} to {candidates[index + 1]} ({type(e).__name__})")
+        
+        if content and content.strip():
+            if response_cache:
+                response_cache.set(key, content)
+            served_by[step] = model
+            return content
+        else:
+            return generate_fallback_content(prompt, "empty_response")
+            
+    except CircuitOpenError as e:
+        cached = response_cache.get(key) if response_cache else None
+        if cached is not None:
+            CACHE_LOOKUPS.inc(result="hit")
+            served_by[step] = "cache"
+            if on_token:
+                on_token(cached)
+            return cached
+        print(f"⚡ {e}")
+        return generate_fallback_content(prompt, "circuit_open")
+    except (openai.APITimeoutError, asyncio.TimeoutError) as e:
+        print(f"OpenAI API Timeout: {e}")
+        return generate_fallback_content(prompt, "timeout")
+    except openai.RateLimitError as e:
+        print(f"OpenAI Rate Limit: {e}")
+        return generate_fallback_content(prompt, "rate_limit")
+    except Exception as e:
+        print(f"OpenAI API Error: {e}")
+        return generate_fallback_content(prompt, "error", str(e))
 
 def generate_fallback_content(prompt: str, error_type: str, error_msg: str = "") -> str:
     """Generate meaningful fallback content when AI API fails"""
+    FALLBACKS.inc(error_type=error_type)
     topic_keywords = prompt.split()[:5]  # Get first few words as topic
     topic = " ".join(topic_keywords)
     
@@ -342,42 +672,110 @@ The future of {topic} looks promising, with new opportunities emerging regularly
 ---
 *This content was generated as a fallback due to API limitations. For the most current and detailed information, please consult recent expert sources and industry publications.*"""
 
+def normalize_input(input_data: UserInput) -> str:
+    """Key under which identical requests share one running task"""
+    fields = [input_data.topic, input_data.audience, input_data.style, input_data.length]
+    normalized = [" ".join(value.split()).lower() for value in fields]
+    return json.dumps(normalized + [input_data.bypass_cache])
+
 @app.post("/api/content/create")
-async def create_content(input_data: UserInput, background_tasks: BackgroundTasks):
-    """Start AI content creation process"""
+async def create_content(input_data: UserInput):
+    """Queue an AI content creation task
+    
+    Returns 429 with a Retry-After header when the job queue is full.
+    """
     try:
         # Generate unique task ID
         task_id = str(uuid.uuid4())
         
+        # Attach to an identical task that is already running instead of starting another
+        input_key = normalize_input(input_data)
+        primary_id = inflight_tasks.get(input_key)
+        if primary_id is not None and primary_id in task_storage:
+            task_storage.create(task_id, {"task_id": task_id, "status": "aliased", "alias_of": primary_id})
+            coalesce_stats["coalesced_requests"] += 1
+            print(f"🔗 Task {task_id} coalesced with running task {primary_id}")
+            return {"task_id": task_id, "status": "started", "coalesced": True}
+        
         # Initialize task status
         task_status = ProcessingStatus(
             task_id=task_id,
-            status="processing",
-            current_step=1,
-            current_operation="🔍 Starting AI research..."
+            status="queued",
+            current_step=0,
+            current_operation="⏳ Waiting for a worker..."
         )
-        task_storage[task_id] = task_status
+        task_storage.create(task_id, {
+            **task_status.model_dump(exclude={"final_result", "queue_position"}),
+            "worker_pid": os.getpid()  # live events for this task are only published in this process
+        })
+        submitted_at = time.time()
+        if checkpoints:
+            checkpoints.start(task_id, input_data.model_dump(), submitted_at)
         
-        # Start background AI processing
-        background_tasks.add_task(process_ai_content_creation, task_id, input_data)
+        try:
+            position = job_queue.submit(task_id, process_ai_content_creation, task_id, input_data, submitted_at)
+        except QueueFullError as e:
+            task_storage.delete(task_id)
+            if checkpoints:
+                checkpoints.finish(task_id)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many content requests in progress, please retry later",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        inflight_tasks[input_key] = task_id
         
-        return {"task_id": task_id, "status": "started"}
+        return {"task_id": task_id, "status": "started", "coalesced": False, "queue_position": position}
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error starting content creation: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to start content creation: {str(e)}")
 
-async def process_ai_content_creation(task_id: str, input_data: UserInput):
-    """Background task with real AI content creation"""
-    try:
-        print(f"🚀 Starting content creation for task {task_id}")
-        
-        # Step 1: AI Research
-        task_storage[task_id].current_operation = f"🔍 AI researching '{input_data.topic}'..."
-        print(f"Step 1: Research for {input_data.topic}")
-        await asyncio.sleep(1)
-        
+# Pipeline steps: (step number, status message) shown to the client while a step runs
+STEP_PROGRESS = {
+    "research": (1, "🔍 AI researching '{topic}'..."),
+    "structure": (2, "📝 AI creating content structure..."),
+    "article": (3, "✍️ AI writing full article..."),
+    "image_concepts": (4, "🖼️ AI generating image concepts..."),
+    "seo": (5, "🚀 AI optimizing for SEO and final polish..."),
+}
+
+# Token budget for the upstream output each step receives as context
+CONTEXT_BUDGETS = {"structure": 100, "article": 160, "image_concepts": 100, "seo": 100}
+
+def build_content_steps(
+    input_data: UserInput,
+    publish_token: Optional[Callable[[str, str], None]] = None,
+    packer: Optional[ContextPacker] = None,
+    call: Optional[Callable[..., Awaitable[str]]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    served_by: Optional[Dict[str, str]] = None
+) -> List[PipelineStep]:
+    """Describe the content pipeline as a DAG of named steps with declared inputs
+    
+    `publish_token(step_name, delta)` receives streamed tokens from every step.
+    `packer` trims the context passed between steps to CONTEXT_BUDGETS, keeping
+    the sentences and headings most relevant to the topic. `call` replaces
+    call_openai_gpt (batch jobs route it through the OpenAI Batch API) and
+    `priority` is the rate limiter priority of every step's request.
+    `served_by` collects the model (or "cache"/"fallback") behind each step.
+    """
+    call = call or call_openai_gpt
+    packer = packer or ContextPacker(DEFAULT_MODEL)
+    relevance_query = f"{input_data.topic} {input_data.audience}"
+    
+    def context(step_name: str, upstream: str) -> str:
+        return packer.pack(upstream, CONTEXT_BUDGETS[step_name], relevance_query)
+    
+    def token_sink(step_name: str) -> Optional[Callable[[str], None]]:
+        if publish_token is None:
+            return None
+        return lambda delta: publish_token(step_name, delta)
+    
+    async def research():
         research_prompt = f"""Research the topic "{input_data.topic}" and provide:
 1. Key facts and current trends
 2. Main subtopics to cover
@@ -386,19 +784,19 @@ async def process_ai_content_creation(task_id: str, input_data: UserInput):
 
 Keep it concise but comprehensive."""
 
-        research_result = await call_openai_gpt(
+        return await call(
             research_prompt,
-            "You are an expert researcher. Provide accurate, up-to-date information."
+            "You are an expert researcher. Provide accurate, up-to-date information.",
+            on_token=token_sink("research"),
+            use_cache=not input_data.bypass_cache,
+            priority=priority,
+            step="research",
+            served_by=served_by
         )
-        print(f"✅ Research completed: {len(research_result)} characters")
-        
-        # Step 2: Content Structure
-        task_storage[task_id].current_step = 2
-        task_storage[task_id].current_operation = "📝 AI creating content structure..."
-        print("Step 2: Creating structure")
-        await asyncio.sleep(1)
-        
-        structure_prompt = f"""Based on this research: {research_result[:500]}...
+    
+    async def structure(research: str):
+        structure_prompt = f"""Based on this research:
+{context("structure", research)}
         
 Create a detailed outline for an article about "{input_data.topic}" with:
 - Compelling title
@@ -409,20 +807,19 @@ Create a detailed outline for an article about "{input_data.topic}" with:
 - Writing style: {input_data.style}
 - Length: {input_data.length}"""
 
-        structure_result = await call_openai_gpt(
+        return await call(
             structure_prompt,
-            "You are a content strategist. Create engaging, well-structured outlines."
+            "You are a content strategist. Create engaging, well-structured outlines.",
+            on_token=token_sink("structure"),
+            use_cache=not input_data.bypass_cache,
+            priority=priority,
+            step="structure",
+            served_by=served_by
         )
-        print(f"✅ Structure completed: {len(structure_result)} characters")
-        
-        # Step 3: Full Article Creation
-        task_storage[task_id].current_step = 3
-        task_storage[task_id].current_operation = "✍️ AI writing full article..."
-        print("Step 3: Writing article")
-        await asyncio.sleep(2)
-        
+    
+    async def article(structure: str):
         article_prompt = f"""Write a complete article about "{input_data.topic}" using this structure:
-{structure_result[:800]}...
+{context("article", structure)}
 
 Requirements:
 - Target audience: {input_data.audience}
@@ -433,20 +830,19 @@ Requirements:
 - Use markdown formatting
 - Add relevant headers and subheaders"""
 
-        article_result = await call_openai_gpt(
+        return await call(
             article_prompt,
-            f"You are an expert {input_data.style.lower()} writer. Create high-quality content that engages {input_data.audience.lower()} readers."
+            f"You are an expert {input_data.style.lower()} writer. Create high-quality content that engages {input_data.audience.lower()} readers.",
+            on_token=token_sink("article"),
+            use_cache=not input_data.bypass_cache,
+            priority=priority,
+            step="article",
+            served_by=served_by
         )
-        print(f"✅ Article completed: {len(article_result)} characters")
-        
-        # Step 4: Image Descriptions
-        task_storage[task_id].current_step = 4
-        task_storage[task_id].current_operation = "🖼️ AI generating image concepts..."
-        print("Step 4: Creating image concepts")
-        await asyncio.sleep(1)
-        
+    
+    async def image_concepts(article: str):
         image_prompt = f"""Based on this article about "{input_data.topic}":
-{article_result[:500]}...
+{context("image_concepts", article)}
 
 Create 3-4 detailed image descriptions that would enhance this article:
 1. A main header image
@@ -459,21 +855,21 @@ For each image, provide:
 - Alt text for accessibility
 - Placement suggestion in the article"""
 
-        image_result = await call_openai_gpt(
+        return await call(
             image_prompt,
-            "You are a visual content strategist. Create compelling image concepts that enhance written content."
+            "You are a visual content strategist. Create compelling image concepts that enhance written content.",
+            on_token=token_sink("image_concepts"),
+            use_cache=not input_data.bypass_cache,
+            priority=priority,
+            step="image_concepts",
+            served_by=served_by
         )
-        print(f"✅ Image concepts completed: {len(image_result)} characters")
-        
-        # Step 5: SEO & Final Polish
-        task_storage[task_id].current_step = 5
-        task_storage[task_id].current_operation = "🚀 AI optimizing for SEO and final polish..."
-        print("Step 5: SEO optimization")
-        await asyncio.sleep(1)
-        
+    
+    async def seo(article: str):
         seo_prompt = f"""Optimize this article for SEO and provide final recommendations:
 
-Article: {article_result[:500]}...
+Article:
+{context("seo", article)}
 
 Provide:
 1. SEO-optimized title variations (3-4 options)
@@ -482,142 +878,755 @@ Provide:
 4. Content improvements for better engagement
 5. Call-to-action suggestions"""
 
-        seo_result = await call_openai_gpt(
+        return await call(
             seo_prompt,
-            "You are an SEO expert. Optimize content for search engines while maintaining readability."
+            "You are an SEO expert. Optimize content for search engines while maintaining readability.",
+            on_token=token_sink("seo"),
+            use_cache=not input_data.bypass_cache,
+            priority=priority,
+            step="seo",
+            served_by=served_by
         )
-        print(f"✅ SEO optimization completed: {len(seo_result)} characters")
-        
-        # Create final result
-        # Generate HTML version of the content
-        html_content = f"""<!DOCTYPE html>
+    
+    # Image concepts and SEO both depend only on the article, so they run concurrently
+    return [
+        PipelineStep("research", research),
+        PipelineStep("structure", structure, inputs=["research"]),
+        PipelineStep("article", article, inputs=["structure"]),
+        PipelineStep("image_concepts", image_concepts, inputs=["article"]),
+        PipelineStep("seo", seo, inputs=["article"]),
+    ]
+
+def render_html_page(title: str, body_html: str) -> str:
+    """Wrap rendered article HTML in the standalone page used for previews and downloads"""
+    return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{input_data.topic}</title>
+    <title>{html.escape(title)}</title>
     <style>
         body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; line-height: 1.6; }}
         h1, h2, h3 {{ color: #333; }}
         code {{ background-color: #f4f4f4; padding: 2px 4px; border-radius: 3px; }}
         pre {{ background-color: #f4f4f4; padding: 10px; border-radius: 5px; overflow-x: auto; }}
         blockquote {{ border-left: 4px solid #ddd; margin: 0; padding-left: 20px; color: #666; }}
+        table {{ border-collapse: collapse; }}
+        th, td {{ border: 1px solid #ddd; padding: 6px 10px; }}
     </style>
 </head>
 <body>
-{article_result}
-</body>
+{body_html}</body>
 </html>"""
+
+def build_final_result(input_data: UserInput, results: Dict[str, str], article_html: Optional[str] = None) -> Dict[str, Any]:
+    """Assemble the downloadable result from the step outputs
+    
+    `article_html` is the article already rendered while it streamed; without
+    it the markdown is rendered here.
+    """
+    article_result = results["article"]
+    if article_html is None:
+        article_html = render_markdown(article_result)
+    html_content = render_html_page(input_data.topic, article_html)
+    
+    # Create URL-friendly slug
+    url_slug = re.sub(r'[^a-zA-Z0-9\s-]', '', input_data.topic.lower())
+    url_slug = re.sub(r'\s+', '-', url_slug.strip())
+    url_slug = url_slug[:50]  # Limit length
+    
+    return {
+        "title": f"AI-Generated Guide: {input_data.topic}",
+        "content": article_result,  # Keep original for backward compatibility
+        "markdown_content": article_result,  # Markdown version
+        "html_content": html_content,  # HTML version
+        "article_url_slug": url_slug,  # For filename generation
+        "word_count": len(article_result.split()),
+        "research_data": results["research"],
+        "structure_outline": results["structure"],
+        "image_concepts": results["image_concepts"],
+        "seo_optimization": results["seo"],
+        "metadata": {
+            "topic": input_data.topic,
+            "audience": input_data.audience,
+            "style": input_data.style,
+            "length": input_data.length,
+            "created_at": datetime.now().isoformat(),
+            "ai_model": DEFAULT_MODEL if llm_client.available else "mock"
+        }
+    }
+
+def finalize_result(
+    input_data: UserInput,
+    results: Dict[str, str],
+    packer: ContextPacker,
+    article_html: Optional[str] = None,
+    served_by: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """build_final_result plus the task's context packing stats and per-step models"""
+    final_result = build_final_result(input_data, results, article_html)
+    context_stats = packer.stats()
+    final_result["metadata"]["context_packing"] = context_stats
+    final_result["metadata"]["step_models"] = dict(served_by or {})
+    CONTEXT_TOKENS.inc(context_stats["source_tokens"], kind="source")
+    CONTEXT_TOKENS.inc(context_stats["packed_tokens"], kind="packed")
+    return final_result
+
+async def generate_content(
+    input_data: UserInput,
+    call: Optional[Callable[..., Awaitable[str]]] = None,
+    priority: int = PRIORITY_BATCH
+) -> Dict[str, Any]:
+    """Run the content pipeline without task tracking or live events (used by batch jobs)
+    
+    Batch work defaults to PRIORITY_BATCH so it never delays interactive requests.
+    """
+    packer = ContextPacker(DEFAULT_MODEL)
+    served_by: Dict[str, str] = {}
+    results = await run_pipeline(
+        build_content_steps(input_data, packer=packer, call=call, priority=priority, served_by=served_by)
+    )
+    return finalize_result(input_data, results, packer, served_by=served_by)
+
+def openai_batch_call(caller: OpenAIBatchCaller) -> Callable[..., Awaitable[str]]:
+    """A call_openai_gpt replacement that sends requests through OpenAI Batch files
+    
+    Responses are cached like interactive ones. Failures raise instead of
+    returning fallback content, so the record is reported as failed. Each step
+    uses its route's preferred model; latency SLOs do not apply to batches.
+    """
+    async def call(
+        prompt: str,
+        system_prompt: str = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        priority: int = PRIORITY_BATCH,
+        step: str = "other",
+        served_by: Optional[Dict[str, str]] = None
+    ) -> str:
+        served_by = served_by if served_by is not None else {}
+        route = model_router.route(step)
+        key = cache_key(route.models[0], system_prompt, prompt, route.temperature, route.max_tokens)
+        if response_cache and use_cache:
+            cached = response_cache.get(key)
+            CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+            if cached is not None:
+                served_by[step] = "cache"
+                return cached
+        content = await caller.complete({
+            "model": route.models[0],
+            "messages": chat_messages(prompt, system_prompt),
+            "max_tokens": route.max_tokens,
+            "temperature": route.temperature,
+        })
+        if not content or not content.strip():
+            raise ValueError(f"Empty batch response for step {step}")
+        if response_cache:
+            response_cache.set(key, content)
+        served_by[step] = route.models[0]
+        return content
+    
+    return call
+
+def batch_record_runner(caller: Optional[OpenAIBatchCaller] = None) -> Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]:
+    """Batch job runner: validate a JSONL record as UserInput and generate its content
+    
+    The runner's close() closes `caller`; BatchJobManager awaits it when the job ends.
+    """
+    call = openai_batch_call(caller) if caller else None
+    
+    async def run_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        return await generate_content(UserInput(**record), call=call)
+    
+    async def close():
+        if caller:
+            await caller.close()
+    
+    run_record.close = close
+    return run_record
+
+def make_batch_runner(mode: str, directory: Path) -> Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]:
+    if mode == "openai_batch":
+        client = llm_client.get()
+        if client is None:
+            raise RuntimeError("openai_batch mode needs an OpenAI API key")
+        # A resumed job polls the batches it already submitted instead of paying for them twice
+        return batch_record_runner(OpenAIBatchCaller(client, state_path=str(directory / "openai_batches.json")))
+    return batch_record_runner()
+
+# JSONL batch jobs; results and checkpoints live under BATCH_DIR
+batch_jobs = BatchJobManager(os.getenv("BATCH_DIR", "output/batches"), make_batch_runner)
+
+async def process_ai_content_creation(task_id: str, input_data: UserInput, submitted_at: Optional[float] = None):
+    """Background task with real AI content creation
+    
+    `submitted_at` (epoch seconds) is when the request was accepted, so the
+    recorded task duration includes time spent in the job queue. Each step's
+    output is checkpointed as it completes; a resumed task skips the steps
+    its checkpoint already holds.
+    """
+    submitted_at = submitted_at or time.time()
+    TASKS_IN_FLIGHT.inc()
+    try:
+        print(f"🚀 Starting content creation for task {task_id}")
+        completed = checkpoints.steps(task_id) if checkpoints else {}
+        current_step = max((STEP_PROGRESS[name][0] for name in completed), default=0)
+        task_storage.update(
+            task_id,
+            status="processing",
+            current_step=max(current_step, 1),
+            current_operation="♻️ Resuming AI content creation..." if completed else "🔍 Starting AI research..."
+        )
+        step_timings: Dict[str, float] = {}
         
-        # Create URL-friendly slug
-        import re
-        url_slug = re.sub(r'[^a-zA-Z0-9\s-]', '', input_data.topic.lower())
-        url_slug = re.sub(r'\s+', '-', url_slug.strip())
-        url_slug = url_slug[:50]  # Limit length
+        def on_step_start(step: PipelineStep):
+            nonlocal current_step
+            record = task_storage.get(task_id)
+            if record is None or record["status"] == "cancelled":
+                # Cancelled through another worker process sharing the store
+                job_queue.cancel(task_id)
+                raise asyncio.CancelledError()
+            step_number, operation = STEP_PROGRESS[step.name]
+            current_step = max(current_step, step_number)
+            task_storage.update(
+                task_id,
+                current_step=current_step,
+                current_operation=operation.format(topic=input_data.topic)
+            )
+            event_hub.publish(task_id, "step_start", {"step": step.name, "step_number": step_number})
+            print(f"Step {step_number}: {step.name} for {input_data.topic}")
         
-        final_result = {
-            "title": f"AI-Generated Guide: {input_data.topic}",
-            "content": article_result,  # Keep original for backward compatibility
-            "markdown_content": article_result,  # Markdown version
-            "html_content": html_content,  # HTML version
-            "article_url_slug": url_slug,  # For filename generation
-            "word_count": len(article_result.split()),
-            "research_data": research_result,
-            "structure_outline": structure_result,
-            "image_concepts": image_result,
-            "seo_optimization": seo_result,
-            "metadata": {
-                "topic": input_data.topic,
-                "audience": input_data.audience,
-                "style": input_data.style,
-                "length": input_data.length,
-                "created_at": datetime.now().isoformat(),
-                "ai_model": "gpt-4o-mini" if client else "mock"
-            }
-        }
+        def on_step_end(step: PipelineStep):
+            duration = step_timings[step.name]
+            task_storage.update(task_id, step_timings=dict(step_timings))
+            event_hub.publish(task_id, "step_end", {"step": step.name, "duration": duration})
+            print(f"✅ {step.name} completed in {duration:.2f}s")
+        
+        # The article is rendered to HTML block by block while it streams
+        article_renderer = IncrementalMarkdownRenderer()
+        live_renderers[task_id] = (input_data.topic, article_renderer)
+        
+        def publish_token(step_name: str, delta: str):
+            event_hub.publish(task_id, "token", {"step": step_name, "delta": delta})
+            if step_name == "article":
+                fragment = article_renderer.feed(delta)
+                if fragment:
+                    event_hub.publish(task_id, "html", {"step": step_name, "html": fragment})
+        
+        packer = ContextPacker(DEFAULT_MODEL)
+        served_by: Dict[str, str] = {name: "checkpoint" for name in completed}
+        steps = build_content_steps(input_data, publish_token, packer, served_by=served_by)
+        results = await run_pipeline(
+            [checkpointed_step(task_id, step) for step in steps] if checkpoints else steps,
+            on_step_start=on_step_start,
+            on_step_end=on_step_end,
+            timings=step_timings,
+            completed=completed
+        )
+        
+        fragment = article_renderer.finish()
+        if fragment:
+            event_hub.publish(task_id, "html", {"step": "article", "html": fragment})
+        # A retried or fallback article differs from what streamed, so only reuse a matching render
+        article_html = article_renderer.html if article_renderer.source == results["article"] else None
         
-        # Update task status to completed
-        task_storage[task_id].status = "completed"
-        task_storage[task_id].current_operation = "✅ AI content creation completed!"
-        task_storage[task_id].final_result = final_result
+        # Store the result before flipping the status so readers never see "completed" without it
+        final_result = finalize_result(input_data, results, packer, article_html, served_by)
+        task_storage.set_result(task_id, final_result)
+        for format in DOWNLOAD_FORMATS:
+            prepared = prepare_download(final_result, format)
+            if prepared is not None:
+                download_cache.put((task_id, format), prepared)
+        task_storage.update(task_id, status="completed", current_operation="✅ AI content creation completed!")
+        if checkpoints:
+            checkpoints.finish(task_id)
+        event_hub.publish(task_id, "done", {"task_id": task_id, "status": "completed"})
+        TASK_DURATION.observe(time.time() - submitted_at, status="completed")
         print(f"🎉 Content creation completed for task {task_id}")
         
+    except asyncio.CancelledError:
+        record = task_storage.get(task_id)
+        if checkpoints and record is not None and record["status"] != "cancelled":
+            # Interrupted by shutdown rather than by the user: keep the checkpoint for the next process
+            print(f"⏸️ Content creation interrupted for task {task_id}, resumes on restart")
+            task_storage.update(task_id, status="queued", current_operation="⏸️ Interrupted, resumes on restart")
+            raise
+        print(f"🛑 Content creation cancelled for task {task_id}")
+        task_storage.update(task_id, status="cancelled")
+        if checkpoints:
+            checkpoints.finish(task_id)
+        event_hub.publish(task_id, "error", {"task_id": task_id, "status": "cancelled", "error": "Task cancelled"})
+        TASK_DURATION.observe(time.time() - submitted_at, status="cancelled")
+        raise
     except Exception as e:
         print(f"❌ Error in AI content creation for task {task_id}: {e}")
-        import traceback
         traceback.print_exc()
-        task_storage[task_id].status = "error"
-        task_storage[task_id].error = f"AI processing failed: {str(e)}"
+        error = f"AI processing failed: {str(e)}"
+        task_storage.update(task_id, status="error", error=error)
+        if checkpoints:
+            checkpoints.finish(task_id)
+        event_hub.publish(task_id, "error", {"task_id": task_id, "error": error})
+        TASK_DURATION.observe(time.time() - submitted_at, status="error")
+    finally:
+        TASKS_IN_FLIGHT.dec()
+        live_renderers.pop(task_id, None)
+        event_hub.close(task_id)
+        input_key = normalize_input(input_data)
+        if inflight_tasks.get(input_key) == task_id:
+            del inflight_tasks[input_key]
+
+def checkpointed_step(task_id: str, step: PipelineStep) -> PipelineStep:
+    """Wrap a pipeline step so its output is checkpointed as soon as it completes"""
+    async def run(**inputs):
+        output = await step.run(**inputs)
+        checkpoints.save_step(task_id, step.name, output)
+        return output
+    return PipelineStep(step.name, run, step.inputs)
+
+def resume_checkpointed_tasks() -> int:
+    """Queue the unfinished tasks of crashed or stopped processes; returns how many were resumed
+    
+    A task that keeps taking its worker down is failed after
+    CHECKPOINT_MAX_RESUMES attempts instead of being resumed forever. Tasks
+    released by a clean shutdown or deploy do not count towards that limit.
+    """
+    resumed = 0
+    for task in checkpoints.claim_orphans():
+        if task.resumes > CHECKPOINT_MAX_RESUMES:
+            error = f"Gave up after {task.resumes - 1} resumes from crashed workers"
+            if task_storage.get(task.task_id) is not None:
+                task_storage.update(task.task_id, status="error", error=error)
+            checkpoints.finish(task.task_id)
+            print(f"❌ Task {task.task_id} not resumed: {error}")
+            continue
+        
+        input_data = UserInput(**task.input)
+        fields = {"status": "queued", "current_operation": "♻️ Resuming...", "worker_pid": os.getpid()}
+        if task_storage.get(task.task_id) is None:
+            task_storage.create(task.task_id, {
+                **ProcessingStatus(
+                    task_id=task.task_id, status="queued", current_step=0, current_operation=fields["current_operation"]
+                ).model_dump(exclude={"final_result", "queue_position"}),
+                "worker_pid": os.getpid()
+            })
+        else:
+            task_storage.update(task.task_id, **fields)
+        try:
+            job_queue.submit(task.task_id, process_ai_content_creation, task.task_id, input_data, task.submitted_at)
+        except QueueFullError:
+            checkpoints.release(task.task_id)  # another process (or a later pass) picks it up
+            break
+        inflight_tasks.setdefault(normalize_input(input_data), task.task_id)
+        resumed += 1
+        print(f"♻️ Resuming task {task.task_id} from {len(checkpoints.steps(task.task_id))} saved steps")
+    return resumed
+
+async def keep_checkpoints(store: TaskCheckpoints):
+    """Heartbeat this process's tasks and pick up orphaned ones, until cancelled"""
+    interval = max(store.lease_seconds / 3, 0.1)
+    while True:
+        try:
+            store.heartbeat()
+            resume_checkpointed_tasks()
+        except Exception as e:
+            print(f"⚠️ Checkpoint maintenance failed: {e}")
+        await asyncio.sleep(interval)
 
-@app.get("/api/content/status/{task_id}")
-async def get_task_status(task_id: str):
-    """Get the status of a content creation task"""
-    if task_id not in task_storage:
+def resolve_task_id(task_id: str) -> str:
+    """Follow a coalesced task's alias to the task that does the work"""
+    record = task_storage.get(task_id)
+    if record is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    return record.get("alias_of", task_id)
+
+def record_owner(task_id: str) -> int:
+    """Process id of the worker running a task (this process if unrecorded)"""
+    record = task_storage.get(task_id) or {}
+    return record.get("worker_pid", os.getpid())
+
+def load_task_record(task_id: str) -> Tuple[str, Dict[str, Any]]:
+    """The id of the task doing the work and its stored record"""
+    source_id = resolve_task_id(task_id)
+    record = task_storage.get(source_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return source_id, record
+
+def load_task_status(task_id: str, include_result: bool = True) -> ProcessingStatus:
+    """Read a task from the store, loading its final result lazily when needed"""
+    source_id, record = load_task_record(task_id)
+    return build_task_status(task_id, source_id, record, include_result)
+
+def build_task_status(task_id: str, source_id: str, record: Dict[str, Any], include_result: bool = True) -> ProcessingStatus:
+    task_status = ProcessingStatus(**{**record, "task_id": task_id})
+    if task_status.status == "queued":
+        task_status.queue_position = job_queue.position(source_id)
+        if task_status.queue_position:
+            task_status.current_operation = f"⏳ Queued (position {task_status.queue_position})..."
+    if include_result and task_status.status == "completed":
+        task_status.final_result = task_storage.get_result(source_id)
+    return task_status
+
+@app.delete("/api/tasks/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running task
+    
+    The pipeline is cancelled at its current await: in-flight OpenAI requests
+    are aborted, their unused rate-limit reservation is returned and the worker
+    slot is freed. Coalesced requests share one task, so cancelling any of them
+    cancels the shared work. A task running in another worker process stops at
+    its next step.
+    """
+    source_id, record = load_task_record(task_id)
+    if record["status"] in ("completed", "error"):
+        raise HTTPException(status_code=409, detail=f"Task already {record['status']}")
     
-    return task_storage[task_id]
+    # Record the cancellation first so the status never reads "completed" afterwards
+    task_storage.update(source_id, status="cancelled", current_operation="🛑 Cancelled by user")
+    if checkpoints:
+        checkpoints.finish(source_id)
+    queued = job_queue.position(source_id) is not None
+    if not job_queue.cancel(source_id) or queued:
+        # No pipeline is running in this process to report the cancellation itself
+        event_hub.publish(source_id, "error", {"task_id": source_id, "status": "cancelled", "error": "Task cancelled"})
+        event_hub.close(source_id)
+    input_key = next((key for key, value in inflight_tasks.items() if value == source_id), None)
+    if input_key is not None:
+        del inflight_tasks[input_key]
+    print(f"🛑 Task {source_id} cancelled by user")
+    return {"success": True, "message": "Task cancelled successfully"}
+
+# Fields a status response may be projected to; task_id and version are always sent
+STATUS_FIELDS = set(ProcessingStatus.model_fields)
+
+def changed_status_fields(record: Dict[str, Any], since: int) -> set:
+    """Status fields whose stored value changed after version `since`"""
+    changed = {field for field in STATUS_FIELDS if field_version(record, field) > since}
+    if record.get("status") == "completed" and field_version(record, "status") > since:
+        changed.add("final_result")  # stored just before the status flipped to completed
+    if record.get("status") == "queued":
+        changed |= {"queue_position", "current_operation"}  # computed from the live queue
+    return changed
+
+@app.get("/api/content/status/{task_id}")
+async def get_task_status(task_id: str, request: Request, fields: Optional[str] = None, since: Optional[int] = None):
+    """Get the status of a content creation task
+    
+    `fields=status,current_step` limits the response to those fields (plus
+    `task_id` and `version`), and the final result is only loaded when
+    `final_result` is among them. `version` grows with every stored update;
+    the ETag follows it and `If-None-Match` gets a 304. `since=<version>`
+    returns only the fields that changed after that version, which is just
+    `task_id` and `version` when none did. Delta pollers send both to get a
+    304 when nothing changed.
+    """
+    selected = STATUS_FIELDS
+    if fields:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - STATUS_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown status fields: {', '.join(sorted(unknown))}")
+    
+    source_id, record = load_task_record(task_id)
+    task_status = build_task_status(task_id, source_id, record, include_result=False)
+    # Queue positions move without a stored update, so they are part of the validator
+    etag = f'"{task_status.version}-{task_status.queue_position or 0}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if since is not None:
+        selected = selected & changed_status_fields(record, since)
+    if "final_result" in selected and task_status.status == "completed":
+        task_status.final_result = task_storage.get_result(source_id)
+    return JSONResponse(task_status.model_dump(mode="json", include=selected | {"task_id", "version"}), headers=headers)
+
+@app.get("/api/content/stream/{task_id}")
+async def stream_task_events(task_id: str, request: Request):
+    """Stream step boundaries and generated tokens as Server-Sent Events
+    
+    Events: `status` (snapshot on connect), `step_start`, `token`, `html`
+    (article blocks rendered as they complete), `step_end`, then `done` or `error`. Tokens sent before a client connects are not replayed;
+    the full text is available from the status endpoint once the task completes.
+    
+    When the task runs in another worker process only `step_end` and the final
+    event are sent, read from the shared task store.
+    """
+    source_id = resolve_task_id(task_id)
+    
+    # Subscribe before reading the snapshot so no event falls between the two
+    subscription = event_hub.subscribe(source_id)
+    try:
+        task_status = load_task_status(task_id, include_result=False)
+    except Exception:
+        subscription.close()
+        raise
+    
+    async def event_stream():
+        try:
+            yield format_sse("status", {
+                "task_id": task_id,
+                "status": task_status.status,
+                "current_step": task_status.current_step,
+                "completed_steps": list(task_status.step_timings or {}),
+            })
+            if task_status.status not in ("queued", "processing"):
+                yield format_sse("done" if task_status.status == "completed" else "error", {
+                    "task_id": task_id,
+                    "status": task_status.status,
+                    "error": task_status.error,
+                })
+                return
+            
+            if record_owner(source_id) != os.getpid():
+                async for chunk in follow_stored_task(task_id, source_id, task_status, request):
+                    yield chunk
+                return
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(*event)
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/content/ws/{task_id}")
+async def progress_socket(websocket: WebSocket, task_id: str):
+    """Push task progress as JSON messages carrying only the fields that changed
+    
+    The first message is `{"type": "snapshot", "fields": {...}}` with the full
+    status (without `final_result`); later messages are `{"type": "update",
+    "fields": {...}}`. The message that moves the task out of queued/processing
+    also carries `final_result`, then the server closes the socket. Unknown
+    tasks are closed with code 4404.
+    """
+    await websocket.accept()
+    try:
+        source_id = resolve_task_id(task_id)
+    except HTTPException:
+        await websocket.close(code=4404)
+        return
+    
+    subscription = event_hub.subscribe(source_id)
+    local = record_owner(source_id) == os.getpid()
+    refresh_seconds = WS_REFRESH_SECONDS if local else SSE_POLL_SECONDS
+    disconnected = asyncio.Event()
+    
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            disconnected.set()
+    
+    async def next_change():
+        """Return on a step event, the end of the event stream, or the refresh interval"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + refresh_seconds
+        while not disconnected.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await subscription.get(timeout=min(remaining, 1.0))
+            except asyncio.TimeoutError:
+                continue
+            # Tokens and rendered HTML do not change any status field, so they are skipped here
+            if event is None or event[0] not in ("token", "html"):
+                return
+    
+    watcher = asyncio.ensure_future(watch_disconnect())
+    sent: Dict[str, Any] = {}
+    try:
+        while not disconnected.is_set():
+            # version changes with every update, so it would ride along in each message
+            fields = load_task_status(task_id, include_result=False).model_dump(exclude={"final_result", "version"})
+            changed = {key: value for key, value in fields.items() if key not in sent or sent[key] != value}
+            finished = fields["status"] not in ("queued", "processing")
+            if finished and fields["status"] == "completed":
+                changed["final_result"] = task_storage.get_result(source_id)
+            if changed:
+                await websocket.send_json({"type": "update" if sent else "snapshot", "fields": changed})
+                sent.update(changed)
+            if finished:
+                await websocket.close()
+                break
+            await next_change()
+    except (WebSocketDisconnect, HTTPException):
+        pass
+    finally:
+        watcher.cancel()
+        subscription.close()
+
+async def follow_stored_task(task_id: str, source_id: str, snapshot: ProcessingStatus, request: Request):
+    """SSE chunks for a task owned by another worker, polled from the shared store"""
+    seen_steps = set(snapshot.step_timings or {})
+    while not await request.is_disconnected():
+        await asyncio.sleep(SSE_POLL_SECONDS)
+        record = task_storage.get(source_id)
+        if record is None:
+            yield format_sse("error", {"task_id": task_id, "status": "error", "error": "Task not found"})
+            return
+        for step, duration in (record.get("step_timings") or {}).items():
+            if step not in seen_steps:
+                seen_steps.add(step)
+                yield format_sse("step_end", {"step": step, "duration": duration})
+        status = record.get("status")
+        if status not in ("queued", "processing"):
+            yield format_sse("done" if status == "completed" else "error", {
+                "task_id": task_id,
+                "status": status,
+                "error": record.get("error"),
+            })
+            return
+
+# Download formats: result field, file extension, media type
+DOWNLOAD_FORMATS = {
+    "markdown": ("markdown_content", "md", "text/markdown; charset=utf-8"),
+    "html": ("html_content", "html", "text/html; charset=utf-8"),
+}
+
+def prepare_download(result: Dict[str, Any], format: str) -> Optional[PreparedDownload]:
+    """Encode one format of a final result for download (None if it has no content)"""
+    field, extension, media_type = DOWNLOAD_FORMATS[format]
+    content = result.get(field) or (result.get("content", "") if format == "markdown" else "")
+    if not content or content.strip() == "":
+        return None
+    return PreparedDownload(content, media_type, f"{result.get('article_url_slug', 'article')}.{extension}")
 
 @app.get("/api/content/download/{task_id}")
 async def download_content(task_id: str):
     """Download the completed content (legacy endpoint)"""
-    if task_id not in task_storage:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    task_status = task_storage[task_id]
+    task_status = load_task_status(task_id)
     if task_status.status != "completed" or not task_status.final_result:
         raise HTTPException(status_code=400, detail="Content not ready for download")
     
     return task_status.final_result
 
 @app.get("/api/content/download/{task_id}/{format}")
-async def download_content_format(task_id: str, format: str):
-    """Download content in specific format (markdown or html)"""
-    if task_id not in task_storage:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def download_content_format(task_id: str, format: str, request: Request):
+    """Download content in specific format (markdown or html)
     
-    task_status = task_storage[task_id]
-    if task_status.status != "completed" or not task_status.final_result:
-        raise HTTPException(status_code=400, detail="Content not ready for download")
+    Served from memory with a strong ETag; `If-None-Match` gets a 304 and
+    `Accept-Encoding` selects a precomputed gzip or brotli body.
+    """
+    format = format.lower()
+    if format not in DOWNLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'markdown' or 'html'")
     
-    result = task_status.final_result
+    return serve_prepared(cached_download(task_id, format, "download"), request, attachment=True)
+
+@app.get("/api/content/preview/{task_id}")
+async def preview_content(task_id: str, request: Request):
+    """HTML page for previewing the article
     
-    if format.lower() == "markdown":
-        content = result.get("markdown_content", result.get("content", ""))
-        filename = f"{result.get('article_url_slug', 'article')}.md"
-        media_type = "text/markdown"
-    elif format.lower() == "html":
-        content = result.get("html_content", "")
-        filename = f"{result.get('article_url_slug', 'article')}.html"
-        media_type = "text/html"
-    else:
-        raise HTTPException(status_code=400, detail="Invalid format. Use 'markdown' or 'html'")
+    While the task runs in this process the page holds the blocks rendered so
+    far. Once it completes, the cached HTML download is served inline, so
+    previews never re-render.
+    """
+    live = live_renderers.get(resolve_task_id(task_id))
+    if live is not None:
+        title, renderer = live
+        return HTMLResponse(render_html_page(title, renderer.preview()), headers={"Cache-Control": "no-store"})
+    return serve_prepared(cached_download(task_id, "html", "preview"), request, attachment=False)
+
+def cached_download(task_id: str, format: str, purpose: str) -> PreparedDownload:
+    """Prepared body for a completed task, encoded on first use if not cached"""
+    source_id = resolve_task_id(task_id)
+    prepared = download_cache.get((source_id, format))
+    if prepared is None:
+        task_status = load_task_status(task_id)
+        if task_status.status != "completed" or not task_status.final_result:
+            raise HTTPException(status_code=400, detail=f"Content not ready for {purpose}")
+        prepared = prepare_download(task_status.final_result, format)
+        if prepared is None:
+            raise HTTPException(status_code=404, detail=f"No {format} content available")
+        download_cache.put((source_id, format), prepared)
+    return prepared
+
+def serve_prepared(
+    prepared: PreparedDownload,
+    request: Request,
+    attachment: bool,
+    cache_control: str = "private, max-age=86400, immutable",
+) -> Response:
+    """Conditional, content-negotiated response for a prepared body"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), prepared.bodies)
+    headers = {
+        "ETag": prepared.etags[encoding],
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), prepared.etags[encoding]):
+        return Response(status_code=304, headers=headers)
     
-    if not content or content.strip() == "":
-        raise HTTPException(status_code=404, detail=f"No {format} content available")
-    
-    # Create a temporary file and return it
-    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix=f'.{format}', encoding='utf-8')
-    temp_file.write(content)
-    temp_file.close()
-    
-    return FileResponse(
-        path=temp_file.name,
-        filename=filename,
-        media_type=media_type,
-        background=None  # Don't delete immediately
-    )
+    body = prepared.bodies[encoding]
+    if attachment:
+        headers["Content-Disposition"] = f'attachment; filename="{prepared.filename}"'
+    headers["Content-Length"] = str(len(body))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(iter_chunks(body), media_type=prepared.media_type, headers=headers)
+
+@app.post("/api/batch")
+async def create_batch(request: Request, mode: str = "pipeline", concurrency: Optional[int] = None):
+    """Start a batch job from a JSONL body of UserInput records (optional custom_id per line)
+
+    Concurrency defaults to 4 records, or 1000 in openai_batch mode. Results are appended to the job's results file as records finish; an
+    interrupted job resumes from that file when the server restarts.
+    """
+    if mode not in BATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(BATCH_MODES)}")
+    if concurrency is not None and not 1 <= concurrency <= 1000:
+        raise HTTPException(status_code=400, detail="concurrency must be between 1 and 1000")
+    try:
+        manifest = batch_jobs.submit(await request.body(), mode=mode, concurrency=concurrency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    print(f"📦 Batch {manifest['batch_id']} started with {manifest['total']} records ({mode})")
+    return manifest
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    batch_status = batch_jobs.status(batch_id)
+    if batch_status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch_status
+
+@app.get("/api/batch/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    """JSONL results written so far, one line per finished record"""
+    path = batch_jobs.results_path(batch_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if not path.exists():
+        return Response(b"", media_type="application/x-ndjson")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"batch-{batch_id}.jsonl")
 
 if __name__ == "__main__":
     print("🤖 Starting AI Content Creation System...")
-    print(f"🔑 OpenAI API: {'✅ Connected' if client else '❌ Not available'}")
+    print(f"🔑 OpenAI API: {'✅ Connected' if llm_client.available else '❌ Not available'}")
     print("📖 API Documentation: http://localhost:8000/docs")
     print("🌐 Frontend will be at: http://localhost:8000")
     print("💡 Press Ctrl+C to stop")
     
+    # WEB_CONCURRENCY > 1 runs several worker processes sharing a SQLite task store
     uvicorn.run(
         "real_api_server:app",
         host="0.0.0.0",
         port=8000,
         reload=False,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Static Asset Cache
+Loads a frontend build into memory once, with gzip and brotli variants
+precomputed for compressible files, so serving `/` and `/static` never touches
+the disk or compresses on the request path
+"""
+
+import mimetypes
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from download_cache import PreparedDownload
+
+# Content-hashed build output (e.g. main.3f2a9c1b.js, main.3f2a9c1b.chunk.css) never changes
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Already-compressed formats (images, fonts, archives) are stored as-is
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".webmanifest"}
+
+
+def asset_media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    if media_type is None:
+        return "application/javascript" if path.endswith(".mjs") else "application/octet-stream"
+    return media_type
+
+
+def is_compressible(path: str, media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES) or Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+class StaticAsset(PreparedDownload):
+    """One build file, encoded once, with its Cache-Control policy"""
+
+    def __init__(self, content: bytes, path: str, brotli_quality: int = 11):
+        media_type = asset_media_type(path)
+        # Startup-only work, so spend the CPU on the smallest bodies
+        super().__init__(
+            content, media_type, os.path.basename(path),
+            compress=is_compressible(path, media_type), gzip_level=9, brotli_quality=brotli_quality,
+        )
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(self.filename) else REVALIDATE_CACHE_CONTROL
+
+
+class StaticAssets:
+    """In-memory copy of a build directory, keyed by its relative POSIX path
+
+    Lookups only ever hit the loaded dict, so request paths cannot escape the
+    build directory. Call `load()` again to pick up a new build.
+    """
+
+    def __init__(self, root: str, brotli_quality: int = 11):
+        self.root = root
+        self.brotli_quality = brotli_quality
+        self._assets: Dict[str, StaticAsset] = {}
+        self.stats: Dict[str, float] = {"files": 0, "bytes": 0, "compressed_bytes": 0, "load_seconds": 0.0}
+
+    def load(self) -> "StaticAssets":
+        started = time.perf_counter()
+        assets: Dict[str, StaticAsset] = {}
+        root = Path(self.root)
+        for file in sorted(root.rglob("*")):
+            if file.is_file():
+                relative = file.relative_to(root).as_posix()
+                assets[relative] = StaticAsset(file.read_bytes(), relative, self.brotli_quality)
+        self._assets = assets
+
+        identity = sum(len(asset.bodies["identity"]) for asset in assets.values())
+        smallest = sum(min(len(body) for body in asset.bodies.values()) for asset in assets.values())
+        self.stats = {
+            "files": len(assets),
+            "bytes": identity,
+            "compressed_bytes": smallest,
+            "load_seconds": round(time.perf_counter() - started, 3),
+        }
+        print(f"📦 Loaded {len(assets)} frontend assets ({identity // 1024} KiB, "
+              f"{smallest // 1024} KiB compressed) in {self.stats['load_seconds']}s")
+        return self
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self._assets.get(path)
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+
+def create_static_assets(root: Optional[str] = None) -> Optional[StaticAssets]:
+    """Load the frontend build (FRONTEND_BUILD_DIR, default frontend/build), None if it is missing
+
+    FRONTEND_BROTLI_QUALITY (default 11) trades startup time for smaller bodies.
+    """
+    root = root or os.getenv("FRONTEND_BUILD_DIR", "frontend/build")
+    if not os.path.isdir(root):
+        return None
+    return StaticAssets(root, brotli_quality=int(os.getenv("FRONTEND_BROTLI_QUALITY", "11"))).load()
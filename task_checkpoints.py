@@ -0,0 +1,174 @@
+"""
+Task Checkpoints
+Durable per-step checkpoints for content tasks in SQLite, so a task that was
+running when its worker process died resumes from its first incomplete step
+instead of paying for the completed LLM calls again
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class CheckpointedTask(NamedTuple):
+    task_id: str
+    input: Dict[str, Any]
+    submitted_at: float
+    resumes: int  # times the task was taken over from a worker that stopped heartbeating
+
+
+class TaskCheckpoints:
+    """Inputs of unfinished tasks and the outputs of their completed steps
+
+    Each process has an `owner` id and refreshes `heartbeat()` for the tasks
+    it runs. A task whose owner has not sent a heartbeat for `lease_seconds`
+    (its process crashed or was killed) can be taken over with
+    `claim_orphans()`. Step outputs are committed with `synchronous=FULL`,
+    so a saved step survives power loss, not just a process crash.
+    """
+
+    def __init__(self, path: str = "output/checkpoints.db", lease_seconds: float = 15.0,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"started": 0, "steps_saved": 0, "resumed": 0, "finished": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoint_tasks (
+                task_id TEXT PRIMARY KEY,
+                input TEXT NOT NULL,
+                submitted_at REAL NOT NULL,
+                owner TEXT,
+                heartbeat REAL NOT NULL,
+                resumes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS checkpoint_steps (
+                task_id TEXT NOT NULL,
+                step TEXT NOT NULL,
+                output TEXT NOT NULL,
+                PRIMARY KEY (task_id, step)
+            );
+        """)
+
+    def start(self, task_id: str, input: Dict[str, Any], submitted_at: float):
+        """Record a new task owned by this process"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_tasks (task_id, input, submitted_at, owner, heartbeat) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task_id, json.dumps(input), submitted_at, self.owner, self._clock()),
+            )
+        self.counters["started"] += 1
+
+    def save_step(self, task_id: str, step: str, output: Any):
+        """Durably store a completed step's output (also refreshes the task's heartbeat)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoint_steps (task_id, step, output) VALUES (?, ?, ?)",
+                    (task_id, step, json.dumps(output)),
+                )
+                self._conn.execute(
+                    "UPDATE checkpoint_tasks SET heartbeat = ? WHERE task_id = ?", (self._clock(), task_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.counters["steps_saved"] += 1
+
+    def steps(self, task_id: str) -> Dict[str, Any]:
+        """Outputs of the task's completed steps, by step name"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT step, output FROM checkpoint_steps WHERE task_id = ?", (task_id,)
+            ).fetchall()
+        return {step: json.loads(output) for step, output in rows}
+
+    def finish(self, task_id: str):
+        """Forget a task that completed, failed or was cancelled"""
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoint_steps WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM checkpoint_tasks WHERE task_id = ?", (task_id,))
+        self.counters["finished"] += 1
+
+    def release(self, task_id: Optional[str] = None):
+        """Give up one task, or all of this process's tasks (shutdown), so they are claimable at once"""
+        with self._lock:
+            if task_id is None:
+                self._conn.execute("UPDATE checkpoint_tasks SET owner = NULL WHERE owner = ?", (self.owner,))
+            else:
+                self._conn.execute(
+                    "UPDATE checkpoint_tasks SET owner = NULL WHERE task_id = ? AND owner = ?", (task_id, self.owner)
+                )
+
+    def heartbeat(self):
+        """Keep this process's tasks from being claimed by others"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE checkpoint_tasks SET heartbeat = ? WHERE owner = ?", (self._clock(), self.owner)
+            )
+
+    def claim_orphans(self, limit: int = 100) -> List[CheckpointedTask]:
+        """Take over unfinished tasks whose owner released them or stopped sending heartbeats
+
+        Only the second case counts as a resume: tasks released by a clean
+        shutdown can be restarted any number of times.
+        """
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT task_id, input, submitted_at, resumes + (owner IS NOT NULL) FROM checkpoint_tasks "
+                    "WHERE (owner IS NULL OR heartbeat < ?) AND owner IS NOT ? ORDER BY submitted_at LIMIT ?",
+                    (now - self.lease_seconds, self.owner, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE checkpoint_tasks SET owner = ?, heartbeat = ?, resumes = ? WHERE task_id = ?",
+                    [(self.owner, now, resumes, task_id) for task_id, _, _, resumes in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.counters["resumed"] += len(rows)
+        return [
+            CheckpointedTask(task_id, json.loads(input), submitted_at, resumes)
+            for task_id, input, submitted_at, resumes in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            unfinished = self._conn.execute("SELECT COUNT(*) FROM checkpoint_tasks").fetchone()[0]
+        return {**self.counters, "unfinished": unfinished}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_task_checkpoints() -> Optional[TaskCheckpoints]:
+    """Build the checkpoint store from CHECKPOINT_* environment variables (None when disabled)
+
+    CHECKPOINT_ENABLED (default 1), CHECKPOINT_PATH (default
+    output/checkpoints.db) and CHECKPOINT_LEASE_SECONDS (default 15).
+    """
+    if os.getenv("CHECKPOINT_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    return TaskCheckpoints(
+        os.getenv("CHECKPOINT_PATH", "output/checkpoints.db"),
+        lease_seconds=float(os.getenv("CHECKPOINT_LEASE_SECONDS", "15")),
+    )
@@ -0,0 +1,89 @@
+"""
+Task Event Hub
+In-process fan-out of per-task events (step boundaries, streamed tokens) to any
+number of subscribers, each with its own bounded queue
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set, Tuple
+
+Event = Tuple[str, Dict[str, Any]]
+
+# Sent to a subscriber whose queue overflowed; it should reconnect and resync
+OVERFLOW_EVENT = "overflow"
+
+
+class Subscription:
+    """One subscriber's view of a task's event stream"""
+
+    def __init__(self, hub: "TaskEventHub", task_id: str, max_queue_size: int):
+        self.hub = hub
+        self.task_id = task_id
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=max_queue_size)
+        self.closed = False
+
+    def deliver(self, event: Optional[Event]):
+        """Queue an event without blocking the publisher"""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow reader must not make the publisher buffer without bound:
+            # replace its backlog with an overflow notice and end the stream.
+            self._drain()
+            self.queue.put_nowait((OVERFLOW_EVENT, {"task_id": self.task_id}))
+            self.queue.put_nowait(None)
+            self.close()
+
+    def _drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None once the stream has ended; raises TimeoutError on timeout"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.closed = True
+        self.hub._unsubscribe(self)
+
+
+class TaskEventHub:
+    """Publish events for a task to all of its current subscribers"""
+
+    def __init__(self, max_queue_size: int = 1024):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, task_id: str) -> Subscription:
+        subscription = Subscription(self, task_id, self.max_queue_size)
+        self._subscribers.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.task_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.task_id]
+
+    def subscriber_count(self, task_id: str) -> int:
+        return len(self._subscribers.get(task_id, ()))
+
+    def publish(self, task_id: str, event: str, data: Dict[str, Any]):
+        """Send an event to every subscriber of the task (no-op without subscribers)"""
+        for subscription in list(self._subscribers.get(task_id, ())):
+            subscription.deliver((event, data))
+
+    def close(self, task_id: str):
+        """End the stream for every subscriber of the task"""
+        for subscription in list(self._subscribers.get(task_id, ())):
+            subscription.deliver(None)
+            subscription.close()
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
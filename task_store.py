@@ -0,0 +1,338 @@
+"""
+Task Store
+Pluggable storage for task status records, with TTL/LRU eviction and lazily
+loaded results so finished tasks do not pin their full output in memory
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tasks in these states are never evicted
+ACTIVE_STATUSES = {"queued", "processing", "running"}
+
+
+def field_version(record: Dict[str, Any], field: str) -> int:
+    """Version at which `field` last changed (fields never updated date from creation)"""
+    return record.get("field_versions", {}).get(field, 1)
+
+
+class TaskStore(ABC):
+    """Status records are small and updated often; results are large and written once
+
+    Every record carries a `version` that starts at 1 and grows with each
+    `update`, and `field_versions` with the version at which each updated
+    field was last set, so readers can ask for what changed since a version.
+    """
+
+    @abstractmethod
+    def create(self, task_id: str, record: Dict[str, Any]):
+        """Insert a new status record"""
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the status record, or None if unknown or expired"""
+
+    @abstractmethod
+    def update(self, task_id: str, **fields: Any):
+        """Set fields on an existing record (ignored if the task is gone)"""
+
+    @abstractmethod
+    def set_result(self, task_id: str, result: Dict[str, Any]):
+        """Store the final result of a task"""
+
+    @abstractmethod
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Load the final result of a task"""
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        """Remove a task and its result"""
+
+    @abstractmethod
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """All (task_id, record) pairs"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def close(self):
+        """Release any resources held by the store"""
+
+
+class InMemoryTaskStore(TaskStore):
+    """LRU + TTL store held in process memory
+
+    Finished tasks expire `ttl_seconds` after they were last read or updated,
+    and the least recently used finished tasks are evicted beyond `max_tasks`.
+    With a `result_dir`, results are written to one JSON file per task and read
+    back only when requested.
+    """
+
+    def __init__(self, max_tasks: int = 10000, ttl_seconds: float = 3600.0, result_dir: Optional[str] = None):
+        self.max_tasks = max_tasks
+        self.ttl_seconds = ttl_seconds
+        self.result_dir = Path(result_dir) if result_dir else None
+        if self.result_dir:
+            self.result_dir.mkdir(parents=True, exist_ok=True)
+            self._purge_stale_results()
+        # Ordered from least to most recently used, so eviction only scans the front
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._touched_at: Dict[str, float] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+    def _purge_stale_results(self):
+        """Remove result files that earlier processes left behind, once they are older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        for path in self.result_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass  # removed by another process starting at the same time
+
+    def _result_path(self, task_id: str) -> Path:
+        return self.result_dir / f"{task_id}.json"
+
+    def _touch(self, task_id: str):
+        self._touched_at[task_id] = time.monotonic()
+        self._records.move_to_end(task_id)
+
+    def _expired(self, task_id: str, now: float) -> bool:
+        return (
+            self._records[task_id].get("status") not in ACTIVE_STATUSES
+            and now - self._touched_at[task_id] > self.ttl_seconds
+        )
+
+    def _evict(self):
+        """Drop expired tasks and the least recently used finished ones over the cap"""
+        now = time.monotonic()
+        excess = len(self._records) - self.max_tasks
+        victims = []
+        for task_id, record in self._records.items():
+            if record.get("status") in ACTIVE_STATUSES:
+                continue
+            if len(victims) < excess or self._expired(task_id, now):
+                victims.append(task_id)
+            else:
+                break
+        for task_id in victims:
+            self.delete(task_id)
+
+    def create(self, task_id: str, record: Dict[str, Any]):
+        self._records[task_id] = {**record, "version": 1, "field_versions": {}}
+        self._touch(task_id)
+        self._evict()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if task_id not in self._records:
+            return None
+        if self._expired(task_id, time.monotonic()):
+            self.delete(task_id)
+            return None
+        self._touch(task_id)
+        return dict(self._records[task_id])
+
+    def update(self, task_id: str, **fields: Any):
+        record = self._records.get(task_id)
+        if record is None:
+            return
+        version = record.get("version", 1) + 1
+        record.update(fields)
+        record["version"] = version
+        # A new dict, so copies handed out by get() keep their own versions
+        record["field_versions"] = {**record.get("field_versions", {}), **dict.fromkeys(fields, version)}
+        self._touch(task_id)
+
+    def set_result(self, task_id: str, result: Dict[str, Any]):
+        if task_id not in self._records:
+            return
+        if self.result_dir:
+            self._result_path(task_id).write_text(json.dumps(result), encoding="utf-8")
+        else:
+            self._results[task_id] = result
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if task_id not in self._records:
+            return None
+        if self.result_dir:
+            path = self._result_path(task_id)
+            if path.exists():
+                return json.loads(path.read_text(encoding="utf-8"))
+            return None
+        return self._results.get(task_id)
+
+    def delete(self, task_id: str):
+        self._records.pop(task_id, None)
+        self._touched_at.pop(task_id, None)
+        self._results.pop(task_id, None)
+        if self.result_dir:
+            self._result_path(task_id).unlink(missing_ok=True)
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        self._evict()
+        return [(task_id, dict(record)) for task_id, record in self._records.items()]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite store in WAL mode
+
+    Status records and results live in separate tables, so progress updates and
+    status reads never touch the large result blobs. Finished tasks older than
+    `ttl_seconds` are purged every `purge_every` writes.
+    """
+
+    def __init__(self, path: str = "tasks.db", ttl_seconds: float = 86400.0, purge_every: int = 500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at);
+            CREATE TABLE IF NOT EXISTS task_results (
+                task_id TEXT PRIMARY KEY,
+                result TEXT NOT NULL
+            );
+        """)
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge_expired()
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        placeholders = ",".join("?" for _ in ACTIVE_STATUSES)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                f"DELETE FROM task_results WHERE task_id IN (SELECT task_id FROM tasks "
+                f"WHERE updated_at < ? AND status NOT IN ({placeholders}))",
+                (cutoff, *ACTIVE_STATUSES),
+            )
+            self._conn.execute(
+                f"DELETE FROM tasks WHERE updated_at < ? AND status NOT IN ({placeholders})",
+                (cutoff, *ACTIVE_STATUSES),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired()
+
+    def create(self, task_id: str, record: Dict[str, Any]):
+        self._write(
+            "INSERT OR REPLACE INTO tasks (task_id, status, record, updated_at) VALUES (?, ?, ?, ?)",
+            (task_id, record.get("status"), json.dumps({**record, "version": 1, "field_versions": {}}), time.time()),
+        )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, status, updated_at FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        record, status, updated_at = row
+        if status not in ACTIVE_STATUSES and time.time() - updated_at > self.ttl_seconds:
+            return None
+        return json.loads(record)
+
+    def update(self, task_id: str, **fields: Any):
+        if not fields:
+            return
+        # One UPDATE that patches only the given fields inside the stored JSON:
+        # no read round trip, and it is atomic against other worker processes
+        version = "coalesce(json_extract(record, '$.version'), 1) + 1"
+        paths = ", ".join(f"?, json(?), ?, {version}" for _ in fields)
+        params: List[Any] = []
+        for key, value in fields.items():
+            params.extend([f'$."{key}"', json.dumps(value), f'$.field_versions."{key}"'])
+        status_sql = "status = ?, " if "status" in fields else ""
+        status_params = [fields["status"]] if "status" in fields else []
+        self._write(
+            f"UPDATE tasks SET record = json_set(record, {paths}, '$.version', {version}), "
+            f"{status_sql}updated_at = ? WHERE task_id = ?",
+            (*params, *status_params, time.time(), task_id),
+        )
+
+    def set_result(self, task_id: str, result: Dict[str, Any]):
+        self._write(
+            "INSERT OR REPLACE INTO task_results (task_id, result) VALUES (?, ?)",
+            (task_id, json.dumps(result)),
+        )
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM task_results WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM task_results WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT task_id, record FROM tasks ORDER BY updated_at").fetchall()
+        return [(task_id, json.loads(record)) for task_id, record in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_task_store() -> TaskStore:
+    """Build the store selected by the TASK_STORE environment variable
+
+    TASK_STORE=memory or sqlite; TASK_STORE_PATH, TASK_TTL_SECONDS,
+    TASK_MAX_ENTRIES and TASK_RESULT_DIR tune it. The default is memory, or
+    sqlite when WEB_CONCURRENCY asks uvicorn for several worker processes
+    (an in-memory store is private to each process).
+    """
+    default = "sqlite" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "memory"
+    kind = os.getenv("TASK_STORE", default).lower()
+    ttl_seconds = float(os.getenv("TASK_TTL_SECONDS", "3600"))
+    if kind == "sqlite":
+        return SQLiteTaskStore(os.getenv("TASK_STORE_PATH", "output/tasks.db"), ttl_seconds=ttl_seconds)
+    if kind == "memory":
+        return InMemoryTaskStore(
+            max_tasks=int(os.getenv("TASK_MAX_ENTRIES", "10000")),
+            ttl_seconds=ttl_seconds,
+            result_dir=os.getenv("TASK_RESULT_DIR", "output/task_results"),
+        )
+    raise ValueError(f"Unknown TASK_STORE: {kind}")
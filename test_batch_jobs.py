@@ -0,0 +1,350 @@
+"""
+Unit Tests for Batch Jobs
+Tests batch_jobs.py (bounded concurrency, checkpoint/resume, OpenAI Batch submission)
+and the /api/batch endpoints in real_api_server.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import openai
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch_jobs import (
+    BatchJobManager, BatchRequestError, OpenAIBatchCaller, load_checkpoint, read_records, run_batch,
+)
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+async def echo_runner(record):
+    await asyncio.sleep(0)
+    return {"title": record["topic"].upper()}
+
+
+def fake_openai(config: FakeServerConfig) -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_fake_app(config))),
+    )
+
+
+class TestRunBatch:
+    """Test result streaming, bounded concurrency and resuming"""
+
+    @pytest.mark.asyncio
+    async def test_writes_one_result_per_record(self, tmp_path):
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        source.write_text('{"topic": "cats", "custom_id": "a"}\n\n{"topic": "dogs"}\nnot json\n[1, 2]\n')
+
+        counters = await run_batch(str(source), str(output), echo_runner, concurrency=2)
+
+        results = {row["custom_id"]: row for row in read_jsonl(output)}
+        assert counters == {"completed": 2, "failed": 2, "skipped": 0}
+        assert results["a"]["result"] == {"title": "CATS"}
+        assert results["line-3"]["status"] == "completed"
+        assert results["line-4"]["status"] == "error"
+        assert "Invalid JSON" in results["line-4"]["error"]
+        assert results["line-5"]["status"] == "error"
+
+    @pytest.mark.asyncio
+    async def test_failed_record_does_not_stop_the_batch(self, tmp_path):
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_jsonl(source, [{"topic": "ok"}, {"topic": "boom"}, {"topic": "fine"}])
+
+        async def runner(record):
+            if record["topic"] == "boom":
+                raise RuntimeError("model exploded")
+            return record
+
+        counters = await run_batch(str(source), str(output), runner)
+        assert counters["completed"] == 2
+        errors = [row for row in read_jsonl(output) if row["status"] == "error"]
+        assert errors[0]["error"] == "RuntimeError: model exploded"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, tmp_path):
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_jsonl(source, [{"topic": f"t{i}"} for i in range(12)])
+        running, peak = 0, 0
+
+        async def runner(record):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return record
+
+        await run_batch(str(source), str(output), runner, concurrency=3)
+        assert peak == 3
+        assert len(read_jsonl(output)) == 12
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_checkpoint_after_crash(self, tmp_path):
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_jsonl(source, [{"topic": t, "custom_id": t} for t in ("a", "b", "c", "d")])
+        # A crash left two finished records and half of a third line
+        output.write_text(
+            json.dumps({"custom_id": "a", "status": "completed", "result": {}}) + "\n"
+            + json.dumps({"custom_id": "c", "status": "error", "error": "x"}) + "\n"
+            + '{"custom_id": "b", "stat'
+        )
+        assert load_checkpoint(str(output)) == {"a", "c"}
+        assert output.read_text().endswith("}\n")
+
+        seen = []
+
+        async def runner(record):
+            seen.append(record["topic"])
+            return record
+
+        counters = await run_batch(str(source), str(output), runner)
+        assert sorted(seen) == ["b", "d"]
+        assert counters["skipped"] == 2
+        assert sorted(row["custom_id"] for row in read_jsonl(output)) == ["a", "b", "c", "d"]
+
+    def test_read_records_takes_custom_id_out_of_the_input(self, tmp_path):
+        source = tmp_path / "in.jsonl"
+        write_jsonl(source, [{"topic": "x", "custom_id": 7}])
+        record = next(read_records(str(source)))
+        assert record.custom_id == "7"
+        assert record.data == {"topic": "x"}
+
+
+class TestOpenAIBatchCaller:
+    """Test submission in the OpenAI Batch file format against the fake server"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        client = fake_openai(FakeServerConfig(completion_text="batched answer", batch_latency_ms=5))
+        caller = OpenAIBatchCaller(client, collect_seconds=0.02, poll_seconds=0.01)
+        body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+
+        answers = await asyncio.gather(*(caller.complete(body) for _ in range(5)))
+
+        assert answers == ["batched answer"] * 5
+        assert caller.counters["batches"] == 1
+        assert caller.counters["requests"] == 5
+        assert caller.counters["completion_tokens"] > 0
+        await caller.close()
+
+    @pytest.mark.asyncio
+    async def test_batches_are_split_at_the_request_limit(self):
+        client = fake_openai(FakeServerConfig(completion_text="batched answer", batch_latency_ms=5))
+        caller = OpenAIBatchCaller(client, collect_seconds=0.02, poll_seconds=0.01)
+        bodies = [{"model": "gpt-4o-mini", "messages": [{"role": "user", "content": f"q{i}"}]} for i in range(5)]
+        with patch("batch_jobs.MAX_BATCH_REQUESTS", 2):
+            answers = await asyncio.gather(*(caller.complete(body) for body in bodies))
+
+        assert answers == ["batched answer"] * 5
+        assert caller.counters["batches"] == 3
+        assert caller.counters["requests"] == 5
+        await caller.close()
+
+    @pytest.mark.asyncio
+    async def test_resumed_caller_polls_submitted_batches(self, tmp_path):
+        client = fake_openai(FakeServerConfig(completion_text="batched answer", batch_latency_ms=200))
+        state = tmp_path / "openai_batches.json"
+        bodies = [{"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "same"}]}] * 2 + \
+            [{"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "other"}]}]
+
+        first = OpenAIBatchCaller(client, collect_seconds=0.01, poll_seconds=0.01, state_path=str(state))
+        waiting = [asyncio.ensure_future(first.complete(body)) for body in bodies]
+        while not state.exists():
+            await asyncio.sleep(0.01)
+        await first.close()  # the job stops before the batch completes
+        for task in waiting:
+            task.cancel()
+        [saved] = json.loads(state.read_text()).values()
+        assert len(saved) == 3
+
+        resumed = OpenAIBatchCaller(client, collect_seconds=0.01, poll_seconds=0.01, state_path=str(state))
+        answers = await asyncio.gather(*(resumed.complete(body) for body in bodies))
+        assert answers == ["batched answer"] * 3
+        assert resumed.counters["batches"] == 0
+        assert resumed.counters["reused_requests"] == 3
+        await resumed.close()
+
+    @pytest.mark.asyncio
+    async def test_unreadable_saved_batch_is_submitted_again(self, tmp_path):
+        client = fake_openai(FakeServerConfig(completion_text="batched answer", batch_latency_ms=5))
+        body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+        state = tmp_path / "openai_batches.json"
+        probe = OpenAIBatchCaller(client, collect_seconds=0.01, poll_seconds=0.01, state_path=str(state))
+        await probe.complete(body)
+        [custom_ids] = json.loads(state.read_text()).values()
+        state.write_text(json.dumps({"batch_gone": custom_ids}))
+
+        caller = OpenAIBatchCaller(client, collect_seconds=0.01, poll_seconds=0.01, state_path=str(state))
+        assert await caller.complete(body) == "batched answer"
+        assert caller.counters["batches"] == 1
+        assert caller.counters["reused_requests"] == 0
+        await caller.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_lines_raise(self):
+        client = fake_openai(FakeServerConfig(server_error_rate=1.0, batch_latency_ms=5))
+        caller = OpenAIBatchCaller(client, collect_seconds=0.01, poll_seconds=0.01)
+        with pytest.raises(BatchRequestError):
+            await caller.complete({"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]})
+        assert caller.counters["failed_requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_pipeline_stages_become_batches(self, tmp_path):
+        import real_api_server
+
+        source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_jsonl(source, [{"topic": f"Topic {i}"} for i in range(3)] + [{"audience": "no topic"}])
+        caller = OpenAIBatchCaller(
+            fake_openai(FakeServerConfig(completion_text="# Heading\n\nBody text.", batch_latency_ms=5)),
+            collect_seconds=0.05,
+            poll_seconds=0.01,
+        )
+        with patch.object(real_api_server, "response_cache", None):
+            counters = await run_batch(
+                str(source), str(output), real_api_server.batch_record_runner(caller), concurrency=10
+            )
+
+        assert counters == {"completed": 3, "failed": 1, "skipped": 0}
+        # research, structure, article, then image concepts and SEO together
+        assert caller.counters["batches"] == 4
+        assert caller.counters["requests"] == 15
+        row = next(row for row in read_jsonl(output) if row["status"] == "completed")
+        assert row["result"]["markdown_content"] == "# Heading\n\nBody text."
+        assert "<h1" in row["result"]["html_content"]
+
+
+class TestBatchJobManager:
+    """Test API-submitted jobs, locking and resume"""
+
+    @pytest.mark.asyncio
+    async def test_resume_runs_unfinished_jobs_once(self, tmp_path):
+        calls = []
+
+        async def runner(record):
+            calls.append(record["topic"])
+            return record
+
+        first = BatchJobManager(str(tmp_path), lambda mode, directory: runner)
+        gate = asyncio.Event()
+
+        async def blocked(record):
+            await gate.wait()
+            return record
+
+        blocking = BatchJobManager(str(tmp_path), lambda mode, directory: blocked)
+        manifest = blocking.submit(b'{"topic": "a"}\n{"topic": "b"}\n', concurrency=1)
+        await asyncio.sleep(0.01)
+        # The lock is held by the running job, so another manager cannot take it over
+        assert first.resume() == []
+
+        # Simulate a crash: the job stops mid-way and its lock is released
+        await blocking.close()
+        assert blocking.status(manifest["batch_id"])["status"] == "running"
+        assert first.resume() == [manifest["batch_id"]]
+        await asyncio.gather(*first._tasks.values())
+
+        assert sorted(calls) == ["a", "b"]
+        status = first.status(manifest["batch_id"])
+        assert status["status"] == "completed"
+        assert status["completed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_runner_is_closed_when_the_job_ends(self, tmp_path):
+        async def runner(record):
+            return record
+
+        runner.close = AsyncMock()
+        manager = BatchJobManager(str(tmp_path), lambda mode, directory: runner)
+        manifest = manager.submit(b'{"topic": "a"}\n', mode="openai_batch")
+        assert manifest["concurrency"] == 1000
+        await asyncio.gather(*manager._tasks.values())
+        runner.close.assert_awaited_once()
+
+        gate = asyncio.Event()
+
+        async def blocked(record):
+            await gate.wait()
+
+        blocked.close = AsyncMock()
+        stopping = BatchJobManager(str(tmp_path), lambda mode, directory: blocked)
+        assert stopping.submit(b'{"topic": "b"}\n')["concurrency"] == 4
+        await asyncio.sleep(0.01)
+        await stopping.close()  # server shutdown
+        blocked.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_record_runner_closes_its_caller(self):
+        import real_api_server
+
+        caller = OpenAIBatchCaller(fake_openai(FakeServerConfig()))
+        with patch.object(caller, "close", AsyncMock()) as close:
+            await real_api_server.batch_record_runner(caller).close()
+        close.assert_awaited_once()
+        await real_api_server.batch_record_runner().close()
+
+    def test_rejects_malformed_input(self, tmp_path):
+        manager = BatchJobManager(str(tmp_path), lambda mode, directory: echo_runner)
+        with pytest.raises(ValueError, match="Line 2"):
+            manager.submit(b'{"topic": "a"}\nnope\n')
+        with pytest.raises(ValueError, match="No records"):
+            manager.submit(b"\n\n")
+        with pytest.raises(ValueError, match="mode"):
+            manager.submit(b'{"topic": "a"}\n', mode="fast")
+
+
+class TestBatchEndpoints:
+    """Test /api/batch end to end against the fake OpenAI server"""
+
+    @pytest.mark.asyncio
+    async def test_batch_endpoint_streams_results(self, tmp_path):
+        import real_api_server
+
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=create_fake_app(FakeServerConfig(latency_ms=1))),
+        )
+        manager = BatchJobManager(str(tmp_path), real_api_server.make_batch_runner)
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "batch_jobs", manager):
+            transport = httpx.ASGITransport(app=real_api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                body = '{"topic": "Solar power", "custom_id": "solar"}\n{"topic": "Wind power"}\n'
+                response = await client.post("/api/batch?concurrency=2", content=body)
+                assert response.status_code == 200
+                batch_id = response.json()["batch_id"]
+                assert response.json()["total"] == 2
+
+                await asyncio.gather(*manager._tasks.values())
+                status = (await client.get(f"/api/batch/{batch_id}")).json()
+                assert status["status"] == "completed"
+                assert status["completed"] == 2
+
+                results = await client.get(f"/api/batch/{batch_id}/results")
+                rows = [json.loads(line) for line in results.text.splitlines()]
+                assert {row["custom_id"] for row in rows} == {"solar", "line-2"}
+                assert rows[0]["result"]["metadata"]["context_packing"]["calls"] == 4
+
+                assert (await client.post("/api/batch", content="oops\n")).status_code == 400
+                assert (await client.post("/api/batch?mode=x", content=body)).status_code == 400
+                assert (await client.get("/api/batch/missing")).status_code == 404
+            await shared.close()
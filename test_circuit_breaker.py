@@ -0,0 +1,222 @@
+"""
+Unit Tests for Circuit Breakers and the Retry Budget
+Tests circuit_breaker.py and how call_openai_gpt in real_api_server.py uses them
+"""
+
+import os
+import random
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, RetryBudget
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def breaker(clock: FakeClock, **settings) -> CircuitBreaker:
+    defaults = dict(minimum_calls=4, window_seconds=60, open_seconds=30, slow_call_seconds=5, clock=clock)
+    return CircuitBreaker("gpt-test", **{**defaults, **settings})
+
+
+class TestCircuitBreaker:
+    """Test the closed -> open -> half-open cycle"""
+
+    def test_opens_on_failure_rate_and_fails_fast(self):
+        clock = FakeClock()
+        cb = breaker(clock)
+        for failed in (False, True, False):
+            cb.acquire().failure(1) if failed else cb.acquire().success(1)
+        assert cb.state == CLOSED  # below minimum_calls
+        cb.acquire().failure(1)
+        assert cb.state == OPEN
+
+        clock.now += 10
+        with pytest.raises(CircuitOpenError) as error:
+            cb.acquire()
+        assert error.value.retry_after == pytest.approx(20)
+        assert cb.stats()["rejected"] == 1
+
+    def test_opens_on_slow_calls(self):
+        clock = FakeClock()
+        cb = breaker(clock, slow_call_rate_threshold=0.75)
+        for duration in (6, 7, 1, 8):
+            cb.acquire().success(duration)
+        assert cb.state == OPEN
+        assert cb.stats()["slow_calls"] == 3
+
+    def test_old_outcomes_leave_the_window(self):
+        clock = FakeClock()
+        cb = breaker(clock)
+        for _ in range(3):
+            cb.acquire().failure(1)
+        clock.now += 61
+        cb.acquire().failure(1)
+        assert cb.state == CLOSED
+        assert cb.stats()["window_calls"] == 1
+
+    def test_half_open_probe_closes_or_reopens(self):
+        clock = FakeClock()
+        cb = breaker(clock, half_open_probes=1)
+        for _ in range(4):
+            cb.acquire().failure(1)
+
+        clock.now += 30
+        probe = cb.acquire()
+        assert cb.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            cb.acquire()  # only one probe at a time
+        probe.failure(1)
+        assert cb.state == OPEN
+        assert cb.stats()["opened"] == 2
+
+        clock.now += 30
+        cb.acquire().success(1)
+        assert cb.state == CLOSED
+        cb.acquire().success(1)
+
+    def test_released_probe_frees_its_slot(self):
+        clock = FakeClock()
+        cb = breaker(clock)
+        for _ in range(4):
+            cb.acquire().failure(1)
+        clock.now += 30
+        cb.acquire().release()  # e.g. the task was cancelled
+        cb.acquire().success(1)
+        assert cb.state == CLOSED
+
+    def test_registry_keeps_one_breaker_per_model(self):
+        registry = CircuitBreakerRegistry(minimum_calls=1)
+        registry.get("a").acquire().failure(1)
+        assert registry.get("a") is registry.get("a")
+        assert registry.stats()["a"]["state"] == OPEN
+        assert registry.get("b").state == CLOSED
+
+
+class TestRetryBudget:
+    """Test the windowed retry allowance and jittered backoff"""
+
+    def test_retries_are_capped_by_recent_requests(self):
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, window_seconds=10, max_retries=5, clock=clock)
+        for _ in range(4):
+            budget.record_request()
+        assert [budget.can_retry(1) for _ in range(3)] == [True, True, False]
+        assert budget.stats()["denied"] == 1
+
+        clock.now += 11  # requests and retries leave the window
+        assert budget.can_retry(1) is False
+        budget.record_request()
+        budget.record_request()
+        assert budget.can_retry(1) is True
+
+    def test_max_retries_per_call(self):
+        budget = RetryBudget(min_retries_per_second=100, max_retries=2)
+        assert budget.can_retry(2) is True
+        assert budget.can_retry(3) is False
+
+    def test_backoff_is_jittered_and_capped(self):
+        budget = RetryBudget(base_delay=1, max_delay=4, rng=random.Random(7))
+        delays = [budget.backoff(attempt) for attempt in (1, 2, 3, 4, 5) for _ in range(50)]
+        assert all(0 <= delay <= 4 for delay in delays)
+        assert max(delays[:50]) <= 1
+        assert len(set(delays)) == len(delays)
+
+
+def fake_llm_client(fake) -> SharedLLMClient:
+    return SharedLLMClient(
+        LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+        transport=httpx.ASGITransport(app=fake),
+    )
+
+
+class TestCallOpenAIGPT:
+    """Test fail-fast fallbacks, cached content and budgeted retries in real_api_server"""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_the_api(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(server_error_rate=1.0))
+        registry = CircuitBreakerRegistry(minimum_calls=2, open_seconds=60)
+        no_retries = RetryBudget(ratio=0, min_retries_per_second=0)
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", registry), \
+                patch.object(real_api_server, "retry_budget", no_retries):
+            for _ in range(4):
+                content = await real_api_server.call_openai_gpt("Research the topic", step="research")
+                assert "Research Summary" in content  # fallback content
+
+        assert fake.state.request_count == 2
+        stats = registry.stats()[real_api_server.DEFAULT_MODEL]
+        assert stats["state"] == OPEN
+        assert stats["rejected"] == 2
+        assert 'content_llm_fallbacks_total{error_type="circuit_open"}' in real_api_server.metrics_registry.render()
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_serves_cached_content(self, tmp_path):
+        import real_api_server
+        from llm_cache import ResponseCache
+
+        cache = ResponseCache(str(tmp_path / "cache.db"))
+        registry = CircuitBreakerRegistry(minimum_calls=1, open_seconds=60)
+        fake = create_fake_app(FakeServerConfig(completion_text="Fresh answer"))
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", cache), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", registry):
+            assert await real_api_server.call_openai_gpt("Cached prompt") == "Fresh answer"
+            registry.get(real_api_server.DEFAULT_MODEL).acquire().failure(1)
+
+            tokens = []
+            content = await real_api_server.call_openai_gpt("Cached prompt", on_token=tokens.append, use_cache=False)
+        cache.close()
+
+        assert content == "Fresh answer"
+        assert tokens == ["Fresh answer"]
+        assert fake.state.request_count == 1
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried_within_budget(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(server_error_rate=1.0))
+        budget = RetryBudget(ratio=0, min_retries_per_second=0.3, window_seconds=10, max_retries=2, base_delay=0.001)
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", None), \
+                patch.object(real_api_server, "retry_budget", budget):
+            await real_api_server.call_openai_gpt("first")
+            await real_api_server.call_openai_gpt("second")
+
+        # 3 retries fit in the budget: two for the first call (its per-call maximum),
+        # then one for the second before the budget runs out
+        assert fake.state.request_count == 5
+        assert budget.stats()["retries"] == 3
+        assert budget.stats()["denied"] == 2
+
+    def test_health_reports_breakers(self):
+        import real_api_server
+
+        registry = CircuitBreakerRegistry()
+        registry.get("gpt-4o-mini")
+        with patch.object(real_api_server, "circuit_breakers", registry):
+            health = TestClient(real_api_server.app).get("/api/health").json()
+        assert health["circuit_breakers"]["gpt-4o-mini"]["state"] == CLOSED
+        assert "available" in health["retry_budget"]
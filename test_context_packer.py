@@ -0,0 +1,129 @@
+"""
+Unit Tests for Context Packing
+Tests context_packer.pack_context / ContextPacker and the packed prompts in real_api_server.py
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from context_packer import ContextPacker, count_tokens, pack_context, split_units
+
+RESEARCH = """# Remote Work Research
+
+Remote work has grown sharply since 2020. Companies now offer hybrid schedules to most staff.
+The cafeteria menu changed twice last year. Parking fees went up in several cities.
+
+## Key facts
+- 58% of workers can work remotely at least one day a week
+- Remote teams report fewer interruptions
+- The office plants were replaced in March
+
+## Audience considerations
+Managers worry that remote work weakens collaboration. Unrelated trivia fills the rest of this paragraph.
+"""
+
+
+class TestPackContext:
+    """Test unit splitting, budgets and relevance"""
+
+    def test_split_units(self):
+        units = split_units(RESEARCH)
+        kinds = [unit.kind for unit in units]
+        assert kinds.count("heading") == 3
+        assert kinds.count("item") == 3
+        assert units[1].text == "Remote work has grown sharply since 2020."
+
+    def test_text_within_budget_is_unchanged(self):
+        packed = pack_context("Short text.", 50)
+        assert packed.text == "Short text."
+        assert packed.tokens == packed.source_tokens
+
+    @pytest.mark.parametrize("budget", [15, 30, 60])
+    def test_budget_is_respected_with_whole_units(self, budget):
+        packed = pack_context(RESEARCH, budget, "remote work managers")
+        assert packed.tokens <= budget < packed.source_tokens
+        units = {unit.text for unit in split_units(RESEARCH)}
+        for line in packed.text.splitlines():
+            # every kept line is made of whole sentences, items or headings
+            assert line in units or all(part in RESEARCH for part in line.split(". "))
+
+    def test_relevant_units_win_and_keep_their_headings(self):
+        packed = pack_context(RESEARCH, 60, "remote work managers collaboration").text
+        assert "Managers worry that remote work weakens collaboration." in packed
+        assert "## Audience considerations" in packed
+        assert "cafeteria" not in packed
+        assert "office plants" not in packed
+        # original order is preserved
+        assert packed.index("# Remote Work Research") < packed.index("## Audience considerations")
+
+    def test_count_tokens(self):
+        assert count_tokens("") == 0
+        assert count_tokens("hello world") >= 2
+        assert count_tokens("word " * 100) >= 100
+
+    def test_tiktoken_is_used_and_the_estimate_is_a_fallback(self):
+        import context_packer
+
+        encoding = SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+        context_packer.get_encoding.cache_clear()
+        try:
+            with patch.object(context_packer.tiktoken, "encoding_for_model", return_value=encoding):
+                assert count_tokens("one two three", model="test-model") == 3
+            context_packer.get_encoding.cache_clear()
+            with patch.object(context_packer.tiktoken, "encoding_for_model", side_effect=OSError("offline")):
+                assert context_packer.get_encoding("test-model") is None
+                assert count_tokens("one two three", model="test-model") == 3
+        finally:
+            context_packer.get_encoding.cache_clear()
+
+
+class TestContextPacker:
+    """Test memoization and savings accounting"""
+
+    def test_memoizes_per_text_budget_and_query(self):
+        packer = ContextPacker()
+        with patch("context_packer.pack_context", wraps=pack_context) as packing:
+            first = packer.pack(RESEARCH, 40, "remote work")
+            second = packer.pack(RESEARCH, 40, "remote work")
+            packer.pack(RESEARCH, 60, "remote work")
+        assert first == second
+        assert packing.call_count == 2
+
+        stats = packer.stats()
+        assert stats["calls"] == 3
+        assert stats["memo_hits"] == 1
+        assert stats["tokens_saved"] == stats["source_tokens"] - stats["packed_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_pipeline_prompts_use_packed_context(self):
+        import real_api_server
+        from real_api_server import CONTEXT_BUDGETS, UserInput, build_content_steps
+
+        prompts = []
+
+        async def fake_call(prompt, system_prompt=None, **kwargs):
+            prompts.append((kwargs["step"], prompt))
+            return f"Output of {kwargs['step']}.\n\n" + RESEARCH * 5
+
+        packer = ContextPacker()
+        with patch.object(real_api_server, "call_openai_gpt", fake_call):
+            steps = {step.name: step for step in build_content_steps(UserInput(topic="Remote work"), packer=packer)}
+            research = await steps["research"].run()
+            article = await steps["article"].run(await steps["structure"].run(research))
+            await steps["image_concepts"].run(article)
+            await steps["seo"].run(article)
+
+        by_step = dict(prompts)
+        assert "Remote work has grown sharply since 2020." in by_step["structure"]
+        assert RESEARCH * 2 not in by_step["structure"]
+        stats = packer.stats()
+        # image concepts and SEO share one packing of the article
+        assert stats["memo_hits"] == 1
+        assert stats["packed_tokens"] <= sum(CONTEXT_BUDGETS.values())
+        assert stats["tokens_saved"] > 0
@@ -0,0 +1,134 @@
+"""
+Unit Tests for Cached Downloads
+Tests download_cache.py and the download endpoint in real_api_server.py
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from download_cache import DownloadCache, PreparedDownload, brotli, etag_matches, negotiate_encoding
+
+ARTICLE = "# Caching Downloads\n\n" + "Precomputed bodies are served from memory. " * 200
+
+
+class TestNegotiation:
+    """Test Accept-Encoding parsing"""
+
+    def test_prefers_brotli_then_gzip(self):
+        assert negotiate_encoding("gzip, deflate, br", {"identity", "gzip", "br"}) == "br"
+        assert negotiate_encoding("gzip, deflate, br", {"identity", "gzip"}) == "gzip"
+
+    def test_quality_values(self):
+        assert negotiate_encoding("br;q=0.5, gzip;q=0.9", {"identity", "gzip", "br"}) == "gzip"
+        assert negotiate_encoding("gzip;q=0", {"identity", "gzip"}) == "identity"
+        assert negotiate_encoding("*", {"identity", "gzip"}) == "gzip"
+
+    def test_no_header_means_identity(self):
+        assert negotiate_encoding(None, {"identity", "gzip"}) == "identity"
+        assert negotiate_encoding("", {"identity", "gzip"}) == "identity"
+
+
+class TestETags:
+    """Test If-None-Match comparison"""
+
+    def test_matching(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc", "def"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abc-gzip"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+    def test_etag_is_per_encoding_and_content(self):
+        prepared = PreparedDownload(ARTICLE, "text/markdown", "a.md")
+        assert prepared.etags["identity"] != prepared.etags["gzip"]
+        assert prepared.etags["identity"] == PreparedDownload(ARTICLE, "text/markdown", "a.md").etags["identity"]
+        assert prepared.etags["identity"] != PreparedDownload(ARTICLE + "!", "text/markdown", "a.md").etags["identity"]
+        assert gzip.decompress(prepared.bodies["gzip"]).decode("utf-8") == ARTICLE
+
+    def test_incompressible_content_keeps_identity_only(self):
+        assert set(PreparedDownload("x", "text/plain", "x.txt").bodies) == {"identity"}
+
+
+class TestDownloadCacheLRU:
+    def test_bounded(self):
+        cache = DownloadCache(max_entries=2)
+        for i in range(3):
+            cache.put(i, PreparedDownload("x", "text/plain", "x.txt"))
+        assert len(cache) == 2
+        assert cache.get(0) is None
+
+
+class TestDownloadEndpoint:
+    """Test GET /api/content/download/{task_id}/{format}"""
+
+    @pytest.fixture
+    def completed_task(self):
+        import real_api_server
+
+        task_id = "download-test"
+        real_api_server.task_storage.create(task_id, {
+            "task_id": task_id, "status": "completed", "current_step": 5, "current_operation": "done"
+        })
+        real_api_server.task_storage.set_result(task_id, {
+            "markdown_content": ARTICLE,
+            "html_content": "<html><body>" + ARTICLE + "</body></html>",
+            "article_url_slug": "caching-downloads",
+        })
+        yield task_id
+        real_api_server.task_storage.delete(task_id)
+
+    @pytest.fixture
+    def client(self):
+        from real_api_server import app
+        return TestClient(app)
+
+    def test_gzip_download_without_temp_files(self, client, completed_task):
+        before = set(os.listdir(tempfile.gettempdir()))
+        response = client.get(
+            f"/api/content/download/{completed_task}/markdown",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        after = set(os.listdir(tempfile.gettempdir()))
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/markdown")
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert "immutable" in response.headers["cache-control"]
+        assert 'filename="caching-downloads.md"' in response.headers["content-disposition"]
+        assert response.text == ARTICLE
+        assert after - before == set()
+
+    def test_if_none_match_returns_304(self, client, completed_task):
+        url = f"/api/content/download/{completed_task}/html"
+        first = client.get(url, headers={"Accept-Encoding": "identity"})
+        etag = first.headers["etag"]
+
+        cached = client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        # A different representation does not match the identity ETag
+        other = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert other.status_code == 200
+
+    @pytest.mark.skipif(brotli is None, reason="brotli not installed")
+    def test_brotli_download(self, client, completed_task):
+        response = client.get(
+            f"/api/content/download/{completed_task}/markdown",
+            headers={"Accept-Encoding": "gzip, br"},
+        )
+        assert response.headers["content-encoding"] == "br"
+        assert response.text == ARTICLE
+
+    def test_invalid_format_and_missing_task(self, client, completed_task):
+        assert client.get(f"/api/content/download/{completed_task}/pdf").status_code == 400
+        assert client.get("/api/content/download/missing/markdown").status_code == 404
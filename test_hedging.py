@@ -0,0 +1,164 @@
+"""
+Unit Tests for Hedged Requests
+Tests hedging.HedgePolicy and hedged calls through call_openai_gpt in real_api_server.py
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from hedging import HedgePolicy, HedgeRegistry
+from llm_client import LLMClientConfig, SharedLLMClient
+
+
+def warmed_policy(latency: float = 0.01, **settings) -> HedgePolicy:
+    policy = HedgePolicy(**{"min_samples": 5, "min_delay": 0.0, "max_hedge_rate": 1.0, **settings})
+    policy._latencies.extend([latency] * 5)
+    # Earlier calls so the hedge-rate cap has traffic to measure against
+    policy._calls.extend([policy._clock()] * 5)
+    return policy
+
+
+class TestHedgePolicy:
+    """Test when hedges fire, who wins and the rate cap"""
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        policy = HedgePolicy(min_samples=3)
+        attempts = []
+
+        async def call(claim):
+            attempts.append(1)
+            await asyncio.sleep(0.02)
+            return "done"
+
+        assert await policy.run(call) == "done"
+        assert len(attempts) == 1
+        assert policy.stats()["samples"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        policy = warmed_policy()
+        cancelled = []
+
+        async def call(claim):
+            index = len(calls)
+            calls.append(index)
+            try:
+                await asyncio.sleep(1.0 if index == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return f"attempt {index}"
+
+        calls = []
+        started = asyncio.get_running_loop().time()
+        assert await policy.run(call) == "attempt 1"
+        assert asyncio.get_running_loop().time() - started < 0.5
+        assert cancelled == [0]
+        assert policy.stats()["hedged"] == 1
+        assert policy.stats()["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        policy = warmed_policy(latency=0.5)
+
+        async def call(claim):
+            await asyncio.sleep(0.01)
+            return "fast"
+
+        assert await policy.run(call) == "fast"
+        assert policy.stats()["hedged"] == 0
+
+    @pytest.mark.asyncio
+    async def test_first_claim_wins_and_cancels_the_other(self):
+        policy = warmed_policy()
+        emitted = []
+
+        async def call(claim):
+            index = len(calls)
+            calls.append(index)
+            await asyncio.sleep(0.05 if index == 0 else 0.02)
+            for token in ("a", "b"):
+                if claim():
+                    emitted.append((index, token))
+                await asyncio.sleep(0)
+            return index
+
+        calls = []
+        assert await policy.run(call) == 1
+        assert emitted == [(1, "a"), (1, "b")]
+
+    @pytest.mark.asyncio
+    async def test_hedge_rate_is_capped(self):
+        # A median delay keeps every call eligible as the slow samples come in
+        policy = warmed_policy(max_hedge_rate=0.2, percentile=0.5)
+
+        async def call(claim):
+            await asyncio.sleep(0.03)
+            return "slow"
+
+        for _ in range(5):
+            await policy.run(call)
+        stats = policy.stats()
+        assert stats["hedged"] == 2  # 20% of the 10 calls in the window
+        assert stats["capped"] == 3
+
+    @pytest.mark.asyncio
+    async def test_error_is_raised_only_when_every_attempt_failed(self):
+        policy = warmed_policy()
+
+        async def call(claim):
+            index = len(calls)
+            calls.append(index)
+            await asyncio.sleep(0.03 if index == 0 else 0.05)
+            if index == 0:
+                raise RuntimeError("primary failed")
+            return "hedge answered"
+
+        calls = []
+        assert await policy.run(call) == "hedge answered"
+
+        async def broken(claim):
+            await asyncio.sleep(0.02)
+            raise RuntimeError("down")
+
+        with pytest.raises(RuntimeError, match="down"):
+            await policy.run(broken)
+
+
+class TestHedgedCalls:
+    """Test hedging inside call_openai_gpt against the fake server"""
+
+    @pytest.mark.asyncio
+    async def test_streamed_tokens_come_from_one_attempt(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(latency_ms=60, completion_text="one two three"))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake),
+        )
+        registry = HedgeRegistry(min_samples=5, min_delay=0.0, max_hedge_rate=1.0)
+        policy = registry.get(f"{real_api_server.DEFAULT_MODEL}/stream")
+        policy._latencies.extend([0.01] * 5)
+        policy._calls.extend([policy._clock()] * 5)
+        tokens = []
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "hedging", registry):
+            content = await real_api_server.call_openai_gpt("Hedge me", on_token=tokens.append)
+        await shared.close()
+
+        assert content == "one two three"
+        assert "".join(tokens) == "one two three"
+        assert fake.state.request_count == 2
+        assert registry.stats()[f"{real_api_server.DEFAULT_MODEL}/stream"]["hedged"] == 1
@@ -0,0 +1,261 @@
+"""
+Unit Tests for the Background Job Queue
+Tests job_queue.JobQueue, the 429 backpressure and task cancellation in both API servers
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+import httpx
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import JobQueue, QueueFullError
+
+
+class TestJobQueue:
+    """Test worker bounds, ordering and rejection"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_by_workers(self):
+        waits = []
+        queue = JobQueue(workers=2, max_queue_size=10, on_job_start=lambda job_id, waited: waits.append(waited))
+        running, peak, done = 0, 0, []
+
+        async def job(name):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            done.append(name)
+
+        for i in range(6):
+            queue.submit(f"job-{i}", job, i)
+        while len(done) < 6:
+            await asyncio.sleep(0.01)
+        await queue.close()
+
+        assert peak == 2
+        assert done == sorted(done)
+        assert len(waits) == 6
+        assert max(waits) >= 0.02  # the last jobs waited for a free worker
+        assert queue.stats()["completed"] == 6
+
+    @pytest.mark.asyncio
+    async def test_positions_and_rejection(self):
+        queue = JobQueue(workers=0, max_queue_size=2, expected_job_seconds=30)
+
+        async def job():
+            pass
+
+        assert queue.submit("a", job) == 1
+        assert queue.submit("b", job) == 2
+        assert queue.position("b") == 2
+        assert queue.position("unknown") is None
+
+        with pytest.raises(QueueFullError) as error:
+            queue.submit("c", job)
+        assert error.value.retry_after == 30
+        assert queue.stats()["rejected"] == 1
+        await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_job_does_not_stop_the_worker(self):
+        queue = JobQueue(workers=1)
+        done = asyncio.Event()
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def ok():
+            done.set()
+
+        queue.submit("broken", broken)
+        queue.submit("ok", ok)
+        await asyncio.wait_for(done.wait(), timeout=1.0)
+        await queue.close()
+        assert queue.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_and_running_jobs(self):
+        queue = JobQueue(workers=1)
+        started, cancelled, done = asyncio.Event(), [], asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def never():
+            cancelled.append("never ran")
+
+        async def ok():
+            done.set()
+
+        queue.submit("slow", slow)
+        queue.submit("queued", never)
+        await asyncio.wait_for(started.wait(), timeout=1.0)
+
+        assert queue.cancel("queued") is True
+        assert queue.cancel("slow") is True
+        assert queue.cancel("unknown") is False
+        # The worker survives the cancellation and picks up the next job
+        queue.submit("ok", ok)
+        await asyncio.wait_for(done.wait(), timeout=1.0)
+        await asyncio.sleep(0)
+        await queue.close()
+
+        assert cancelled == ["slow"]
+        assert queue.stats()["cancelled"] == 2
+        assert queue.stats()["completed"] == 1
+        assert queue.stats()["running"] == 0
+
+
+class TestBackpressure:
+    """Test that full queues answer 429 with Retry-After"""
+
+    def test_real_api_server_returns_429(self):
+        import real_api_server
+
+        payload = {"topic": "Backpressure", "audience": "General", "style": "Professional", "length": "Short"}
+        with patch.object(real_api_server, "job_queue", JobQueue(workers=0, max_queue_size=1)):
+            client = TestClient(real_api_server.app)
+            accepted = client.post("/api/content/create", json=payload)
+            rejected = client.post("/api/content/create", json=dict(payload, topic="Other topic"))
+
+            status = client.get(f"/api/content/status/{accepted.json()['task_id']}").json()
+        real_api_server.inflight_tasks.clear()
+
+        assert accepted.status_code == 200
+        assert accepted.json()["queue_position"] == 1
+        assert status["status"] == "queued"
+        assert status["queue_position"] == 1
+        assert rejected.status_code == 429
+        assert int(rejected.headers["retry-after"]) >= 1
+
+    def test_api_server_returns_429(self):
+        import api_server
+
+        payload = {"topic": "Backpressure", "config": {}}
+        with patch.object(api_server, "job_queue", JobQueue(workers=0, max_queue_size=1)):
+            client = TestClient(api_server.app)
+            accepted = client.post("/api/create-content", json=payload)
+            rejected = client.post("/api/create-content", json=payload)
+
+            progress = client.get(f"/api/progress/{accepted.json()['task_id']}").json()
+
+        assert accepted.status_code == 200
+        assert progress["status"] == "queued"
+        assert progress["queue_position"] == 1
+        assert rejected.status_code == 429
+        assert "retry-after" in rejected.headers
+
+
+async def wait_for_status(client: httpx.AsyncClient, url: str, status: str, timeout: float = 2.0) -> dict:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        body = (await client.get(url)).json()
+        if body["status"] == status or asyncio.get_running_loop().time() > deadline:
+            return body
+        await asyncio.sleep(0.01)
+
+
+class TestCancellation:
+    """Test that DELETE /api/tasks/{task_id} stops the running work"""
+
+    @pytest.mark.asyncio
+    async def test_real_api_server_cancels_in_flight_request(self):
+        import real_api_server
+        from fake_openai_server import FakeServerConfig, create_fake_app
+        from llm_client import LLMClientConfig, SharedLLMClient
+        from rate_limiter import RateLimiter
+
+        fake = create_fake_app(FakeServerConfig(latency_ms=10000))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake),
+        )
+        queue, limiter = JobQueue(workers=1), RateLimiter(600, 100000)
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", limiter), \
+                patch.object(real_api_server, "job_queue", queue):
+            transport = httpx.ASGITransport(app=real_api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                payload = {"topic": "Cancellation", "bypass_cache": True}
+                task_id = (await client.post("/api/content/create", json=payload)).json()["task_id"]
+                await wait_for_status(client, f"/api/content/status/{task_id}", "processing")
+                while fake.state.request_count == 0:
+                    await asyncio.sleep(0.01)
+
+                response = await client.delete(f"/api/tasks/{task_id}")
+                assert response.status_code == 200
+                await asyncio.sleep(0.05)
+
+                status = (await client.get(f"/api/content/status/{task_id}")).json()
+                assert status["status"] == "cancelled"
+                assert queue.stats()["running"] == 0
+                assert queue.stats()["cancelled"] == 1
+                # Only the research request was sent, and its unused completion budget was returned
+                assert fake.state.request_count == 1
+                assert 0 < limiter.counters["tokens_used"] < limiter.counters["tokens_estimated"]
+                assert real_api_server.normalize_input(real_api_server.UserInput(**payload)) \
+                    not in real_api_server.inflight_tasks
+
+                assert (await client.delete(f"/api/tasks/{task_id}")).status_code == 200
+                assert (await client.delete("/api/tasks/unknown")).status_code == 404
+            await queue.close()
+            await shared.close()
+
+    @pytest.mark.asyncio
+    async def test_real_api_server_refuses_finished_tasks(self):
+        import real_api_server
+
+        real_api_server.task_storage.create("finished-task", {
+            "task_id": "finished-task", "status": "completed", "current_step": 5, "current_operation": "done",
+        })
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            assert (await client.delete("/api/tasks/finished-task")).status_code == 409
+        real_api_server.task_storage.delete("finished-task")
+
+    @pytest.mark.asyncio
+    async def test_real_api_server_cancel_of_a_dangling_alias_is_not_found(self):
+        import real_api_server
+
+        # A coalesced request whose source task was already evicted from the store
+        real_api_server.task_storage.create("dangling-alias", {"task_id": "dangling-alias", "alias_of": "evicted"})
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            assert (await client.delete("/api/tasks/dangling-alias")).status_code == 404
+        real_api_server.task_storage.delete("dangling-alias")
+
+    @pytest.mark.asyncio
+    async def test_api_server_cancel_stops_the_workflow(self):
+        import api_server
+
+        queue = JobQueue(workers=1)
+        with patch.object(api_server, "job_queue", queue):
+            transport = httpx.ASGITransport(app=api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                created = await client.post("/api/create-content", json={"topic": "Cancel me", "config": {}})
+                task_id = created.json()["task_id"]
+                await wait_for_status(client, f"/api/progress/{task_id}", "running")
+
+                assert (await client.delete(f"/api/tasks/{task_id}")).status_code == 200
+                await asyncio.sleep(0.05)
+
+                progress = (await client.get(f"/api/progress/{task_id}")).json()
+                assert progress["status"] == "cancelled"
+                assert progress["current_operation"] == "Cancelled by user"
+                assert queue.stats()["cancelled"] == 1
+                assert queue.stats()["running"] == 0
+            await queue.close()
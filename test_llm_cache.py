@@ -0,0 +1,129 @@
+"""
+Unit Tests for the LLM Response Cache
+Tests llm_cache.ResponseCache and its use in real_api_server.call_openai_gpt
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_cache import ResponseCache, cache_key
+from llm_client import LLMClientConfig, SharedLLMClient
+
+
+class TestCacheKey:
+    """Test key derivation"""
+
+    def test_key_covers_every_input(self):
+        base = cache_key("gpt-4o-mini", "system", "prompt", 0.7, 2000)
+        assert base == cache_key("gpt-4o-mini", "system", "prompt", 0.7, 2000)
+        assert base != cache_key("gpt-4o", "system", "prompt", 0.7, 2000)
+        assert base != cache_key("gpt-4o-mini", "other", "prompt", 0.7, 2000)
+        assert base != cache_key("gpt-4o-mini", "system", "prompt!", 0.7, 2000)
+        assert base != cache_key("gpt-4o-mini", "system", "prompt", 0.2, 2000)
+        assert base != cache_key("gpt-4o-mini", "system", "prompt", 0.7, 500)
+
+
+class TestResponseCache:
+    """Test the memory and disk tiers"""
+
+    def test_memory_tier_lru(self):
+        cache = ResponseCache(max_memory_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.stats()["memory_hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        first = ResponseCache(path=path)
+        first.set("k", "cached text")
+        first.close()
+
+        second = ResponseCache(path=path)
+        assert second.get("k") == "cached text"
+        assert second.get("k") == "cached text"
+        stats = second.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+        second.close()
+
+    def test_ttl(self, tmp_path):
+        cache = ResponseCache(path=str(tmp_path / "cache.db"), ttl_seconds=10)
+        cache.set("k", "v")
+        with patch("llm_cache.time.time", return_value=time.time() + 11):
+            assert cache.get("k") is None
+        cache.close()
+
+    def test_disk_size_cap(self, tmp_path):
+        cache = ResponseCache(path=str(tmp_path / "cache.db"), max_memory_entries=1, max_disk_bytes=1000)
+        for i in range(50):
+            cache.set(f"k{i}", "x" * 100)
+        assert cache.stats()["disk_bytes"] <= 1000
+        assert cache.get("k49") == "x" * 100
+        assert cache.get("k0") is None
+        cache.close()
+
+
+class TestCallOpenAIGPTCaching:
+    """Test the cache in front of call_openai_gpt"""
+
+    @pytest.fixture
+    def fake_backend(self):
+        fake_app = create_fake_app(FakeServerConfig(latency_ms=0, completion_text="fresh completion"))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake_app),
+        )
+        return fake_app, shared
+
+    @pytest.mark.asyncio
+    async def test_repeat_prompt_is_served_from_cache(self, fake_backend):
+        import real_api_server
+
+        fake_app, shared = fake_backend
+        cache = ResponseCache()
+        tokens = []
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", cache):
+            first = await real_api_server.call_openai_gpt("Write about caching", "system")
+            second = await real_api_server.call_openai_gpt("Write about caching", "system", on_token=tokens.append)
+            fresh = await real_api_server.call_openai_gpt("Write about caching", "system", use_cache=False)
+        await shared.close()
+
+        assert first == second == fresh == "fresh completion"
+        assert tokens == ["fresh completion"]
+        assert fake_app.state.request_count == 2
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["bypassed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_content_is_not_cached(self):
+        import real_api_server
+
+        cache = ResponseCache()
+        with patch.object(real_api_server, "llm_client", SharedLLMClient(LLMClientConfig(api_key=None))), \
+                patch.object(real_api_server, "response_cache", cache):
+            await real_api_server.call_openai_gpt("Research the topic")
+        assert cache.stats()["writes"] == 0
+
+    def test_health_reports_cache_counters(self):
+        import real_api_server
+        from fastapi.testclient import TestClient
+
+        with patch.object(real_api_server, "response_cache", ResponseCache()):
+            data = TestClient(real_api_server.app).get("/api/health").json()
+        assert data["cache"]["hits"] == 0
+        assert "hit_rate" in data["cache"]
@@ -0,0 +1,110 @@
+"""
+Unit Tests for the Shared Async OpenAI Client
+Runs against the fake completions server through an in-process ASGI transport
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient, create_http_client
+
+
+@pytest.fixture
+def fake_app():
+    return create_fake_app(FakeServerConfig(latency_ms=10, completion_text="Hello from the fake server"))
+
+
+@pytest.fixture
+def shared_client(fake_app):
+    config = LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0)
+    return SharedLLMClient(config, transport=httpx.ASGITransport(app=fake_app))
+
+
+class TestLLMClientConfig:
+    """Test configuration loading"""
+
+    def test_from_env(self):
+        env = {
+            "OPENAI_BASE_URL": "http://localhost:8100/v1",
+            "OPENAI_MAX_CONNECTIONS": "7",
+            "OPENAI_KEEPALIVE_EXPIRY": "12.5",
+            "OPENAI_HTTP2": "false",
+        }
+        with patch.dict(os.environ, env):
+            config = LLMClientConfig.from_env(api_key="sk-test")
+        assert config.api_key == "sk-test"
+        assert config.base_url == "http://localhost:8100/v1"
+        assert config.max_connections == 7
+        assert config.keepalive_expiry == 12.5
+        assert config.http2 is False
+
+    def test_pool_limits_applied(self):
+        config = LLMClientConfig(max_connections=3, max_keepalive_connections=2, keepalive_expiry=9.0)
+        http_client = create_http_client(config)
+        pool = http_client._transport._pool
+        assert pool._max_connections == 3
+        assert pool._max_keepalive_connections == 2
+        assert pool._keepalive_expiry == 9.0
+
+
+class TestSharedLLMClient:
+    """Test client lifecycle and reuse"""
+
+    def test_unavailable_without_key(self):
+        shared = SharedLLMClient(LLMClientConfig(api_key=None))
+        assert not shared.available
+        assert shared.get() is None
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared(self, shared_client):
+        first = shared_client.get()
+        assert first is not None
+        assert shared_client.get() is first
+        await shared_client.close()
+        assert shared_client._client is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls(self, shared_client, fake_app):
+        client = shared_client.start()
+
+        async def call():
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": "hi"}],
+            )
+            return response.choices[0].message.content
+
+        results = await asyncio.gather(*(call() for _ in range(20)))
+        assert results == ["Hello from the fake server"] * 20
+        assert fake_app.state.request_count == 20
+        await shared_client.close()
+
+
+class TestCallOpenAIGPT:
+    """Test real_api_server.call_openai_gpt on the shared client"""
+
+    @pytest.mark.asyncio
+    async def test_uses_shared_client(self, shared_client):
+        import real_api_server
+
+        with patch.object(real_api_server, "llm_client", shared_client), \
+                patch.object(real_api_server, "response_cache", None):
+            result = await real_api_server.call_openai_gpt("Research the topic", "system")
+        assert result == "Hello from the fake server"
+        await shared_client.close()
+
+    @pytest.mark.asyncio
+    async def test_fallback_without_client(self):
+        import real_api_server
+
+        with patch.object(real_api_server, "llm_client", SharedLLMClient(LLMClientConfig(api_key=None))):
+            result = await real_api_server.call_openai_gpt("Research the topic")
+        assert "Research Summary" in result
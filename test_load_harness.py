@@ -0,0 +1,187 @@
+"""
+Unit Tests for the Offline Load-Test Harness
+Tests fake_openai_server.py (responses API, latency distributions, error injection)
+and the load_generator.py report
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List
+from unittest.mock import patch
+
+import httpx
+import openai
+import pytest
+from pydantic import BaseModel
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app, sample_from_schema, sample_latency
+from job_queue import JobQueue
+from llm_client import LLMClientConfig, SharedLLMClient
+from load_generator import latency_summary, run_load
+
+
+def openai_client(app) -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+
+
+class Outline(BaseModel):
+    title: str
+    sections: List[str]
+    word_count: int
+
+
+class TestFakeServer:
+    """Test the chat completions and responses endpoints"""
+
+    @pytest.mark.asyncio
+    async def test_responses_endpoint(self):
+        client = openai_client(create_fake_app(FakeServerConfig(latency_ms=0, completion_text="hello there")))
+
+        response = await client.responses.create(model="gpt-4o", input="Say hello")
+        assert response.output_text == "hello there"
+        assert response.usage.output_tokens > 0
+
+        stream = await client.responses.create(model="gpt-4o", input="Say hello", stream=True)
+        events = [event async for event in stream]
+        deltas = "".join(event.delta for event in events if event.type == "response.output_text.delta")
+        assert deltas == "hello there"
+        assert events[-1].type == "response.completed"
+
+    @pytest.mark.asyncio
+    async def test_structured_output_matches_schema(self):
+        client = openai_client(create_fake_app(FakeServerConfig(latency_ms=0)))
+        response = await client.responses.parse(model="gpt-4o", input="Outline", text_format=Outline)
+        assert isinstance(response.output_parsed, Outline)
+
+    def test_sample_from_schema_resolves_refs(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "outline": {"$ref": "#/$defs/Outline"},
+                "note": {"anyOf": [{"type": "null"}, {"type": "string"}]},
+            },
+            "$defs": {"Outline": Outline.model_json_schema()},
+        }
+        sample = sample_from_schema(schema)
+        Outline.model_validate(sample["outline"])
+        assert isinstance(sample["note"], str)
+
+    def test_latency_distributions(self):
+        rng = random.Random(7)
+        fixed = FakeServerConfig(latency_ms=100)
+        assert sample_latency(fixed, rng) == 0.1
+
+        uniform = FakeServerConfig(latency_ms=100, latency_distribution="uniform", latency_jitter_ms=50)
+        assert all(0.05 <= sample_latency(uniform, rng) <= 0.15 for _ in range(200))
+
+        lognormal = FakeServerConfig(latency_ms=100, latency_distribution="lognormal", latency_jitter_ms=80)
+        draws = sorted(sample_latency(lognormal, rng) for _ in range(2000))
+        assert 0.08 < draws[1000] < 0.12  # median stays at latency_ms
+        assert draws[1979] > 3 * draws[1000]  # with a long tail
+
+        with pytest.raises(ValueError):
+            create_fake_app(FakeServerConfig(latency_distribution="pareto"))
+
+    @pytest.mark.asyncio
+    async def test_error_injection(self):
+        app = create_fake_app(FakeServerConfig(latency_ms=0, rate_limit_rate=1.0))
+        with pytest.raises(openai.RateLimitError):
+            await openai_client(app).chat.completions.create(
+                model="gpt-4o", messages=[{"role": "user", "content": "hi"}]
+            )
+
+        app = create_fake_app(FakeServerConfig(latency_ms=0, server_error_rate=1.0))
+        with pytest.raises(openai.InternalServerError):
+            await openai_client(app).responses.create(model="gpt-4o", input="hi")
+
+        app = create_fake_app(FakeServerConfig(latency_ms=0, timeout_rate=1.0, timeout_seconds=5))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(openai_client(app).responses.create(model="gpt-4o", input="hi"), 0.1)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake") as client:
+            stats = (await client.get("/v1/stats")).json()
+        assert stats["injected"]["timeout"] == 1
+
+    @pytest.mark.asyncio
+    async def test_tokens_per_second_paces_streaming(self):
+        config = FakeServerConfig(latency_ms=0, tokens_per_second=200, completion_text="word " * 40)
+        client = openai_client(create_fake_app(config))
+        started = time.perf_counter()
+        stream = await client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": "hi"}], stream=True
+        )
+        async for _ in stream:
+            pass
+        # 40 one-token words at 200 tokens/s
+        assert time.perf_counter() - started >= 0.18
+
+
+class TestLoadGenerator:
+    """Test the load generator against real_api_server in-process"""
+
+    def test_latency_summary(self):
+        summary = latency_summary([i / 1000 for i in range(1, 101)])
+        assert summary["count"] == 100
+        assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.0, 95.0, 99.0)
+        assert latency_summary([]) == {"count": 0}
+
+    @pytest.mark.asyncio
+    async def test_report(self):
+        import real_api_server
+
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=create_fake_app(FakeServerConfig(latency_ms=1))),
+        )
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "job_queue", JobQueue(workers=4)):
+            transport = httpx.ASGITransport(app=real_api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                report = await run_load(client, rps=20, duration=0.5, poll_interval=0.02, task_timeout=10)
+            await real_api_server.job_queue.close()
+        await shared.close()
+
+        assert report["tasks"]["started"] == 10
+        assert report["tasks"]["completed"] == 10
+        assert report["error_rates"] == {"create": 0.0, "status": 0.0, "task_failed": 0.0}
+        assert report["latency"]["task_end_to_end"]["count"] == 10
+        assert set(report["latency"]["create"]) >= {"p50_ms", "p95_ms", "p99_ms"}
+        assert report["llm_fallbacks"] == {}
+
+    @pytest.mark.asyncio
+    async def test_delta_polls_ship_fewer_bytes(self):
+        import real_api_server
+
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=create_fake_app(FakeServerConfig(latency_ms=30))),
+        )
+        reports = {}
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "job_queue", JobQueue(workers=4)):
+            transport = httpx.ASGITransport(app=real_api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                for mode in ("full", "delta"):
+                    reports[mode] = await run_load(
+                        client, rps=20, duration=0.2, poll_interval=0.02, task_timeout=10, status_mode=mode
+                    )
+            await real_api_server.job_queue.close()
+        await shared.close()
+
+        assert reports["delta"]["tasks"]["completed"] == 4
+        assert reports["delta"]["error_rates"]["status"] == 0.0
+        assert "304" in reports["delta"]["status_codes"]
+        assert reports["delta"]["status_bytes"]["mean_per_poll"] < reports["full"]["status_bytes"]["mean_per_poll"]
@@ -0,0 +1,168 @@
+"""
+Unit Tests for the Markdown Renderer
+Tests markdown_renderer.IncrementalMarkdownRenderer and the rendered HTML,
+html events and preview endpoint in real_api_server.py
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+from markdown_renderer import IncrementalMarkdownRenderer, render_inline, render_markdown
+from test_task_events import parse_sse
+
+ARTICLE = """# Streaming *Guide*
+
+First paragraph with **bold**, `a < b` and a [link](https://example.com).
+It wraps onto a second line.
+
+- one
+- two
+  - nested
+1. first
+
+> quoted
+
+```python
+print("<hi>")
+```
+
+| Name | Count |
+|:-----|------:|
+| a    | 1     |
+
+---
+Last words
+
+Setext Heading
+--------------
+[Python](https://en.wikipedia.org/wiki/Python_(programming_language))"""
+
+
+class TestRenderer:
+    """Test block and inline rendering"""
+
+    def test_blocks(self):
+        html = render_markdown(ARTICLE)
+        assert '<h1 id="streaming-guide">Streaming <em>Guide</em></h1>' in html
+        assert "<p>First paragraph with <strong>bold</strong>, <code>a &lt; b</code>" in html
+        assert '<a href="https://example.com">link</a>.\nIt wraps onto a second line.</p>' in html
+        assert "<ul><li>one</li><li>two<ul><li>nested</li></ul></li></ul>\n<ol><li>first</li></ol>" in html
+        assert "<blockquote>\n<p>quoted</p>\n</blockquote>" in html
+        assert '<pre><code class="language-python">print("&lt;hi&gt;")\n</code></pre>' in html
+        assert '<th style="text-align: left">Name</th><th style="text-align: right">Count</th>' in html
+        assert "<hr>\n<p>Last words</p>" in html
+        assert '<h2 id="setext-heading">Setext Heading</h2>' in html
+
+    def test_raw_html_and_unsafe_links_are_neutralised(self):
+        html = render_inline('<script>alert(1)</script> [x](javascript:alert) ![i](data:image/png)')
+        assert "<script>" not in html
+        assert '<a href="#">x</a>' in html
+        assert '<img src="#" alt="i">' in html
+        assert render_inline("snake_case_name stays") == "snake_case_name stays"
+
+    def test_setext_headings(self):
+        html = render_markdown("Main Title\n===\n\nSection\ntwo lines\n---\nBody\n\n---\n")
+        assert html == (
+            '<h1 id="main-title">Main Title</h1>\n'
+            '<h2 id="section-two-lines">Section two lines</h2>\n'
+            "<p>Body</p>\n<hr>\n"
+        )
+        # Without a paragraph above, "---" is still a rule and "===" is text
+        assert render_markdown("- item\n---\n===") == "<ul><li>item</li></ul>\n<hr>\n<p>===</p>\n"
+
+    def test_link_targets_with_parentheses(self):
+        html = render_inline(
+            "[Python](https://en.wikipedia.org/wiki/Python_(programming_language)) and "
+            "![logo](https://example.com/a_(b).png) (see [docs](https://example.com))"
+        )
+        assert '<a href="https://en.wikipedia.org/wiki/Python_(programming_language)">Python</a>' in html
+        assert '<img src="https://example.com/a_(b).png" alt="logo">' in html
+        assert html.endswith('(see <a href="https://example.com">docs</a>)')
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 64])
+    def test_any_chunking_matches_whole_document(self, size):
+        renderer = IncrementalMarkdownRenderer()
+        streamed = "".join(renderer.feed(ARTICLE[i:i + size]) for i in range(0, len(ARTICLE), size))
+        streamed += renderer.finish()
+        assert streamed == renderer.html == render_markdown(ARTICLE)
+        assert renderer.source == ARTICLE
+
+    def test_blocks_are_emitted_once_closed(self):
+        renderer = IncrementalMarkdownRenderer()
+        assert renderer.feed("# Title\nSome text") == '<h1 id="title">Title</h1>\n'
+        assert renderer.preview().endswith("<p>Some text</p>\n")
+        assert renderer.feed(" continues\n") == ""
+        assert renderer.feed("\n") == "<p>Some text continues</p>\n"
+        assert renderer.feed("```\nopen fence") == ""
+        assert "<pre><code>open fence\n</code></pre>" in renderer.preview()
+        assert renderer.finish() == "<pre><code>open fence\n</code></pre>\n"
+
+
+class TestServerRendering:
+    """Test that real_api_server renders the article once, while it streams"""
+
+    @pytest.mark.asyncio
+    async def test_streamed_render_is_reused_for_downloads_and_preview(self):
+        import real_api_server
+        from real_api_server import ProcessingStatus, UserInput, process_ai_content_creation
+
+        fake_app = create_fake_app(FakeServerConfig(latency_ms=0, token_delay_ms=2, completion_text=ARTICLE))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake_app),
+        )
+        task_id = "render-test"
+        real_api_server.task_storage.create(task_id, ProcessingStatus(
+            task_id=task_id, status="processing", current_step=1, current_operation="starting"
+        ).model_dump())
+
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with patch.object(real_api_server, "llm_client", shared), \
+                    patch.object(real_api_server, "response_cache", None), \
+                    patch.object(real_api_server, "render_markdown", wraps=render_markdown) as full_render:
+                stream = asyncio.ensure_future(client.get(f"/api/content/stream/{task_id}"))
+                await asyncio.sleep(0.02)
+                work = asyncio.ensure_future(process_ai_content_creation(task_id, UserInput(topic="Streaming")))
+                while task_id not in real_api_server.live_renderers or \
+                        not real_api_server.live_renderers[task_id][1].html:
+                    await asyncio.sleep(0.01)
+                live = await client.get(f"/api/content/preview/{task_id}")
+                await work
+                events = parse_sse((await stream).text)
+            done = await client.get(f"/api/content/preview/{task_id}")
+            download = await client.get(f"/api/content/download/{task_id}/html")
+        await shared.close()
+        result = real_api_server.task_storage.get_result(task_id)
+        real_api_server.task_storage.delete(task_id)
+
+        assert full_render.call_count == 0
+        expected = render_markdown(ARTICLE)
+        assert "".join(data["html"] for name, data in events if name == "html") == expected
+        assert expected in result["html_content"]
+
+        assert live.headers["cache-control"] == "no-store"
+        assert "<h1 id=\"streaming-guide\">" in live.text
+        assert done.status_code == 200
+        assert "content-disposition" not in done.headers
+        assert done.text == download.text == result["html_content"]
+        assert done.headers["etag"] == download.headers["etag"]
+        assert task_id not in real_api_server.live_renderers
+
+    def test_final_result_without_streamed_render(self):
+        from real_api_server import UserInput, build_final_result
+
+        results = {"article": "# A <b>Title</b>", "research": "", "structure": "", "image_concepts": "", "seo": ""}
+        result = build_final_result(UserInput(topic="<Topic>"), results)
+        assert "<title>&lt;Topic&gt;</title>" in result["html_content"]
+        assert '<h1 id="a-btitleb">A &lt;b&gt;Title&lt;/b&gt;</h1>' in result["html_content"]
+        assert result["markdown_content"] == "# A <b>Title</b>"
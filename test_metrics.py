@@ -0,0 +1,95 @@
+"""
+Unit Tests for Metrics
+Tests metrics.MetricsRegistry rendering and the /metrics endpoint in real_api_server.py
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+from metrics import MetricsRegistry
+
+
+class TestRegistry:
+    """Test the text exposition format"""
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "Requests", ["route"])
+        depth = registry.gauge("app_depth", "Depth")
+        requests.inc(route="/a")
+        requests.inc(2, route="/a")
+        depth.set_function(lambda: 7)
+
+        text = registry.render()
+        assert "# TYPE app_requests_total counter" in text
+        assert 'app_requests_total{route="/a"} 3' in text
+        assert "app_depth 7" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("app_seconds", "Latency", ["step"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, step="research")
+
+        text = registry.render()
+        assert 'app_seconds_bucket{step="research",le="0.1"} 2' in text
+        assert 'app_seconds_bucket{step="research",le="1"} 3' in text
+        assert 'app_seconds_bucket{step="research",le="+Inf"} 4' in text
+        assert 'app_seconds_count{step="research"} 4' in text
+        assert 'app_seconds_sum{step="research"} 3.65' in text
+
+    def test_labels_are_validated_and_escaped(self):
+        registry = MetricsRegistry()
+        errors = registry.counter("app_errors_total", "Errors", ["error_type"])
+        with pytest.raises(ValueError):
+            errors.inc(kind="x")
+        errors.inc(error_type='say "hi"')
+        assert 'error_type="say \\"hi\\""' in registry.render()
+        with pytest.raises(ValueError):
+            registry.counter("app_errors_total", "Duplicate")
+
+
+class TestMetricsEndpoint:
+    """Test the instrumentation in real_api_server"""
+
+    @pytest.mark.asyncio
+    async def test_llm_call_is_recorded_per_step(self):
+        import real_api_server
+
+        fake_app = create_fake_app(FakeServerConfig(latency_ms=0, completion_text="measured completion"))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake_app),
+        )
+        latency_before = real_api_server.LLM_LATENCY.count(step="seo")
+        tokens_before = real_api_server.LLM_TOKENS.value(step="seo", kind="completion")
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None):
+            await real_api_server.call_openai_gpt("Optimize this", step="seo")
+        await shared.close()
+
+        assert real_api_server.LLM_LATENCY.count(step="seo") == latency_before + 1
+        assert real_api_server.LLM_TOKENS.value(step="seo", kind="completion") > tokens_before
+
+    def test_scrape(self):
+        import real_api_server
+
+        before = real_api_server.FALLBACKS.value(error_type="timeout")
+        real_api_server.generate_fallback_content("Research the topic", "timeout")
+
+        response = TestClient(real_api_server.app).get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert f'content_llm_fallbacks_total{{error_type="timeout"}} {int(before + 1)}' in response.text
+        for name in ("content_llm_request_seconds", "content_job_queue_wait_seconds",
+                     "content_task_duration_seconds", "content_tasks_in_flight", "content_job_queue_depth"):
+            assert f"# TYPE {name}" in response.text
@@ -0,0 +1,167 @@
+"""
+Unit Tests for Per-Step Model Routing
+Tests model_router.py and how real_api_server.py routes pipeline steps
+"""
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CircuitBreakerRegistry
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+from model_router import ModelRouter, StepRoute, create_model_router
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+DEFAULT_ROUTE = StepRoute(models=["gpt-4o-mini"])
+
+
+def router(clock: FakeClock, **routes) -> ModelRouter:
+    return ModelRouter(routes, DEFAULT_ROUTE, min_samples=3, recovery_seconds=60, clock=clock)
+
+
+class TestModelRouter:
+    """Test SLO demotion, recovery and the routing table"""
+
+    def test_demotes_when_p95_exceeds_slo(self):
+        clock = FakeClock()
+        r = router(clock, article=StepRoute(models=["big", "fast"], slo_p95_seconds=10))
+        for seconds in (12, 14):
+            r.record("article", "big", seconds)
+        assert r.candidates("article") == ["big", "fast"]  # not enough samples yet
+
+        r.record("article", "big", 15)
+        assert r.candidates("article") == ["fast"]
+        stats = r.stats()["article"]
+        assert stats["active_model"] == "fast"
+        assert stats["demotions"] == 1
+
+    def test_last_model_is_never_demoted_and_no_slo_means_no_demotion(self):
+        clock = FakeClock()
+        r = router(clock, seo=StepRoute(models=["only"], slo_p95_seconds=1), research=StepRoute(models=["a", "b"]))
+        for _ in range(5):
+            r.record("seo", "only", 9)
+            r.record("research", "a", 99)
+        assert r.candidates("seo") == ["only"]
+        assert r.candidates("research") == ["a", "b"]
+
+    def test_promotes_back_after_recovery_with_a_fresh_window(self):
+        clock = FakeClock()
+        r = router(clock, article=StepRoute(models=["big", "fast"], slo_p95_seconds=10))
+        for _ in range(3):
+            r.record("article", "big", 20)
+        assert r.candidates("article") == ["fast"]
+
+        clock.now += 61
+        assert r.candidates("article") == ["big", "fast"]
+        assert r.stats()["article"]["samples"] == 0
+        r.record("article", "big", 5)
+        assert r.candidates("article") == ["big", "fast"]
+
+    def test_unknown_steps_use_the_default_route(self):
+        r = router(FakeClock())
+        assert r.route("other") is DEFAULT_ROUTE
+        assert r.candidates("other") == ["gpt-4o-mini"]
+
+    def test_model_routes_env_overrides_fields(self, tmp_path, monkeypatch):
+        routes = {"article": StepRoute(models=["gpt-4o-mini"], max_tokens=2000, timeout=45)}
+        monkeypatch.setenv("MODEL_ROUTES", json.dumps({
+            "article": {"models": ["gpt-4o", "gpt-4o-mini"], "slo_p95_seconds": 40},
+            "default": {"max_tokens": 500},
+        }))
+        r = create_model_router(routes, DEFAULT_ROUTE)
+        assert r.route("article").models == ["gpt-4o", "gpt-4o-mini"]
+        assert r.route("article").timeout == 45
+        assert r.route("other").max_tokens == 500
+
+        path = tmp_path / "routes.json"
+        path.write_text(json.dumps({"seo": {"models": ["gpt-4.1-nano"], "max_tokens": 300}}))
+        monkeypatch.setenv("MODEL_ROUTES", str(path))
+        r = create_model_router(routes, DEFAULT_ROUTE)
+        assert r.route("seo").models == ["gpt-4.1-nano"]
+        assert r.route("seo").max_tokens == 300
+
+
+def fake_llm_client(fake) -> SharedLLMClient:
+    return SharedLLMClient(
+        LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+        transport=httpx.ASGITransport(app=fake),
+    )
+
+
+class TestRoutedCalls:
+    """Test routing inside call_openai_gpt and the step models in task metadata"""
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_falls_back_to_the_next_model(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(completion_text="Outline"))
+        routes = ModelRouter({"structure": StepRoute(models=["big", "fast"], max_tokens=300)}, DEFAULT_ROUTE)
+        breakers = CircuitBreakerRegistry(minimum_calls=1)
+        breakers.get("big").acquire().failure(1)
+        served_by = {}
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", breakers), \
+                patch.object(real_api_server, "model_router", routes):
+            content = await real_api_server.call_openai_gpt("Outline it", step="structure", served_by=served_by)
+
+        assert content == "Outline"
+        assert served_by == {"structure": "fast"}
+        assert fake.state.models == {"fast": 1}
+
+    @pytest.mark.asyncio
+    async def test_slow_step_is_demoted(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(latency_ms=30, completion_text="SEO tips"))
+        routes = ModelRouter(
+            {"seo": StepRoute(models=["big", "fast"], slo_p95_seconds=0.01)}, DEFAULT_ROUTE, min_samples=2
+        )
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", None), \
+                patch.object(real_api_server, "model_router", routes):
+            for _ in range(3):
+                await real_api_server.call_openai_gpt("Optimize", step="seo")
+
+        assert fake.state.models == {"big": 2, "fast": 1}
+        assert routes.stats()["seo"]["active_model"] == "fast"
+
+    @pytest.mark.asyncio
+    async def test_final_metadata_reports_step_models(self):
+        import real_api_server
+
+        fake = create_fake_app(FakeServerConfig(completion_text="# Title\n\nText."))
+        routes = ModelRouter({
+            step: StepRoute(models=["fast" if step in ("structure", "seo") else "big"])
+            for step in real_api_server.STEP_ROUTES
+        }, DEFAULT_ROUTE)
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", None), \
+                patch.object(real_api_server, "model_router", routes):
+            result = await real_api_server.generate_content(real_api_server.UserInput(topic="Routing"))
+
+        assert result["metadata"]["step_models"] == {
+            "research": "big", "structure": "fast", "article": "big", "image_concepts": "big", "seo": "fast",
+        }
+        assert fake.state.models == {"big": 3, "fast": 2}
@@ -0,0 +1,127 @@
+"""
+Unit Tests for the Dependency-Graph Step Executor
+Tests pipeline.py and its use in real_api_server.process_ai_content_creation
+"""
+
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import PipelineError, PipelineStep, run_pipeline, validate_steps
+
+
+def make_step(name, inputs=(), delay=0.0, log=None):
+    async def run(**kwargs):
+        if log is not None:
+            log.append(("start", name))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", name))
+        return name + "(" + ",".join(kwargs[k] for k in sorted(kwargs)) + ")"
+    return PipelineStep(name, run, inputs=inputs)
+
+
+class TestValidation:
+    """Test graph validation"""
+
+    def test_unknown_dependency(self):
+        with pytest.raises(PipelineError):
+            validate_steps([make_step("a", inputs=["missing"])])
+
+    def test_duplicate_name(self):
+        with pytest.raises(PipelineError):
+            validate_steps([make_step("a"), make_step("a")])
+
+    def test_cycle(self):
+        with pytest.raises(PipelineError):
+            validate_steps([make_step("a", inputs=["b"]), make_step("b", inputs=["a"])])
+
+
+class TestRunPipeline:
+    """Test scheduling behaviour"""
+
+    @pytest.mark.asyncio
+    async def test_inputs_are_passed_by_name(self):
+        results = await run_pipeline([
+            make_step("a"),
+            make_step("b", inputs=["a"]),
+            make_step("c", inputs=["a", "b"]),
+        ])
+        assert results["c"] == "c(a(),b(a()))"
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_run_concurrently(self):
+        log = []
+        timings = {}
+        start = time.perf_counter()
+        await run_pipeline([
+            make_step("article", delay=0.01, log=log),
+            make_step("images", inputs=["article"], delay=0.2, log=log),
+            make_step("seo", inputs=["article"], delay=0.2, log=log),
+        ], timings=timings)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.35
+        assert log.index(("start", "seo")) < log.index(("end", "images"))
+        assert set(timings) == {"article", "images", "seo"}
+        assert timings["images"] >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_running_steps(self):
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await run_pipeline([PipelineStep("slow", slow), PipelineStep("broken", broken)])
+        assert cancelled == ["slow"]
+
+
+class TestContentPipeline:
+    """Test the content creation DAG in real_api_server"""
+
+    @pytest.mark.asyncio
+    async def test_process_records_step_timings(self):
+        import real_api_server
+        from real_api_server import ProcessingStatus, UserInput, process_ai_content_creation
+
+        calls = []
+
+        async def fake_call(prompt, system_prompt=None, **kwargs):
+            calls.append(system_prompt)
+            await asyncio.sleep(0.05)
+            return f"output for {system_prompt}"
+
+        task_id = "pipeline-test"
+        real_api_server.task_storage.create(task_id, ProcessingStatus(
+            task_id=task_id, status="processing", current_step=1, current_operation="starting"
+        ).model_dump())
+        with patch.object(real_api_server, "call_openai_gpt", fake_call):
+            start = time.perf_counter()
+            await process_ai_content_creation(task_id, UserInput(topic="Graph Scheduling"))
+            elapsed = time.perf_counter() - start
+
+        status = real_api_server.load_task_status(task_id)
+        real_api_server.task_storage.delete(task_id)
+        assert status.status == "completed"
+        assert status.current_step == 5
+        assert len(calls) == 5
+        assert set(status.step_timings) == {"research", "structure", "article", "image_concepts", "seo"}
+        # Four sequential round-trips: image concepts and SEO overlap
+        assert elapsed < 0.05 * 5
+        assert status.final_result["seo_optimization"].startswith("output for You are an SEO expert")
@@ -0,0 +1,94 @@
+"""
+Unit Tests for Local Publishing
+Tests the direct publishing stage of enhanced_content_system.py that replaces the publisher agent
+"""
+
+import os
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_content_system import (
+    ContentCreationConfig,
+    MarkdownContent,
+    build_publish_prompt,
+    ImageDescription,
+    estimate_seo_score,
+    publish_article_locally,
+    publisher_agent,
+    save_markdown_file,
+)
+
+
+def article(**overrides) -> MarkdownContent:
+    body = "# Solar Energy at Home\n\n" + "".join(
+        f"## Section {i}\n\n" + "Panels convert sunlight into power for the household. " * 20 + "\n\n"
+        for i in range(4)
+    )
+    fields = dict(
+        title="Solar Energy at Home",
+        subtitle="A practical guide",
+        summary="How home solar works",
+        table_of_contents=["Section 0", "Section 1", "Section 2", "Section 3"],
+        markdown_content=body,
+        sections=["Section 0", "Section 1", "Section 2", "Section 3"],
+        keywords=["solar", "energy", "panels"],
+        meta_description="Learn how solar energy panels power a home, what they cost and how to install them.",
+        estimated_read_time="2 min read",
+    )
+    return MarkdownContent(**{**fields, **overrides})
+
+
+class TestLocalPublishing:
+    """Test publish_article_locally and the deterministic SEO score"""
+
+    def test_writes_html_and_fills_the_article(self, tmp_path):
+        config = ContentCreationConfig(output_directory=str(tmp_path))
+        markdown_data = article()
+        markdown_path = save_markdown_file(markdown_data.markdown_content, markdown_data.title, str(tmp_path))
+        images = ["https://example.com/hero.png", "https://example.com/one.png"]
+
+        published = publish_article_locally(markdown_data, images, markdown_path, config)
+
+        assert published.article_url_slug == "solar-energy-at-home"
+        assert published.html_file_path == str(tmp_path / "solar-energy-at-home.html")
+        assert published.markdown_file_path == markdown_path
+        assert published.word_count == len(markdown_data.markdown_content.split())
+        assert published.sections_count == 4
+        assert published.images_included == 2
+        assert published.estimated_read_time == "3 min read"  # 657 words at 225 per minute
+        assert published.seo_score == 10
+
+        html = (tmp_path / "solar-energy-at-home.html").read_text(encoding="utf-8")
+        assert '<h2 id="section-1">Section 1</h2>' in html
+        assert 'href="#section-1"' in html
+        assert "https://example.com/hero.png" in html
+
+    def test_toc_follows_config(self, tmp_path):
+        config = ContentCreationConfig(output_directory=str(tmp_path), include_toc=False)
+        published = publish_article_locally(article(), [], "article.md", config)
+        html = open(published.html_file_path, encoding="utf-8").read()
+        assert "table-of-contents\"" not in html
+        assert published.images_included == 0
+
+    def test_seo_score_drops_with_weak_metadata(self):
+        weak = article(title="Hi", meta_description="Short", keywords=[], table_of_contents=[], subtitle="")
+        assert estimate_seo_score(weak) < estimate_seo_score(article())
+        assert 1 <= estimate_seo_score(weak) <= 10
+
+    def test_agent_mode_keeps_the_publisher_tools(self, tmp_path):
+        assert ContentCreationConfig().publish_mode == "local"
+        with pytest.raises(ValidationError):
+            ContentCreationConfig(publish_mode="agnet")
+        assert [tool.name for tool in publisher_agent.tools] == [
+            "save_markdown_file", "create_enhanced_html_template", "create_url_slug", "calculate_read_time",
+        ]
+        images = ImageDescription(
+            hero_image={"prompt": "Sunlit roof", "alt_text": "Roof"}, section_images=[],
+            image_style="Photo", color_scheme="Warm", aspect_ratios={"hero": "16:9"},
+        )
+        prompt = build_publish_prompt(article(), images, [], "article.md", ContentCreationConfig())
+        assert article().markdown_content in prompt
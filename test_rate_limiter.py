@@ -0,0 +1,173 @@
+"""
+Unit Tests for the LLM Rate Limiter
+Tests rate_limiter.RateLimiter and its use in real_api_server.call_openai_gpt
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+from rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimiter, estimate_tokens, parse_retry_after
+
+
+class TestHelpers:
+    """Test token estimates and Retry-After parsing"""
+
+    def test_estimate_includes_completion_budget(self):
+        messages = [{"role": "system", "content": "x" * 40}, {"role": "user", "content": "y" * 400}]
+        assert estimate_tokens(messages, 2000) == 10 + 4 + 100 + 4 + 2000
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after({"retry-after-ms": "250"}, default=5.0) == 0.25
+        assert parse_retry_after({"retry-after": "2"}, default=5.0) == 2.0
+        assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, default=5.0) == 5.0
+        assert parse_retry_after(None, default=1.5) == 1.5
+
+
+class TestRateLimiter:
+    """Test admission, priority and usage correction"""
+
+    @pytest.mark.asyncio
+    async def test_burst_within_budget_is_not_queued(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+        for _ in range(5):
+            reservation = await limiter.acquire(1000)
+            assert reservation.waited == 0.0
+        stats = limiter.stats()
+        assert stats["admitted"] == 5
+        assert stats["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_admitted_by_priority(self):
+        # 6000 TPM refills 100 tokens every second
+        limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=6000)
+        await limiter.acquire(6000)
+
+        order = []
+
+        async def call(name, priority):
+            await limiter.acquire(20, priority)
+            order.append(name)
+
+        batch = asyncio.create_task(call("batch", PRIORITY_BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 2
+
+        await asyncio.wait_for(asyncio.gather(batch, interactive), timeout=2.0)
+        assert order == ["interactive", "batch"]
+        stats = limiter.stats()
+        assert stats["queued"] == 2
+        assert stats["max_queue_depth"] == 2
+        assert stats["wait_seconds_max"] > 0
+
+    @pytest.mark.asyncio
+    async def test_settle_returns_unused_tokens(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+        reservation = await limiter.acquire(6000)
+        reservation.settle(1000)
+        reservation.settle(10)  # only the first correction counts
+
+        follow_up = await asyncio.wait_for(limiter.acquire(4900), timeout=0.1)
+        assert follow_up.waited == 0.0
+        assert limiter.stats()["tokens_used"] == 1000
+
+    @pytest.mark.asyncio
+    async def test_oversized_request_is_clamped_to_capacity(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1000)
+        reservation = await asyncio.wait_for(limiter.acquire(50000), timeout=0.1)
+        assert reservation.tokens == 1000
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+        await limiter.acquire(600)
+        waiter = asyncio.create_task(limiter.acquire(600))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_pause_holds_admissions(self):
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+        limiter.pause(0.2)
+        reservation = await asyncio.wait_for(limiter.acquire(10), timeout=1.0)
+        assert reservation.waited >= 0.15
+        assert limiter.stats()["rate_limit_errors"] == 1
+
+
+class TestCallOpenAIGPTRateLimits:
+    """Test that upstream 429s are queued instead of answered with fallback content"""
+
+    def backend(self, **config):
+        fake_app = create_fake_app(FakeServerConfig(latency_ms=0, completion_text="real article", **config))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake_app),
+        )
+        return fake_app, shared
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_call_is_retried_not_faked(self):
+        import real_api_server
+
+        fake_app, shared = self.backend(rate_limited_requests=2, retry_after_seconds=0.05)
+        limiter = RateLimiter()
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", limiter):
+            content = await real_api_server.call_openai_gpt("Write about limits")
+        await shared.close()
+
+        assert content == "real article"
+        assert fake_app.state.request_count == 3
+        stats = limiter.stats()
+        assert stats["rate_limit_errors"] == 2
+        assert stats["admitted"] == 3
+
+    @pytest.mark.asyncio
+    async def test_usage_corrects_the_token_estimate(self):
+        import real_api_server
+
+        fake_app, shared = self.backend()
+        limiter = RateLimiter()
+        tokens = []
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", limiter):
+            await real_api_server.call_openai_gpt("Write about limits", "system")
+            await real_api_server.call_openai_gpt("Write about limits", "system", on_token=tokens.append)
+        await shared.close()
+
+        stats = limiter.stats()
+        assert tokens == ["real", " article"]
+        assert 0 < stats["tokens_used"] < stats["tokens_estimated"]
+        # The unused part of both reservations was handed back to the bucket
+        assert stats["available_tokens"] >= stats["tokens_per_minute"] - stats["tokens_used"] - 1
+
+    @pytest.mark.asyncio
+    async def test_persistent_rate_limit_falls_back(self):
+        import real_api_server
+
+        fake_app, shared = self.backend(rate_limited_requests=100, retry_after_seconds=0.01)
+        with patch.object(real_api_server, "llm_client", shared), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", RateLimiter()):
+            content = await real_api_server.call_openai_gpt("Research the topic")
+        await shared.close()
+
+        assert "Research Summary" in content
+        assert fake_app.state.request_count == real_api_server.RATE_LIMIT_RETRIES + 1
@@ -285,6 +285,61 @@ class TestConcurrency:
         task_ids = [response.json()["task_id"] for response in responses]
         assert len(set(task_ids)) == len(task_ids)
 
+class TestSingleFlight:
+    """Test coalescing of identical content creation requests"""
+    
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_task(self, sample_user_input):
+        import real_api_server
+        from job_queue import JobQueue
+        from real_api_server import UserInput, create_content, load_task_status, process_ai_content_creation
+        
+        calls = []
+        
+        async def fake_call(prompt, system_prompt=None, **kwargs):
+            calls.append(prompt)
+            return "generated content"
+        
+        # No workers: jobs stay queued until the test runs them itself
+        queue = JobQueue(workers=0)
+        before = real_api_server.coalesce_stats["coalesced_requests"]
+        with patch.object(real_api_server, "job_queue", queue):
+            first = await create_content(UserInput(**sample_user_input))
+            
+            # Same request with different whitespace and casing
+            variant = dict(sample_user_input, topic="  artificial intelligence   in HEALTHCARE ")
+            second = await create_content(UserInput(**variant))
+            
+            assert first["coalesced"] is False
+            assert second["coalesced"] is True
+            assert second["task_id"] != first["task_id"]
+            assert queue.stats()["queued"] == 1
+            assert load_task_status(second["task_id"]).queue_position == 1
+            assert real_api_server.coalesce_stats["coalesced_requests"] == before + 1
+            
+            with patch.object(real_api_server, "call_openai_gpt", fake_call):
+                await process_ai_content_creation(first["task_id"], UserInput(**sample_user_input))
+            
+            assert len(calls) == 5
+            primary = load_task_status(first["task_id"])
+            alias = load_task_status(second["task_id"])
+            assert alias.task_id == second["task_id"]
+            assert alias.status == primary.status == "completed"
+            assert alias.final_result == primary.final_result
+            
+            # Once the shared task has finished, a new request starts fresh work
+            third = await create_content(UserInput(**sample_user_input))
+            assert third["coalesced"] is False
+            assert queue.stats()["submitted"] == 2
+        real_api_server.inflight_tasks.clear()
+    
+    def test_bypass_cache_is_not_coalesced_with_cached_request(self, sample_user_input):
+        from real_api_server import UserInput, normalize_input
+        
+        cached = normalize_input(UserInput(**sample_user_input))
+        fresh = normalize_input(UserInput(**sample_user_input, bypass_cache=True))
+        assert cached != fresh
+
 # Test configuration and fixtures
 @pytest.fixture(scope="session")
 def event_loop():
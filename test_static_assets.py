@@ -0,0 +1,108 @@
+"""
+Unit Tests for In-Memory Frontend Assets
+Tests static_assets.py and the `/` and `/static` routes in real_api_server.py
+"""
+
+import gzip
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from download_cache import brotli
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssets, create_static_assets
+
+SCRIPT = b"function render(){return document.getElementById('root')}\n" * 200
+INDEX = b"<!doctype html><html><head><script src=\"/static/js/main.3f2a9c1b.js\"></script></head>" + b"<div></div>" * 100 + b"</html>"
+PNG = bytes(range(256)) * 8
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "static" / "media").mkdir()
+    (tmp_path / "index.html").write_bytes(INDEX)
+    (tmp_path / "static" / "js" / "main.3f2a9c1b.js").write_bytes(SCRIPT)
+    (tmp_path / "static" / "media" / "logo.5d5d9eef.png").write_bytes(PNG)
+    return tmp_path
+
+
+class TestStaticAssets:
+    """Test loading, precompression and cache policies"""
+
+    def test_loads_build_into_memory(self, build_dir):
+        assets = StaticAssets(str(build_dir)).load()
+        assert len(assets) == 3
+        assert assets.stats["bytes"] == len(INDEX) + len(SCRIPT) + len(PNG)
+        assert assets.stats["compressed_bytes"] < assets.stats["bytes"]
+
+        # Served from memory even after the build directory changes
+        (build_dir / "index.html").write_bytes(b"changed")
+        assert assets.get("index.html").bodies["identity"] == INDEX
+
+    def test_compressible_assets_are_precompressed(self, build_dir):
+        assets = StaticAssets(str(build_dir)).load()
+        script = assets.get("static/js/main.3f2a9c1b.js")
+        assert gzip.decompress(script.bodies["gzip"]) == SCRIPT
+        if brotli is not None:
+            assert brotli.decompress(script.bodies["br"]) == SCRIPT
+        assert set(assets.get("static/media/logo.5d5d9eef.png").bodies) == {"identity"}
+
+    def test_hashed_assets_are_immutable(self, build_dir):
+        assets = StaticAssets(str(build_dir)).load()
+        assert assets.get("static/js/main.3f2a9c1b.js").cache_control == IMMUTABLE_CACHE_CONTROL
+        assert assets.get("index.html").cache_control == REVALIDATE_CACHE_CONTROL
+        assert assets.get("static/js/../../index.html") is None
+
+    def test_missing_build_disables_assets(self, tmp_path):
+        assert create_static_assets(str(tmp_path / "missing")) is None
+
+
+class TestFrontendRoutes:
+    """Test GET / and GET /static/{path}"""
+
+    @pytest.fixture
+    def client(self, build_dir):
+        import real_api_server
+
+        with patch.object(real_api_server, "frontend_assets", StaticAssets(str(build_dir)).load()):
+            yield TestClient(real_api_server.app)
+
+    def test_index_negotiates_encoding_and_revalidates(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+        assert response.content == INDEX
+
+        cached = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+
+    @pytest.mark.skipif(brotli is None, reason="brotli not installed")
+    def test_hashed_script_is_brotli_and_immutable(self, client):
+        response = client.get("/static/js/main.3f2a9c1b.js", headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert "javascript" in response.headers["content-type"]
+        assert response.content == SCRIPT
+
+    def test_binary_asset_and_missing_path(self, client):
+        response = client.get("/static/media/logo.5d5d9eef.png", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == PNG
+        assert client.get("/static/js/missing.js").status_code == 404
+        assert client.get("/static/../index.html").status_code == 404
+
+    def test_falls_back_to_status_page_without_build(self):
+        import real_api_server
+
+        with patch.object(real_api_server, "frontend_assets", None):
+            response = TestClient(real_api_server.app).get("/")
+        assert response.status_code == 200
+        assert "AI Content Creation System" in response.text
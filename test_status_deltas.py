@@ -0,0 +1,116 @@
+"""
+Unit Tests for Projected and Delta Status Responses
+Tests fields=, since= and ETag handling of GET /api/content/status/{task_id} in real_api_server.py
+"""
+
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ARTICLE = "# Deltas\n\n" + "Only changed fields are sent. " * 300
+
+
+@pytest.fixture
+def task():
+    import real_api_server
+
+    task_id = "status-delta-test"
+    real_api_server.task_storage.create(task_id, real_api_server.ProcessingStatus(
+        task_id=task_id, status="processing", current_step=1, current_operation="researching"
+    ).model_dump())
+    yield task_id
+    real_api_server.task_storage.delete(task_id)
+
+
+@pytest.fixture
+def client():
+    from real_api_server import app
+    return TestClient(app)
+
+
+def complete(task_id: str):
+    import real_api_server
+
+    real_api_server.task_storage.set_result(task_id, {"markdown_content": ARTICLE})
+    real_api_server.task_storage.update(task_id, status="completed", current_operation="done")
+
+
+class TestStatusProjection:
+    """Test ?fields="""
+
+    def test_projects_requested_fields(self, client, task):
+        body = client.get(f"/api/content/status/{task}", params={"fields": "status,current_step"}).json()
+        assert body == {"task_id": task, "version": 1, "status": "processing", "current_step": 1}
+
+    def test_final_result_only_when_requested(self, client, task):
+        complete(task)
+        slim = client.get(f"/api/content/status/{task}", params={"fields": "status"})
+        full = client.get(f"/api/content/status/{task}")
+        assert "final_result" not in slim.json()
+        assert full.json()["final_result"]["markdown_content"] == ARTICLE
+        assert len(slim.content) * 20 < len(full.content)
+
+    def test_unknown_field_is_rejected(self, client, task):
+        response = client.get(f"/api/content/status/{task}", params={"fields": "status,secret"})
+        assert response.status_code == 400
+        assert "secret" in response.json()["detail"]
+
+
+class TestStatusVersions:
+    """Test version, ETag / If-None-Match and ?since="""
+
+    def test_etag_follows_version(self, client, task):
+        import real_api_server
+
+        first = client.get(f"/api/content/status/{task}")
+        assert first.json()["version"] == 1
+        cached = client.get(f"/api/content/status/{task}", headers={"If-None-Match": first.headers["etag"]})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        real_api_server.task_storage.update(task, current_step=2)
+        changed = client.get(f"/api/content/status/{task}", headers={"If-None-Match": first.headers["etag"]})
+        assert changed.status_code == 200
+        assert changed.json()["version"] == 2
+        assert changed.headers["etag"] != first.headers["etag"]
+
+    def test_since_returns_only_changed_fields(self, client, task):
+        import real_api_server
+
+        real_api_server.task_storage.update(task, current_step=2, current_operation="structuring")
+        delta = client.get(f"/api/content/status/{task}", params={"since": 1}).json()
+        assert delta == {"task_id": task, "version": 2, "current_step": 2, "current_operation": "structuring"}
+
+        unchanged = client.get(f"/api/content/status/{task}", params={"since": 2})
+        assert unchanged.status_code == 200  # not a conditional request, so no 304
+        assert unchanged.json() == {"task_id": task, "version": 2}
+        conditional = client.get(
+            f"/api/content/status/{task}", params={"since": 2}, headers={"If-None-Match": unchanged.headers["etag"]}
+        )
+        assert conditional.status_code == 304
+
+        complete(task)
+        done = client.get(f"/api/content/status/{task}", params={"since": 2}).json()
+        assert set(done) == {"task_id", "version", "status", "current_operation", "final_result"}
+        assert done["final_result"]["markdown_content"] == ARTICLE
+
+    def test_since_zero_is_the_full_status(self, client, task):
+        assert client.get(f"/api/content/status/{task}", params={"since": 0}).json() == \
+            client.get(f"/api/content/status/{task}").json()
+
+    def test_since_and_fields_combine(self, client, task):
+        import real_api_server
+
+        real_api_server.task_storage.update(task, current_step=2, current_operation="structuring")
+        delta = client.get(f"/api/content/status/{task}", params={"since": 1, "fields": "current_step,status"}).json()
+        assert delta == {"task_id": task, "version": 2, "current_step": 2}
+        assert client.get(
+            f"/api/content/status/{task}", params={"since": 1, "fields": "status"}
+        ).json() == {"task_id": task, "version": 2}
+
+    def test_missing_task(self, client):
+        assert client.get("/api/content/status/missing", params={"since": 1}).status_code == 404
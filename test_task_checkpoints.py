@@ -0,0 +1,280 @@
+"""
+Unit Tests for Crash-Safe Task Checkpoints
+Tests task_checkpoints.py, resuming pipelines from completed steps and real_api_server.py
+recovering tasks from a worker process that was killed mid-pipeline
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from job_queue import JobQueue
+from llm_client import LLMClientConfig, SharedLLMClient
+from pipeline import PipelineStep, run_pipeline
+from task_checkpoints import TaskCheckpoints
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTaskCheckpoints:
+    """Test step storage, leases and claiming"""
+
+    def test_steps_are_kept_until_finished(self, tmp_path):
+        store = TaskCheckpoints(str(tmp_path / "c.db"))
+        store.start("t1", {"topic": "Checkpoints"}, 1.0)
+        store.save_step("t1", "research", "Notes")
+        store.save_step("t1", "image_concepts", ["one", "two"])
+
+        reopened = TaskCheckpoints(str(tmp_path / "c.db"))
+        assert reopened.steps("t1") == {"research": "Notes", "image_concepts": ["one", "two"]}
+
+        store.finish("t1")
+        assert reopened.steps("t1") == {}
+        assert reopened.stats()["unfinished"] == 0
+
+    def test_orphans_are_claimed_after_the_lease(self, tmp_path):
+        clock = FakeClock()
+        crashed = TaskCheckpoints(str(tmp_path / "c.db"), lease_seconds=10, clock=clock)
+        survivor = TaskCheckpoints(str(tmp_path / "c.db"), lease_seconds=10, clock=clock)
+        crashed.start("t1", {"topic": "Lease"}, 5.0)
+
+        clock.now += 9
+        assert survivor.claim_orphans() == []
+        crashed.heartbeat()
+        clock.now += 9
+        assert survivor.claim_orphans() == []
+
+        clock.now += 2
+        [task] = survivor.claim_orphans()
+        assert task.task_id == "t1"
+        assert task.input == {"topic": "Lease"}
+        assert task.submitted_at == 5.0
+        assert task.resumes == 1
+        assert survivor.claim_orphans() == []  # now owned and heartbeating
+
+    def test_released_tasks_are_claimable_at_once(self, tmp_path):
+        stopping = TaskCheckpoints(str(tmp_path / "c.db"))
+        starting = TaskCheckpoints(str(tmp_path / "c.db"))
+        stopping.start("t1", {"topic": "A"}, 1.0)
+        stopping.start("t2", {"topic": "B"}, 2.0)
+        assert starting.claim_orphans() == []
+
+        stopping.release()
+        assert [task.task_id for task in starting.claim_orphans()] == ["t1", "t2"]
+        starting.release("t2")
+        [task] = stopping.claim_orphans()
+        assert task.task_id == "t2"
+        assert task.resumes == 0  # clean releases are not crashes
+
+    def test_only_expired_leases_count_as_resumes(self, tmp_path):
+        clock = FakeClock()
+        first = TaskCheckpoints(str(tmp_path / "c.db"), lease_seconds=10, clock=clock)
+        second = TaskCheckpoints(str(tmp_path / "c.db"), lease_seconds=10, clock=clock)
+        first.start("t1", {"topic": "Deploys"}, 1.0)
+        for _ in range(5):  # graceful restarts
+            first.release()
+            [task] = second.claim_orphans()
+            first, second = second, first
+        assert task.resumes == 0
+
+        clock.now += 11  # the owner crashed
+        [task] = second.claim_orphans()
+        assert task.resumes == 1
+        second.release()
+        [task] = first.claim_orphans()
+        assert task.resumes == 1
+
+
+class TestResumedPipeline:
+    """Test run_pipeline(completed=...)"""
+
+    @pytest.mark.asyncio
+    async def test_completed_steps_are_not_run(self):
+        calls = []
+
+        async def research():
+            calls.append("research")
+            return "fresh"
+
+        async def article(research):
+            calls.append("article")
+            return f"article from {research}"
+
+        started = []
+        results = await run_pipeline(
+            [PipelineStep("research", research), PipelineStep("article", article, inputs=["research"])],
+            on_step_start=lambda step: started.append(step.name),
+            completed={"research": "saved"},
+        )
+
+        assert calls == started == ["article"]
+        assert results == {"research": "saved", "article": "article from saved"}
+
+
+CRASHING_WORKER = textwrap.dedent("""
+    import asyncio, os, sys, time
+    import httpx
+    import real_api_server
+    from fake_openai_server import FakeServerConfig, create_fake_app
+    from llm_client import LLMClientConfig, SharedLLMClient
+
+    crash_after = int(sys.argv[1])
+    fake = create_fake_app(FakeServerConfig(completion_text="# Title\\n\\nText."))
+    real_api_server.llm_client = SharedLLMClient(
+        LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+        transport=httpx.ASGITransport(app=fake),
+    )
+    real_api_server.response_cache = real_api_server.rate_limiter = None
+    real_api_server.circuit_breakers = real_api_server.hedging = None
+
+    store, saved = real_api_server.checkpoints, []
+    save_step = store.save_step
+    def save_then_crash(task_id, step, output):
+        save_step(task_id, step, output)
+        saved.append(step)
+        if len(saved) == crash_after:
+            os._exit(137)  # like a SIGKILL: no cleanup, no release
+    store.save_step = save_then_crash
+
+    input_data = real_api_server.UserInput(topic="Crash recovery")
+    store.start("crashed-task", input_data.model_dump(), time.time())
+    real_api_server.task_storage.create("crashed-task", {"status": "queued", "current_step": 0, "current_operation": ""})
+    asyncio.run(real_api_server.process_ai_content_creation("crashed-task", input_data))
+""")
+
+
+def run_crashing_worker(checkpoint_path: str, crash_after: int) -> int:
+    env = dict(os.environ, CHECKPOINT_PATH=checkpoint_path, CHECKPOINT_LEASE_SECONDS="60",
+               TASK_STORE="memory", LLM_CACHE_ENABLED="0")
+    return subprocess.run(
+        [sys.executable, "-c", CRASHING_WORKER, str(crash_after)], cwd=ROOT, env=env,
+        capture_output=True, timeout=60
+    ).returncode
+
+
+def fake_llm_client(fake) -> SharedLLMClient:
+    return SharedLLMClient(
+        LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+        transport=httpx.ASGITransport(app=fake),
+    )
+
+
+class TestCrashRecovery:
+    """Kill a worker process mid-pipeline and resume its task in another process"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("crash_after", [1, 3])
+    async def test_resumed_task_does_not_repeat_completed_steps(self, tmp_path, crash_after):
+        import real_api_server
+
+        path = str(tmp_path / "checkpoints.db")
+        assert run_crashing_worker(path, crash_after) == 137
+
+        # The killed process never released its task; a zero lease stands in for waiting it out
+        store = TaskCheckpoints(path, lease_seconds=0)
+        saved = store.steps("crashed-task")
+        assert len(saved) == crash_after
+
+        fake = create_fake_app(FakeServerConfig(completion_text="# Title\n\nText."))
+        queue = JobQueue(workers=1)
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "circuit_breakers", None), \
+                patch.object(real_api_server, "hedging", None), \
+                patch.object(real_api_server, "job_queue", queue), \
+                patch.object(real_api_server, "checkpoints", store):
+            assert real_api_server.resume_checkpointed_tasks() == 1
+            for _ in range(500):
+                record = real_api_server.task_storage.get("crashed-task")
+                if record["status"] in ("completed", "error"):
+                    break
+                await asyncio.sleep(0.01)
+            await queue.close()
+            result = real_api_server.task_storage.get_result("crashed-task")
+        real_api_server.task_storage.delete("crashed-task")
+
+        assert record["status"] == "completed"
+        assert fake.state.request_count == len(real_api_server.STEP_ROUTES) - crash_after
+        step_models = result["metadata"]["step_models"]
+        assert {step for step, model in step_models.items() if model == "checkpoint"} == set(saved)
+        assert store.stats()["unfinished"] == 0
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_resumes(self, tmp_path):
+        import real_api_server
+
+        clock = FakeClock()
+        # Two worker processes that take the task over from each other
+        workers = [TaskCheckpoints(str(tmp_path / "c.db"), lease_seconds=10, clock=clock) for _ in range(2)]
+        workers[0].start("poison-task", {"topic": "Poison"}, 1.0)
+        queue = JobQueue(workers=0)
+        with patch.object(real_api_server, "job_queue", queue):
+            for attempt in range(1, real_api_server.CHECKPOINT_MAX_RESUMES + 2):
+                clock.now += 11  # the worker running it died
+                with patch.object(real_api_server, "checkpoints", workers[attempt % 2]):
+                    resumed = real_api_server.resume_checkpointed_tasks()
+                assert resumed == (0 if attempt > real_api_server.CHECKPOINT_MAX_RESUMES else 1)
+            record = real_api_server.task_storage.get("poison-task")
+        real_api_server.task_storage.delete("poison-task")
+        real_api_server.inflight_tasks.clear()
+
+        assert record["status"] == "error"
+        assert "resumes" in record["error"]
+        assert workers[0].stats()["unfinished"] == 0
+
+
+class TestInterruption:
+    """Test that shutdown keeps a running task's checkpoint but a user cancel drops it"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cancelled_by_user", [False, True])
+    async def test_cancellation(self, tmp_path, cancelled_by_user):
+        import real_api_server
+
+        store = TaskCheckpoints(str(tmp_path / "c.db"))
+        fake = create_fake_app(FakeServerConfig(latency_ms=10000))
+        input_data = real_api_server.UserInput(topic="Interrupted")
+        queue = JobQueue(workers=1)
+        with patch.object(real_api_server, "llm_client", fake_llm_client(fake)), \
+                patch.object(real_api_server, "response_cache", None), \
+                patch.object(real_api_server, "rate_limiter", None), \
+                patch.object(real_api_server, "job_queue", queue), \
+                patch.object(real_api_server, "checkpoints", store):
+            real_api_server.task_storage.create("interrupted-task", {
+                "status": "queued", "current_step": 0, "current_operation": ""
+            })
+            store.start("interrupted-task", input_data.model_dump(), 1.0)
+            store.save_step("interrupted-task", "research", "Saved notes")
+            queue.submit("interrupted-task", real_api_server.process_ai_content_creation, "interrupted-task", input_data)
+            while fake.state.request_count == 0:
+                await asyncio.sleep(0.01)
+            if cancelled_by_user:
+                await real_api_server.cancel_task("interrupted-task")
+            await queue.close()
+            record = real_api_server.task_storage.get("interrupted-task")
+        real_api_server.task_storage.delete("interrupted-task")
+
+        if cancelled_by_user:
+            assert record["status"] == "cancelled"
+            assert store.stats()["unfinished"] == 0
+        else:
+            assert record["status"] == "queued"
+            assert store.steps("interrupted-task") == {"research": "Saved notes"}
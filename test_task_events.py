@@ -0,0 +1,221 @@
+"""
+Unit Tests for Task Event Streaming
+Tests task_events.TaskEventHub and the SSE endpoint in real_api_server.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeServerConfig, create_fake_app
+from llm_client import LLMClientConfig, SharedLLMClient
+from task_events import OVERFLOW_EVENT, TaskEventHub, format_sse
+
+
+def parse_sse(body: str):
+    """Turn an SSE body into a list of (event, data) pairs"""
+    events = []
+    for message in body.split("\n\n"):
+        lines = [line for line in message.splitlines() if not line.startswith(":")]
+        if not lines:
+            continue
+        fields = dict(line.split(": ", 1) for line in lines)
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestTaskEventHub:
+    """Test fan-out and backpressure"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_all_subscribers(self):
+        hub = TaskEventHub()
+        first, second = hub.subscribe("t1"), hub.subscribe("t1")
+        other = hub.subscribe("t2")
+
+        hub.publish("t1", "token", {"delta": "hi"})
+        hub.close("t1")
+
+        for subscription in (first, second):
+            assert await subscription.get(timeout=1) == ("token", {"delta": "hi"})
+            assert await subscription.get(timeout=1) is None
+        assert other.queue.empty()
+        assert hub.subscriber_count("t1") == 0
+        assert hub.subscriber_count("t2") == 1
+
+    def test_publish_without_subscribers_is_noop(self):
+        hub = TaskEventHub()
+        hub.publish("nobody", "token", {"delta": "x"})
+        assert hub.subscriber_count("nobody") == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_overflows_instead_of_buffering(self):
+        hub = TaskEventHub(max_queue_size=4)
+        slow = hub.subscribe("t1")
+        for i in range(10):
+            hub.publish("t1", "token", {"delta": str(i)})
+
+        assert slow.queue.qsize() <= 4
+        assert (await slow.get(timeout=1))[0] == OVERFLOW_EVENT
+        assert await slow.get(timeout=1) is None
+        assert hub.subscriber_count("t1") == 0
+
+    def test_format_sse(self):
+        assert format_sse("token", {"delta": "a"}) == 'event: token\ndata: {"delta": "a"}\n\n'
+
+
+class TestStreamEndpoint:
+    """Test GET /api/content/stream/{task_id}"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_subscribers_receive_tokens(self):
+        import real_api_server
+        from real_api_server import ProcessingStatus, UserInput, process_ai_content_creation
+
+        fake_app = create_fake_app(FakeServerConfig(latency_ms=50, token_delay_ms=1, completion_text="one two three"))
+        shared = SharedLLMClient(
+            LLMClientConfig(api_key="sk-test", base_url="http://fake/v1", max_retries=0),
+            transport=httpx.ASGITransport(app=fake_app),
+        )
+        task_id = "sse-test"
+        real_api_server.task_storage.create(task_id, ProcessingStatus(
+            task_id=task_id, status="processing", current_step=1, current_operation="starting"
+        ).model_dump())
+
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with patch.object(real_api_server, "llm_client", shared), \
+                    patch.object(real_api_server, "response_cache", None):
+                subscribers = [
+                    asyncio.ensure_future(client.get(f"/api/content/stream/{task_id}")) for _ in range(3)
+                ]
+                await asyncio.sleep(0.02)
+                await process_ai_content_creation(task_id, UserInput(topic="Streaming"))
+                responses = await asyncio.gather(*subscribers)
+        await shared.close()
+        real_api_server.task_storage.delete(task_id)
+
+        for response in responses:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse(response.text)
+            names = [name for name, _ in events]
+            assert names[0] == "status"
+            assert names[-1] == "done"
+            assert names.count("step_start") == 5
+            assert names.count("step_end") == 5
+            article = "".join(data["delta"] for name, data in events if name == "token" and data["step"] == "article")
+            assert article == "one two three"
+
+    @pytest.mark.asyncio
+    async def test_finished_task_sends_done_immediately(self):
+        import real_api_server
+        from real_api_server import ProcessingStatus
+
+        task_id = "sse-finished"
+        real_api_server.task_storage.create(task_id, ProcessingStatus(
+            task_id=task_id, status="completed", current_step=5, current_operation="done"
+        ).model_dump())
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/api/content/stream/{task_id}")
+            missing = await client.get("/api/content/stream/missing")
+        real_api_server.task_storage.delete(task_id)
+
+        assert [name for name, _ in parse_sse(response.text)] == ["status", "done"]
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_does_not_leak_a_subscription(self):
+        import real_api_server
+
+        # A coalesced request whose source task expired: the alias resolves, the lookup fails
+        real_api_server.task_storage.create("sse-dangling", {"task_id": "sse-dangling", "alias_of": "sse-expired"})
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/content/stream/sse-dangling")
+        real_api_server.task_storage.delete("sse-dangling")
+
+        assert response.status_code == 404
+        assert real_api_server.event_hub.subscriber_count("sse-expired") == 0
+
+    @pytest.mark.asyncio
+    async def test_task_in_another_worker_is_followed_through_the_store(self):
+        import real_api_server
+        from real_api_server import ProcessingStatus
+
+        task_id = "sse-remote"
+        real_api_server.task_storage.create(task_id, {
+            **ProcessingStatus(task_id=task_id, status="processing", current_step=1, current_operation="x").model_dump(),
+            "worker_pid": -1,
+        })
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.05)
+            real_api_server.task_storage.update(task_id, step_timings={"research": 1.0})
+            await asyncio.sleep(0.05)
+            real_api_server.task_storage.update(task_id, status="completed")
+
+        transport = httpx.ASGITransport(app=real_api_server.app)
+        with patch.object(real_api_server, "SSE_POLL_SECONDS", 0.01):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response, _ = await asyncio.gather(
+                    client.get(f"/api/content/stream/{task_id}"), finish_elsewhere()
+                )
+        real_api_server.task_storage.delete(task_id)
+
+        events = parse_sse(response.text)
+        assert [name for name, _ in events] == ["status", "step_end", "done"]
+        assert events[1][1] == {"step": "research", "duration": 1.0}
+
+
+class TestProgressSocket:
+    """Test the /api/content/ws/{task_id} push channel"""
+
+    def test_sends_snapshot_then_only_changed_fields(self):
+        import real_api_server
+        from fastapi.testclient import TestClient
+        from real_api_server import ProcessingStatus
+
+        task_id = "ws-test"
+        real_api_server.task_storage.create(task_id, ProcessingStatus(
+            task_id=task_id, status="processing", current_step=1, current_operation="researching"
+        ).model_dump())
+
+        with patch.object(real_api_server, "WS_REFRESH_SECONDS", 0.02):
+            client = TestClient(real_api_server.app)
+            with client.websocket_connect(f"/api/content/ws/{task_id}") as socket:
+                snapshot = socket.receive_json()
+                real_api_server.task_storage.update(task_id, current_step=2, current_operation="structuring")
+                progress = socket.receive_json()
+                real_api_server.task_storage.set_result(task_id, {"markdown_content": "# Done"})
+                real_api_server.task_storage.update(task_id, status="completed")
+                final = socket.receive_json()
+        real_api_server.task_storage.delete(task_id)
+
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["fields"]["status"] == "processing"
+        assert "final_result" not in snapshot["fields"]
+        assert progress == {"type": "update", "fields": {"current_step": 2, "current_operation": "structuring"}}
+        assert final == {
+            "type": "update",
+            "fields": {"status": "completed", "final_result": {"markdown_content": "# Done"}},
+        }
+
+    def test_unknown_task_is_closed(self):
+        import real_api_server
+        from fastapi.testclient import TestClient
+        from starlette.websockets import WebSocketDisconnect
+
+        client = TestClient(real_api_server.app)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect("/api/content/ws/missing") as socket:
+                socket.receive_json()
+        assert closed.value.code == 4404
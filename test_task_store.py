@@ -0,0 +1,252 @@
+"""
+Unit Tests for the Task Store
+Tests the in-memory LRU+TTL store and the SQLite store
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from task_store import InMemoryTaskStore, SQLiteTaskStore, create_task_store, field_version
+
+
+@pytest.fixture(params=["memory", "memory_offload", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemoryTaskStore(max_tasks=100, ttl_seconds=60)
+    elif request.param == "memory_offload":
+        store = InMemoryTaskStore(max_tasks=100, ttl_seconds=60, result_dir=str(tmp_path / "results"))
+    else:
+        store = SQLiteTaskStore(str(tmp_path / "tasks.db"), ttl_seconds=60)
+    yield store
+    store.close()
+
+
+class TestTaskStoreContract:
+    """Behaviour shared by every TaskStore implementation"""
+
+    def test_create_get_update(self, store):
+        store.create("t1", {"status": "processing", "current_step": 1})
+        store.update("t1", current_step=2, current_operation="writing")
+
+        record = store.get("t1")
+        assert record == {
+            "status": "processing", "current_step": 2, "current_operation": "writing",
+            "version": 2, "field_versions": {"current_step": 2, "current_operation": 2},
+        }
+        assert "t1" in store
+        assert "missing" not in store
+        assert store.get("missing") is None
+
+    def test_versions_track_each_field(self, store):
+        store.create("t1", {"status": "queued", "current_step": 0})
+        assert store.get("t1")["version"] == 1
+        store.update("t1", status="processing")
+        store.update("t1", current_step=1)
+        store.update("t1", current_step=2)
+
+        record = store.get("t1")
+        assert record["version"] == 4
+        assert field_version(record, "status") == 2
+        assert field_version(record, "current_step") == 4
+        assert field_version(record, "error") == 1
+
+    def test_update_nested_and_null_values(self, store):
+        store.create("t1", {"status": "processing", "error": None, "step_results": {}})
+        store.update("t1", step_results={"1": {"points": ["a", "b"]}}, step_timings={"research": 1.5})
+        store.update("t1", status="error", error=None)
+
+        record = store.get("t1")
+        assert record["step_results"] == {"1": {"points": ["a", "b"]}}
+        assert record["step_timings"] == {"research": 1.5}
+        assert record["status"] == "error"
+        assert "error" in record and record["error"] is None
+
+    def test_get_returns_a_copy(self, store):
+        store.create("t1", {"status": "processing"})
+        store.get("t1")["status"] = "tampered"
+        assert store.get("t1")["status"] == "processing"
+
+    def test_result_is_stored_separately(self, store):
+        store.create("t1", {"status": "processing"})
+        store.set_result("t1", {"content": "x" * 10000})
+        assert "content" not in store.get("t1")
+        assert store.get_result("t1") == {"content": "x" * 10000}
+
+    def test_update_unknown_task_is_ignored(self, store):
+        store.update("missing", status="completed")
+        assert store.get("missing") is None
+
+    def test_delete_and_items(self, store):
+        store.create("t1", {"status": "completed"})
+        store.create("t2", {"status": "processing"})
+        store.set_result("t1", {"content": "a"})
+        store.delete("t1")
+        assert store.get_result("t1") is None
+        assert [task_id for task_id, _ in store.items()] == ["t2"]
+        assert len(store) == 1
+
+
+class TestInMemoryEviction:
+    """Test LRU and TTL eviction"""
+
+    def test_lru_evicts_finished_tasks_only(self):
+        store = InMemoryTaskStore(max_tasks=3, ttl_seconds=60)
+        store.create("running", {"status": "processing"})
+        for i in range(5):
+            store.create(f"done-{i}", {"status": "completed"})
+
+        assert len(store) == 3
+        assert "running" in store
+        assert "done-4" in store
+        assert "done-0" not in store
+
+    def test_recently_read_task_survives(self):
+        store = InMemoryTaskStore(max_tasks=2, ttl_seconds=60)
+        store.create("a", {"status": "completed"})
+        store.create("b", {"status": "completed"})
+        store.get("a")
+        store.create("c", {"status": "completed"})
+        assert "a" in store
+        assert "b" not in store
+
+    def test_ttl_expires_finished_tasks(self, tmp_path):
+        store = InMemoryTaskStore(ttl_seconds=10, result_dir=str(tmp_path))
+        store.create("done", {"status": "completed"})
+        store.set_result("done", {"content": "a"})
+        store.create("running", {"status": "processing"})
+
+        with patch("task_store.time.monotonic", return_value=time.monotonic() + 11):
+            assert store.get("done") is None
+            assert store.get("running") is not None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_stale_result_files_are_purged_on_start(self, tmp_path):
+        stale, fresh = tmp_path / "old-task.json", tmp_path / "new-task.json"
+        stale.write_text("{}")
+        fresh.write_text("{}")
+        os.utime(stale, (time.time() - 11, time.time() - 11))
+
+        InMemoryTaskStore(ttl_seconds=10, result_dir=str(tmp_path))
+        assert list(tmp_path.iterdir()) == [fresh]
+
+    def test_soak_memory_stays_bounded(self, tmp_path):
+        store = InMemoryTaskStore(max_tasks=500, ttl_seconds=3600, result_dir=str(tmp_path))
+        for i in range(20000):
+            task_id = f"task-{i}"
+            store.create(task_id, {"status": "processing", "current_step": 1})
+            store.update(task_id, current_step=5)
+            store.set_result(task_id, {"content": "article " * 50})
+            store.update(task_id, status="completed")
+
+        assert len(store) <= 501
+        assert store._results == {}
+        assert len(list(tmp_path.iterdir())) <= 501
+
+
+def _update_from_process(path: str, field: str, count: int):
+    store = SQLiteTaskStore(path)
+    for i in range(count):
+        store.update("shared", **{field: i})
+    store.close()
+
+
+class TestSQLiteStore:
+    """SQLite specific behaviour"""
+
+    def test_concurrent_processes_do_not_lose_fields(self, tmp_path):
+        path = str(tmp_path / "tasks.db")
+        store = SQLiteTaskStore(path)
+        store.create("shared", {"status": "processing"})
+
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_update_from_process, args=(path, f"field_{i}", 50)) for i in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+
+        record = store.get("shared")
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert {record[f"field_{i}"] for i in range(3)} == {49}
+        assert record["status"] == "processing"
+        store.close()
+
+    def test_wal_mode_and_shared_file(self, tmp_path):
+        path = str(tmp_path / "tasks.db")
+        writer, reader = SQLiteTaskStore(path), SQLiteTaskStore(path)
+        assert writer._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        writer.create("t1", {"status": "processing"})
+        writer.update("t1", status="completed")
+        writer.set_result("t1", {"content": "shared"})
+        assert reader.get("t1")["status"] == "completed"
+        assert reader.get_result("t1") == {"content": "shared"}
+        writer.close()
+        reader.close()
+
+    def test_purge_expired(self, tmp_path):
+        store = SQLiteTaskStore(str(tmp_path / "tasks.db"), ttl_seconds=10)
+        store.create("done", {"status": "completed"})
+        store.set_result("done", {"content": "a"})
+        store.create("running", {"status": "processing"})
+
+        with patch("task_store.time.time", return_value=time.time() + 11):
+            assert store.get("done") is None
+            store.purge_expired()
+        assert len(store) == 1
+        assert store.get_result("done") is None
+        store.close()
+
+
+class TestCreateTaskStore:
+    """Test environment based selection"""
+
+    def test_sqlite_selected(self, tmp_path):
+        env = {"TASK_STORE": "sqlite", "TASK_STORE_PATH": str(tmp_path / "t.db")}
+        with patch.dict(os.environ, env):
+            store = create_task_store()
+        assert isinstance(store, SQLiteTaskStore)
+        store.close()
+
+    def test_several_web_workers_default_to_sqlite(self, tmp_path):
+        env = {"WEB_CONCURRENCY": "4", "TASK_STORE_PATH": str(tmp_path / "t.db")}
+        with patch.dict(os.environ, env):
+            os.environ.pop("TASK_STORE", None)
+            store = create_task_store()
+        assert isinstance(store, SQLiteTaskStore)
+        store.close()
+
+    def test_unknown_store(self):
+        with patch.dict(os.environ, {"TASK_STORE": "redis"}):
+            with pytest.raises(ValueError):
+                create_task_store()
+
+
+class TestApiServerResults:
+    """Test that api_server keeps the article out of the status record"""
+
+    @pytest.mark.asyncio
+    async def test_publish_step_result_is_a_summary(self, tmp_path):
+        import api_server
+
+        store = InMemoryTaskStore(result_dir=str(tmp_path))
+        store.create("article-task", {"status": "queued", "current_step": 0, "step_results": {}})
+        workflow = AsyncMock(side_effect=RuntimeError("no API key"))  # falls back to the demo article
+        with patch.object(api_server, "active_tasks", store), \
+                patch.object(api_server, "create_enhanced_content_workflow", workflow, create=True), \
+                patch.object(api_server.asyncio, "sleep", AsyncMock()):
+            await api_server.run_content_creation("article-task", "Offloading", {})
+
+        record = store.get("article-task")
+        assert record["status"] == "completed"
+        assert record["step_results"]["4"]["seo_score"] == 8
+        assert "html_content" not in record["step_results"]["4"]
+        assert "markdown_content" not in record["step_results"]["4"]
+        assert store.get_result("article-task")["markdown_content"].startswith("# The Complete Guide")
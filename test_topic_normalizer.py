@@ -0,0 +1,223 @@
+"""
+Unit Tests for the Local Topic Normalizer
+Tests topic_normalizer.py and the user input step of both content workflows
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from topic_normalizer import (
+    BlockedTopicError, TopicNormalizer, create_topic_normalizer, openai_moderation, process_user_input,
+)
+
+
+def normalizer(**kwargs) -> TopicNormalizer:
+    """A normalizer whose moderation clears every topic"""
+    return TopicNormalizer(moderate=AsyncMock(return_value=False), **kwargs)
+
+
+class TestAnalyze:
+    """Test cleanup, rule-based defaults and confidence"""
+
+    @pytest.mark.parametrize("raw, topic", [
+        ("  artificial intelligence   in HEALTHCARE ", "Artificial intelligence in Healthcare"),
+        ("write an article about the future of renewable energy.", "The Future of Renewable Energy"),
+        ('"Quantum computing vs classical computing"', "Quantum computing vs classical computing"),
+        ("SEO FOR SAAS STARTUPS", "SEO for SaaS Startups"),
+        ("iPhone history", "iPhone history"),
+        ("AI", "AI"),
+    ])
+    def test_cleanup(self, raw, topic):
+        assert TopicNormalizer().analyze(raw).topic == topic
+
+    def test_rule_based_defaults(self):
+        normalizer = TopicNormalizer()
+        tutorial = normalizer.analyze("How to deploy a Python API on Kubernetes").fields
+        assert tutorial == {
+            "target_audience": "developers", "content_type": "tutorial", "content_length": "medium",
+            "tone": "professional", "include_technical_details": True,
+        }
+        quick = normalizer.analyze("A quick guide to composting for beginners").fields
+        assert (quick["target_audience"], quick["content_type"], quick["content_length"], quick["tone"]) == \
+            ("beginners", "guide", "short", "friendly")
+        assert normalizer.analyze("The impact of remote work on startups").fields["content_type"] == "analysis"
+
+    @pytest.mark.parametrize("raw", [
+        "stuff", "what should I write about? something cool", "https://example.com/some-post", "1234 5678",
+        "a " * 120 + "long topic",
+    ])
+    def test_unclear_topics_have_low_confidence(self, raw):
+        assert TopicNormalizer().analyze(raw).confidence < 0.6
+
+    def test_length_checks_and_blocklist(self):
+        normalizer = TopicNormalizer(blocklist=("forbidden thing",))
+        with pytest.raises(ValueError):
+            normalizer.analyze("  .  ")
+        with pytest.raises(ValueError):
+            normalizer.analyze("x" * 1001)
+        with pytest.raises(BlockedTopicError):
+            normalizer.analyze("Tell me about the FORBIDDEN   thing")
+        assert normalizer.stats()["blocked"] == 1
+
+    @pytest.mark.parametrize("raw", [
+        "How to kill weeds naturally", "how to kill a zombie process in Linux", "Malware analysis for beginners",
+    ])
+    def test_sensitive_wording_is_not_blocked(self, raw):
+        analysis = TopicNormalizer().analyze(raw)
+        assert analysis.confidence < 0.6
+        assert "sensitive wording" in analysis.reasons
+
+    def test_env_settings(self):
+        with patch.dict(os.environ, {"TOPIC_FAST_PATH": "0"}):
+            assert create_topic_normalizer() is None
+        with patch.dict(os.environ, {"TOPIC_CONFIDENCE_THRESHOLD": "0.9", "TOPIC_BLOCKLIST": "crypto pumps, "}):
+            normalizer = create_topic_normalizer()
+        assert normalizer.threshold == 0.9
+        with pytest.raises(BlockedTopicError):
+            normalizer.analyze("Best crypto pumps")
+
+
+class TestResolve:
+    """Test the local fast path, the agent fallback and memoization"""
+
+    @pytest.mark.asyncio
+    async def test_clean_topic_skips_the_agent_and_is_memoized(self):
+        from enhanced_content_system import UserInput
+
+        agent = AsyncMock()
+        topics = normalizer()
+        first, source = await topics.resolve("machine learning for beginners", UserInput, agent)
+        again, memo_source = await topics.resolve("  MACHINE LEARNING   for beginners ", UserInput, agent)
+
+        assert (source, memo_source) == ("local", "memo")
+        assert first == again
+        assert first.topic == "Machine Learning for Beginners"
+        assert first.target_audience == "beginners"
+        agent.assert_not_called()
+        topics.moderate.assert_awaited_once_with("Machine Learning for Beginners")
+
+    @pytest.mark.asyncio
+    async def test_unclear_topic_asks_the_agent_once(self):
+        from content_creation_system import UserInput
+
+        agent = AsyncMock(return_value=UserInput(topic="Home gardening ideas for small balconies"))
+        topics = normalizer()
+        for _ in range(3):
+            result, _ = await topics.resolve("stuff?", UserInput, agent)
+
+        assert result.topic == "Home gardening ideas for small balconies"
+        agent.assert_awaited_once_with("Stuff?")
+        topics.moderate.assert_not_called()  # the agent checks the topic itself
+        assert topics.stats() == {
+            "local": 0, "agent": 1, "memo": 2, "blocked": 0, "moderation_errors": 0, "memoized": 1,
+        }
+
+    @pytest.mark.asyncio
+    async def test_flagged_topic_is_blocked_without_the_agent(self):
+        from enhanced_content_system import UserInput
+
+        agent = AsyncMock()
+        topics = TopicNormalizer(moderate=AsyncMock(return_value=True))
+        with pytest.raises(BlockedTopicError):
+            await topics.resolve("A harmless sounding title", UserInput, agent)
+        agent.assert_not_called()
+        assert topics.stats()["blocked"] == 1
+        assert topics.stats()["memoized"] == 0
+
+    @pytest.mark.asyncio
+    async def test_moderation_failure_falls_back_to_the_agent(self):
+        from enhanced_content_system import UserInput
+
+        agent = AsyncMock(return_value=UserInput(topic="Solar power"))
+        topics = TopicNormalizer(moderate=AsyncMock(side_effect=RuntimeError("no API key")))
+        result, source = await topics.resolve("Solar power", UserInput, agent)
+
+        assert (result.topic, source) == ("Solar power", "agent")
+        agent.assert_awaited_once_with("Solar power")
+        assert topics.stats()["moderation_errors"] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("raw", ["How to kill weeds naturally", "how to kill a zombie process in Linux"])
+    async def test_sensitive_topics_go_to_the_agent(self, raw):
+        from enhanced_content_system import UserInput
+
+        agent = AsyncMock(side_effect=lambda topic: UserInput(topic=topic))
+        topics = normalizer()
+        result, source = await topics.resolve(raw, UserInput, agent)
+
+        assert (result.topic.lower(), source) == (raw.lower(), "agent")
+        topics.moderate.assert_not_called()
+        assert topics.stats()["blocked"] == 0
+
+    @pytest.mark.asyncio
+    async def test_without_a_moderator_the_agent_decides(self):
+        from enhanced_content_system import UserInput
+
+        agent = AsyncMock(return_value=UserInput(topic="Solar power"))
+        _, source = await TopicNormalizer().resolve("Solar power", UserInput, agent)
+        assert source == "agent"
+
+    @pytest.mark.asyncio
+    async def test_openai_moderation_reuses_the_shared_client(self):
+        client = MagicMock()
+        client.moderations.create = AsyncMock(side_effect=[
+            SimpleNamespace(results=[SimpleNamespace(flagged=False)]),
+            SimpleNamespace(results=[SimpleNamespace(flagged=True)]),
+        ])
+        shared = MagicMock()
+        shared.get.return_value = client
+        moderate = openai_moderation(shared)
+
+        assert await moderate("Solar power") is False
+        assert await moderate("Something nasty") is True
+        assert client.moderations.create.await_args.kwargs == {
+            "model": "omni-moderation-latest", "input": "Something nasty",
+        }
+        shared.get.return_value = None  # no API key
+        with pytest.raises(RuntimeError):
+            await moderate("Solar power")
+
+    @pytest.mark.asyncio
+    async def test_memo_is_per_model_and_bounded(self):
+        import content_creation_system
+        import enhanced_content_system
+
+        topics = normalizer(max_entries=2)
+        basic, _ = await topics.resolve("Solar power", content_creation_system.UserInput, AsyncMock())
+        enhanced, source = await topics.resolve("Solar power", enhanced_content_system.UserInput, AsyncMock())
+        assert source == "local"
+        assert not hasattr(basic, "tone") and enhanced.tone == "professional"
+
+        await topics.resolve("Wind power", enhanced_content_system.UserInput, AsyncMock())
+        assert topics.stats()["memoized"] == 2
+        _, source = await topics.resolve("Solar power", content_creation_system.UserInput, AsyncMock())
+        assert source == "local"  # the oldest entry was evicted
+
+
+class TestWorkflows:
+    """Test that the workflows only run user_input_agent for unclear topics"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("module_name", ["content_creation_system", "enhanced_content_system"])
+    async def test_process_user_input(self, module_name):
+        module = __import__(module_name)
+        agent_output = module.UserInput(topic="A clearer topic")
+        run = AsyncMock(return_value=SimpleNamespace(final_output=agent_output))
+        topics = normalizer()
+        with patch.object(module.Runner, "run", run):
+            clean = await process_user_input(topics, "Renewable energy storage", module.UserInput,
+                                             module.ask_user_input_agent)
+            unclear = await process_user_input(topics, "things", module.UserInput, module.ask_user_input_agent)
+            assert await process_user_input(None, "Renewable energy storage", module.UserInput,
+                                            module.ask_user_input_agent) == agent_output
+
+        assert clean.topic == "Renewable energy storage"
+        assert unclear == agent_output
+        assert run.await_count == 2
+        assert run.await_args.args[0] is module.user_input_agent
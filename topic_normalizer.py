@@ -0,0 +1,303 @@
+"""
+Topic Normalizer
+Local fast path for the first workflow step. A raw topic string is cleaned up
+(whitespace, quotes, request phrasing, casing), checked against length limits
+and a blocklist, and given rule-based defaults for audience, content type,
+tone and length. A confidence score decides whether that is good enough or the
+LLM user input agent still has to interpret the topic. Topics that skip the
+agent also skip its appropriateness check, so they go through the OpenAI
+moderation endpoint instead, on a shared pooled client. Results are memoized
+per normalized topic.
+"""
+
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from llm_client import LLMClientConfig, SharedLLMClient
+
+Model = TypeVar("Model", bound=BaseModel)
+Moderator = Callable[[str], Awaitable[bool]]
+
+MIN_TOPIC_CHARS = 2
+MAX_TOPIC_CHARS = 200
+MAX_CLEAN_WORDS = 14
+MODERATION_MODEL = "omni-moderation-latest"
+
+WHITESPACE = re.compile(r"\s+")
+URL = re.compile(r"https?://|www\.", re.IGNORECASE)
+WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'+#.-]*")
+# "Write an article about X", "tell me about X" and similar request phrasing around the actual topic
+REQUEST_PREFIX = re.compile(
+    r"^(?:(?:please\s+)?(?:write|create|make|generate|give\s+me|i\s+want|i'd\s+like)\s+"
+    r"(?:me\s+)?(?:an?\s+|some\s+)?(?:article|post|blog\s+post|content|piece)?\s*"
+    r"(?:about|on|regarding|covering)\s+|tell\s+me\s+about\s+|(?:an?\s+)?(?:article|post)\s+(?:about|on)\s+)",
+    re.IGNORECASE,
+)
+SMALL_WORDS = frozenset("a an and as at but by for from in into nor of on or the to vs via with".split())
+ACRONYMS = {word.upper(): word for word in (
+    "AI ML API APIs SEO IoT GPT LLM LLMs NLP CSS HTML SQL AWS GCP UX UI CI CD DevOps ESG ROI "
+    "B2B SaaS USA UK EU NASA CRISPR DNA VR AR 5G"
+).split()}
+VAGUE_WORDS = frozenset("stuff things something anything everything whatever topic idea ideas misc".split())
+
+# (pattern, value) rules; the first match wins
+AUDIENCE_RULES = [
+    (r"\b(kids|children|students|teens)\b", "students"),
+    (r"\b(beginners?|newbies|for dummies|introduction|intro to|basics)\b", "beginners"),
+    (r"\b(developers?|engineers?|programming|python|javascript|kubernetes|api|apis|sql|devops)\b", "developers"),
+    (r"\b(clinicians|doctors|nurses|healthcare professionals)\b", "healthcare professionals"),
+    (r"\b(business|marketing|sales|startups?|roi|b2b|saas|leadership|managers?|executives?)\b", "business professionals"),
+    (r"\b(research|researchers|academic|scholarly)\b", "academics"),
+]
+CONTENT_TYPE_RULES = [
+    (r"^(how to|how do)\b|\b(tutorial|step[- ]by[- ]step|walkthrough)\b", "tutorial"),
+    (r"\b(guide|handbook|checklist|tips)\b", "guide"),
+    (r"\b(vs\.?|versus|compared|comparison|impact of|effects? of|analysis|trends)\b", "analysis"),
+]
+TONE_RULES = [
+    (r"\b(research|study|studies|academic|theory|scholarly)\b", "academic"),
+    (r"\b(kids|children|beginners?|fun|easy|for dummies)\b", "friendly"),
+]
+LENGTH_RULES = [
+    (r"\b(quick|brief|short|overview|in a nutshell|tl;?dr)\b", "short"),
+    (r"\b(deep dive|comprehensive|complete|in[- ]depth|ultimate|everything about)\b", "long"),
+]
+TECHNICAL = re.compile(
+    r"\b(algorithms?|architecture|api|apis|code|coding|programming|python|javascript|kubernetes|sql|"
+    r"implementation|protocol|machine learning|neural|quantum|cryptography|devops|technical)\b",
+    re.IGNORECASE,
+)
+
+# Phrases with no harmless reading are rejected outright
+DEFAULT_BLOCKLIST = (
+    "bomb making", "build a bomb", "make a bomb", "make meth", "credit card dumps", "child sexual",
+)
+# Phrases that are often harmless ("how to kill weeds", "kill a process") only
+# send the topic to the user input agent, which judges it in context
+DEFAULT_SENSITIVE = (
+    "kill", "malware", "ransomware", "self-harm", "suicide", "weapon", "explosive",
+    "hack into", "poison",
+)
+
+
+class BlockedTopicError(ValueError):
+    """Raised when a topic matches the blocklist"""
+
+
+class TopicAnalysis(NamedTuple):
+    topic: str  # cleaned topic text
+    key: str  # memoization key
+    fields: Dict[str, Any]  # rule-based settings for UserInput
+    confidence: float  # 0-1; how much the local result can be trusted without the LLM
+    reasons: List[str]  # what lowered the confidence
+
+
+def clean_topic(text: str) -> str:
+    """Collapse whitespace, drop request phrasing, wrapping quotes and trailing punctuation"""
+    topic = WHITESPACE.sub(" ", text).strip()
+    topic = REQUEST_PREFIX.sub("", topic).strip()
+    topic = topic.strip("\"'`“”‘’ ").rstrip(".!;:, ")
+    return topic
+
+
+def fix_casing(topic: str) -> str:
+    """Title-case topics typed all in lower or upper case
+    
+    Mixed case is kept as the user wrote it, except for shouted words (all
+    caps, longer than an acronym) which are capitalized.
+    """
+    letters = [c for c in topic if c.isalpha()]
+    mixed = letters and not (all(c.islower() for c in letters) or all(c.isupper() for c in letters))
+    words = []
+    for index, word in enumerate(topic.split(" ")):
+        bare = word.strip("()[],:;\"'")
+        if bare.upper() in ACRONYMS:
+            words.append(word.replace(bare, ACRONYMS[bare.upper()]))
+        elif mixed and not (bare.isupper() and len(bare) > 4):
+            words.append(word)
+        elif index > 0 and word.lower() in SMALL_WORDS:
+            words.append(word.lower())
+        else:
+            words.append(word[:1].upper() + word[1:].lower())
+    if words[0].islower():
+        words[0] = words[0][:1].upper() + words[0][1:]  # but leave "iPhone" alone
+    return " ".join(words)
+
+
+def topic_key(topic: str) -> str:
+    """Memoization key: casing and whitespace do not distinguish topics"""
+    return WHITESPACE.sub(" ", topic).strip().casefold()
+
+
+def first_match(rules: List[Tuple[str, str]], text: str, default: str) -> str:
+    for pattern, value in rules:
+        if re.search(pattern, text, re.IGNORECASE):
+            return value
+    return default
+
+
+def infer_fields(topic: str) -> Dict[str, Any]:
+    """Rule-based UserInput settings; fields the target model lacks are ignored by the caller"""
+    audience = first_match(AUDIENCE_RULES, topic, "general")
+    return {
+        "target_audience": audience,
+        "content_type": first_match(CONTENT_TYPE_RULES, topic, "article"),
+        "content_length": first_match(LENGTH_RULES, topic, "medium"),
+        "tone": first_match(TONE_RULES, topic, "professional"),
+        "include_technical_details": audience == "developers" or bool(TECHNICAL.search(topic)),
+    }
+
+
+def score_topic(raw: str, topic: str) -> Tuple[float, List[str]]:
+    """Confidence that the cleaned topic is usable as is, with the reasons it was lowered"""
+    words = WORD.findall(topic)
+    penalties = []
+    if len(words) == 1:
+        penalties.append((0.3, "single word"))
+    if len(words) > MAX_CLEAN_WORDS:
+        penalties.append((0.5, "long request text"))
+    if topic.count("?") or len(re.findall(r"[.!?]\s+\S", topic)):
+        penalties.append((0.45, "question or several sentences"))
+    if URL.search(raw):
+        penalties.append((0.5, "contains a URL"))
+    if words and sum(word.lower() in VAGUE_WORDS for word in words) * 2 >= len(words):
+        penalties.append((0.5, "vague wording"))
+    letters = sum(c.isalpha() for c in topic)
+    if letters < len(topic.replace(" ", "")) * 0.6:
+        penalties.append((0.5, "mostly symbols or digits"))
+    confidence = max(0.0, 1.0 - sum(weight for weight, _ in penalties))
+    return round(confidence, 2), [reason for _, reason in penalties]
+
+
+def openai_moderation(llm_client: SharedLLMClient) -> Moderator:
+    """Moderator that asks the OpenAI moderation endpoint (free, and much faster than an agent run)
+
+    Requests go through `llm_client`'s pooled connection. The moderator returns
+    True when the topic is flagged.
+    """
+    async def moderate(topic: str) -> bool:
+        client = llm_client.get()
+        if client is None:
+            raise RuntimeError("No OpenAI API key for the moderation endpoint")
+        response = await client.moderations.create(model=MODERATION_MODEL, input=topic)
+        return any(result.flagged for result in response.results)
+
+    return moderate
+
+
+def term_pattern(terms: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """Whole-word, case-insensitive match of any term (None for no terms)"""
+    if not terms:
+        return None
+    return re.compile(r"\b(" + "|".join(re.escape(term.casefold()) for term in terms) + r")\b")
+
+
+class TopicNormalizer:
+    """Turns topic strings into UserInput locally, asking the LLM agent only for unclear topics
+
+    `resolve()` returns the model and where it came from: "local", "agent" or
+    "memo" (an earlier result for the same normalized topic). A topic only
+    takes the local path after `moderate(topic)` cleared it; without a
+    moderator, or if moderation fails, the agent handles the topic. Blocklist
+    terms reject a topic; sensitive terms only hand it to the agent.
+    """
+
+    def __init__(self, threshold: float = 0.6, blocklist: Tuple[str, ...] = DEFAULT_BLOCKLIST,
+                 max_entries: int = 1024, moderate: Optional[Moderator] = None,
+                 sensitive: Tuple[str, ...] = DEFAULT_SENSITIVE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.moderate = moderate
+        self._blocked = term_pattern(blocklist)
+        self._sensitive = term_pattern(sensitive)
+        self._memo: "OrderedDict[Tuple[type, str], BaseModel]" = OrderedDict()
+        self.counters: Dict[str, int] = {"local": 0, "agent": 0, "memo": 0, "blocked": 0, "moderation_errors": 0}
+
+    def analyze(self, raw: str) -> TopicAnalysis:
+        """Clean and score a topic; raises ValueError when it is empty or too long, BlockedTopicError when blocked"""
+        if len(raw) > MAX_TOPIC_CHARS * 5:
+            raise ValueError(f"Topic is longer than {MAX_TOPIC_CHARS * 5} characters")
+        topic = clean_topic(raw)
+        if len(topic) < MIN_TOPIC_CHARS:
+            raise ValueError(f"Topic needs at least {MIN_TOPIC_CHARS} characters")
+        if self._blocked and self._blocked.search(topic.casefold()):
+            self.counters["blocked"] += 1
+            raise BlockedTopicError("Topic is not allowed")
+        confidence, reasons = score_topic(raw, topic)
+        if len(topic) > MAX_TOPIC_CHARS:
+            confidence, reasons = 0.0, reasons + ["too long"]
+        if self._sensitive and self._sensitive.search(topic.casefold()):
+            confidence, reasons = min(confidence, round(self.threshold - 0.1, 2)), reasons + ["sensitive wording"]
+        topic = fix_casing(topic)
+        return TopicAnalysis(topic, topic_key(topic), infer_fields(topic), confidence, reasons)
+
+    async def resolve(self, raw: str, model: Type[Model],
+                      ask_agent: Callable[[str], Awaitable[Model]]) -> Tuple[Model, str]:
+        """Build `model` for a topic, locally when confident, else with `ask_agent(topic)`"""
+        analysis = self.analyze(raw)
+        memo_key = (model, analysis.key)
+        if memo_key in self._memo:
+            self._memo.move_to_end(memo_key)
+            self.counters["memo"] += 1
+            return self._memo[memo_key].model_copy(), "memo"
+
+        if analysis.confidence >= self.threshold and await self._moderated(analysis.topic):
+            fields = {name: value for name, value in analysis.fields.items() if name in model.model_fields}
+            result, source = model(topic=analysis.topic, **fields), "local"
+        else:
+            result, source = await ask_agent(analysis.topic), "agent"
+        self.counters[source] += 1
+
+        self._memo[memo_key] = result
+        if len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+        return result.model_copy(), source
+
+    async def _moderated(self, topic: str) -> bool:
+        """True when moderation cleared the topic; raises BlockedTopicError when it flagged it"""
+        if self.moderate is None:
+            return False
+        try:
+            flagged = await self.moderate(topic)
+        except Exception as e:
+            print(f"⚠️ Topic moderation failed, asking the user input agent instead: {e}")
+            self.counters["moderation_errors"] += 1
+            return False
+        if flagged:
+            self.counters["blocked"] += 1
+            raise BlockedTopicError("Topic was flagged by moderation")
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "memoized": len(self._memo)}
+
+
+async def process_user_input(normalizer: Optional[TopicNormalizer], topic: str, model: Type[Model],
+                             ask_agent: Callable[[str], Awaitable[Model]]) -> Model:
+    """First workflow step: build `model` for a topic, calling `ask_agent` only when `normalizer` needs it"""
+    if normalizer is None:
+        return await ask_agent(topic)
+    result, source = await normalizer.resolve(topic, model, ask_agent)
+    print(f"   Topic resolved by: {source}")
+    return result
+
+
+def create_topic_normalizer(llm_client: Optional[SharedLLMClient] = None) -> Optional[TopicNormalizer]:
+    """Build the normalizer from TOPIC_* environment variables (None when disabled)
+
+    TOPIC_FAST_PATH (default 1), TOPIC_CONFIDENCE_THRESHOLD (default 0.6) and
+    TOPIC_BLOCKLIST (extra comma-separated blocked terms). Moderation requests
+    use `llm_client`, or one shared client built from OPENAI_* settings.
+    """
+    if os.getenv("TOPIC_FAST_PATH", "1").lower() in ("0", "false", "no"):
+        return None
+    extra = tuple(term.strip() for term in os.getenv("TOPIC_BLOCKLIST", "").split(",") if term.strip())
+    return TopicNormalizer(
+        threshold=float(os.getenv("TOPIC_CONFIDENCE_THRESHOLD", "0.6")),
+        blocklist=DEFAULT_BLOCKLIST + extra,
+        moderate=openai_moderation(llm_client or SharedLLMClient(LLMClientConfig.from_env())),
+    )
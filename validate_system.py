@@ -9,6 +9,11 @@ import os
 import tempfile
 from pathlib import Path
 
+try:
+    from websockets.sync.client import connect as websocket_connect
+except ImportError:  # websockets is optional; status polling is used without it
+    websocket_connect = None
+
 class ContentSystemValidator:
     def __init__(self, base_url="http://localhost:8000"):
         self.base_url = base_url
@@ -59,13 +64,59 @@ class ContentSystemValidator:
             return False
     
     def wait_for_completion(self, timeout=120):
-        """Wait for content creation to complete"""
+        """Wait for content creation to complete
+        
+        Listens on the progress WebSocket, which pushes only changed fields, and
+        falls back to polling the status endpoint if the socket is unavailable.
+        """
         print("\n⏳ Waiting for Content Generation...")
         
         if not self.task_id:
             print("❌ No task ID available")
             return False
-            
+        
+        if websocket_connect is not None:
+            outcome = self._wait_on_websocket(timeout)
+            if outcome is not None:
+                return outcome
+            print("⚠️ Progress WebSocket unavailable, falling back to polling")
+        return self._poll_for_completion(timeout)
+    
+    def _wait_on_websocket(self, timeout):
+        """True/False once the task finishes, None if the socket could not be used"""
+        ws_url = self.base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+        fields = {}
+        last_operation = ""
+        try:
+            with websocket_connect(f"{ws_url}/api/content/ws/{self.task_id}", open_timeout=10) as socket:
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    message = json.loads(socket.recv(timeout=max(0.1, deadline - time.time())))
+                    fields.update(message["fields"])
+                    
+                    current_op = fields.get("current_operation", "")
+                    if current_op != last_operation:
+                        print(f"📋 {fields.get('status')}: {current_op}")
+                        last_operation = current_op
+                    
+                    if fields.get("status") == "completed":
+                        self.final_result = fields.get("final_result")
+                        print("✅ Content generation completed!")
+                        return True
+                    elif fields.get("status") == "error":
+                        print(f"❌ Content generation failed: {fields.get('error') or 'Unknown error'}")
+                        return False
+        except TimeoutError:
+            print("❌ Timeout waiting for completion")
+            return False
+        except Exception as e:
+            print(f"⚠️ Progress WebSocket error: {e}")
+            return None
+        print("❌ Timeout waiting for completion")
+        return False
+    
+    def _poll_for_completion(self, timeout):
+        """Poll the status endpoint until the task finishes"""
         start_time = time.time()
         last_operation = ""
         